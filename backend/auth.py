@@ -1,32 +1,74 @@
 """
 Authentication utilities - JWT token generation and password hashing.
 """
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 
 from db import get_db, User
-from config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from config import (
+    SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES,
+    USER_CACHE_TTL_SECONDS, USER_CACHE_MAX_ENTRIES,
+    BCRYPT_ROUNDS, BCRYPT_WORKERS, BCRYPT_MAX_PENDING, BCRYPT_USE_PROCESSES,
+)
+from cache import ResponseCache
+from passwords import PasswordHasher
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing (bcrypt runs in a dedicated pool, see passwords.py)
+password_hasher = PasswordHasher(
+    rounds=BCRYPT_ROUNDS,
+    workers=BCRYPT_WORKERS,
+    max_pending=BCRYPT_MAX_PENDING,
+    use_processes=BCRYPT_USE_PROCESSES,
+)
 
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
+# CurrentUser snapshots keyed by token subject (email); in memory only.
+# Nothing updates accounts in place today, so entries only go stale if a row
+# is changed outside the app; USER_CACHE_TTL_SECONDS bounds how long that lasts.
+user_cache = ResponseCache(
+    "users",
+    max_entries=USER_CACHE_MAX_ENTRIES,
+    ttl_seconds=USER_CACHE_TTL_SECONDS,
+) if USER_CACHE_TTL_SECONDS > 0 else None
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash."""
-    return pwd_context.verify(plain_password, hashed_password)
 
+@dataclass(frozen=True)
+class CurrentUser:
+    """
+    Read-only snapshot of the authenticated user's row.
+    
+    Shared between concurrent requests through the user cache, so it holds
+    plain values only (no ORM instance, no lazy relationships).
+    """
+    id: int
+    email: str
+    name: Optional[str]
+    gender: Optional[str]
+    age_group: Optional[str]
+    skin_colour: Optional[str]
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password in the dedicated bcrypt pool."""
+    return await password_hasher.hash(password)
 
-def get_password_hash(password: str) -> str:
-    """Hash a password."""
-    return pwd_context.hash(password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password in the dedicated bcrypt pool.
+    
+    Returns:
+        (valid, new_hash) - new_hash is set when the stored hash uses an
+        outdated cost and should be replaced
+    """
+    return await password_hasher.verify(plain_password, hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -41,7 +83,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> CurrentUser:
     """Get current authenticated user from JWT token."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -56,7 +98,30 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.email == email).first()
-    if user is None:
+    if user_cache is not None:
+        user = user_cache.get(email)
+        if user is not None:
+            return user
+    
+    row = db.query(
+        User.id, User.email, User.name, User.gender, User.age_group, User.skin_colour
+    ).filter(User.email == email).first()
+    if row is None:
         raise credentials_exception
+    user = CurrentUser(**row._asdict())
+    if user_cache is not None:
+        user_cache.set(email, user)
     return user
+
+
+def invalidate_cached_user(email: str) -> None:
+    """Forget a cached user; call from any code that changes or deletes an account."""
+    if user_cache is not None:
+        user_cache.delete(email)
+
+
+def get_user_cache_stats() -> dict:
+    """Hit/miss counters for the token-subject user cache."""
+    if user_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **user_cache.stats()}
@@ -0,0 +1,170 @@
+"""
+Response caching for DripMate.
+LRU + TTL cache held in memory, optionally persisted to a local SQLite file
+so cached outfits survive restarts.
+"""
+import json
+import sqlite3
+import threading
+import time
+import hashlib
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+def make_cache_key(*parts: Any) -> str:
+    """Build a stable cache key from JSON-serializable parts."""
+    raw = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache with per-entry TTL and an optional SQLite backend.
+
+    The in-memory layer serves hot keys; the SQLite layer (if `path` is set)
+    is read on a memory miss and written on every `set`, so entries outlive
+    the process.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 1000,
+        ttl_seconds: float = 3600,
+        path: Optional[str] = None,
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+
+        if path:
+            try:
+                self._conn = sqlite3.connect(path, check_same_thread=False)
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS cache_entries ("
+                    " namespace TEXT NOT NULL,"
+                    " key TEXT NOT NULL,"
+                    " value TEXT NOT NULL,"
+                    " expires_at REAL NOT NULL,"
+                    " PRIMARY KEY (namespace, key))"
+                )
+                self._conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND expires_at < ?",
+                    (name, time.time()),
+                )
+                self._conn.commit()
+            except Exception as e:
+                print(f"⚠ Cache '{name}' disk backend unavailable: {e}")
+                self._conn = None
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for `key`, or None if missing/expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (self.name, key),
+                ).fetchone()
+                if row and row[1] > now:
+                    value = json.loads(row[0])
+                    self._store(key, value, row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a value under `key` (must be JSON-serializable if persistent)."""
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._store(key, value, expires_at)
+            if self._conn is not None:
+                try:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at)"
+                        " VALUES (?, ?, ?, ?)",
+                        (self.name, key, json.dumps(value), expires_at),
+                    )
+                    self._writes += 1
+                    if self._writes % 100 == 0:
+                        self._prune_disk()
+                    self._conn.commit()
+                except Exception as e:
+                    print(f"⚠ Cache '{self.name}' write failed: {e}")
+
+    def delete(self, key: str) -> None:
+        """Drop a single entry (memory and disk)."""
+        with self._lock:
+            self._entries.pop(key, None)
+            if self._conn is not None:
+                self._conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.name, key)
+                )
+                self._conn.commit()
+
+    def clear(self) -> None:
+        """Drop every entry (memory and disk)."""
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.name,))
+                self._conn.commit()
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "persistent": self._conn is not None,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _store(self, key: str, value: Any, expires_at: float) -> None:
+        """Insert into the memory layer and evict LRU entries (lock held)."""
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _prune_disk(self) -> None:
+        """Keep the disk layer within `max_entries` (lock held)."""
+        self._conn.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND expires_at < ?",
+            (self.name, time.time()),
+        )
+        self._conn.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND key NOT IN ("
+            " SELECT key FROM cache_entries WHERE namespace = ?"
+            " ORDER BY expires_at DESC LIMIT ?)",
+            (self.name, self.name, self.max_entries),
+        )
@@ -28,14 +28,150 @@ load_env()
 # Database configuration
 DB_URL = os.getenv("DRIPMATE_DB_URL", "sqlite:///./dripmate.db")
 
+# Engine profile - SQLite pragmas applied on every new connection
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-20000"))  # negative = KiB
+
+# Engine profile - connection pool for server databases (Postgres etc.)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
 # API Keys (required in production)
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434/api/generate")
 
+# Local Ollama: models to offer (the first is the default), how long Ollama keeps
+# a model loaded after a call, whether to load them at startup (off by default: most
+# deployments use Groq/Gemini and have no Ollama server), and calls in
+# flight per model (OLLAMA_MAX_CONCURRENCY still caps the provider as a whole)
+OLLAMA_MODELS = [m.strip() for m in os.getenv("OLLAMA_MODELS", "llama3:8b").split(",") if m.strip()] or ["llama3:8b"]
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_PRELOAD = os.getenv("OLLAMA_PRELOAD", "false").lower() == "true"
+OLLAMA_MODEL_CONCURRENCY = int(os.getenv("OLLAMA_MODEL_CONCURRENCY", "1"))
+
 # Model selection
 DEFAULT_LLM = os.getenv("DEFAULT_LLM", "groq")  # "groq", "gemini" or "ollama"
 
+# Upstream LLM HTTP settings (shared connection pools)
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "90"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+
+# Provider routing: ai_provider="auto" (or LLM_FAILOVER_ENABLED) walks this order,
+# skipping providers whose circuit breaker is open
+LLM_FAILOVER_ENABLED = os.getenv("LLM_FAILOVER_ENABLED", "false").lower() == "true"
+LLM_PROVIDER_ORDER = [p.strip() for p in os.getenv("LLM_PROVIDER_ORDER", "groq,gemini,ollama").split(",") if p.strip()]
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+LLM_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "1.0"))
+LLM_HEDGE_DEFAULT_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_SECONDS", "8.0"))
+LLM_BREAKER_WINDOW = int(os.getenv("LLM_BREAKER_WINDOW", "20"))
+LLM_BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "5"))
+LLM_BREAKER_ERROR_RATE = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))
+LLM_BREAKER_SLOW_SECONDS = float(os.getenv("LLM_BREAKER_SLOW_SECONDS", "30"))
+LLM_BREAKER_COOLDOWN_SECONDS = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+
+# Per-provider concurrency: calls in flight at once, and calls allowed to wait
+# for a slot before the provider reports itself busy. "auto" routing prefers
+# providers with spare capacity, so a small local Ollama is not swamped.
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "32"))
+GROQ_QUEUE_DEPTH = int(os.getenv("GROQ_QUEUE_DEPTH", "64"))
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "32"))
+GEMINI_QUEUE_DEPTH = int(os.getenv("GEMINI_QUEUE_DEPTH", "64"))
+OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "2"))
+OLLAMA_QUEUE_DEPTH = int(os.getenv("OLLAMA_QUEUE_DEPTH", "8"))
+
+# Client-side rate limits per provider/model (requests and tokens per minute).
+# Limits are off (0) unless configured, so paid tiers are never capped; set
+# them to your plan's quota, e.g. the free tiers are Groq 30/12000 and Gemini
+# 10/250000. Upstream 429s and rate-limit headers are honoured either way.
+# RATE_LIMITS overrides single models, e.g. "gemini-1.5-pro=2/32000,llama-3.1-70b=30/6000".
+# Requests that would wait longer than RATE_LIMIT_MAX_WAIT_SECONDS are
+# rejected with 429; "auto" routing moves on after RATE_LIMIT_REROUTE_SECONDS.
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+GROQ_RPM = int(os.getenv("GROQ_RPM", "0"))
+GROQ_TPM = int(os.getenv("GROQ_TPM", "0"))
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "0"))
+GEMINI_TPM = int(os.getenv("GEMINI_TPM", "0"))
+
+
+def _parse_rate_limits(value: str) -> dict:
+    """Parse "model=rpm/tpm,..." into {model: (rpm, tpm)}, skipping bad entries."""
+    limits = {}
+    for entry in filter(None, (e.strip() for e in value.split(","))):
+        model, _, numbers = entry.partition("=")
+        try:
+            rpm, tpm = (int(n) for n in numbers.split("/"))
+            if not model.strip():
+                raise ValueError(entry)
+        except ValueError:
+            print(f"⚠ Ignoring malformed RATE_LIMITS entry {entry!r} (expected model=rpm/tpm)")
+            continue
+        limits[model.strip()] = (rpm, tpm)
+    return limits
+
+
+RATE_LIMITS = _parse_rate_limits(os.getenv("RATE_LIMITS", ""))
+RATE_LIMIT_MAX_WAIT_SECONDS = float(os.getenv("RATE_LIMIT_MAX_WAIT_SECONDS", "20"))
+RATE_LIMIT_REROUTE_SECONDS = float(os.getenv("RATE_LIMIT_REROUTE_SECONDS", "1"))
+# Expected completion size, reserved up front and corrected by reported usage
+RATE_LIMIT_COMPLETION_TOKENS = int(os.getenv("RATE_LIMIT_COMPLETION_TOKENS", "800"))
+
+# Cold start: provider SDKs load on first use; PROVIDER_WARMUP loads them in
+# the background once the server is up. Import time over the budget is flagged.
+PROVIDER_WARMUP = os.getenv("PROVIDER_WARMUP", "true").lower() == "true"
+STARTUP_IMPORT_BUDGET_MS = int(os.getenv("STARTUP_IMPORT_BUDGET_MS", "1000"))
+
+# Response cache for /chat (set CHAT_CACHE_PATH empty to keep it in memory only)
+CHAT_CACHE_ENABLED = os.getenv("CHAT_CACHE_ENABLED", "true").lower() == "true"
+CHAT_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_CACHE_MAX_ENTRIES", "1000"))
+CHAT_CACHE_TTL_SECONDS = int(os.getenv("CHAT_CACHE_TTL_SECONDS", str(60 * 60 * 24)))
+CHAT_CACHE_PATH = os.getenv("CHAT_CACHE_PATH", "./dripmate_cache.db")
+
+# Near-duplicate cache: reuse a result when item and vibe are this similar to
+# an earlier request with the same profile, options, wardrobe and model
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2000"))
+SEMANTIC_CACHE_TTL_SECONDS = int(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", str(60 * 60 * 24)))
+
+# Concurrent identical /chat and /upload-image requests share one upstream call
+COALESCE_REQUESTS = os.getenv("COALESCE_REQUESTS", "true").lower() == "true"
+
+# Vision pipeline: one Gemini call for detection + outfits, and a cache of
+# image analyses keyed by content hash (stored alongside the chat cache)
+VISION_SINGLE_CALL = os.getenv("VISION_SINGLE_CALL", "true").lower() == "true"
+VISION_CACHE_ENABLED = os.getenv("VISION_CACHE_ENABLED", "true").lower() == "true"
+VISION_CACHE_MAX_ENTRIES = int(os.getenv("VISION_CACHE_MAX_ENTRIES", "500"))
+VISION_CACHE_TTL_SECONDS = int(os.getenv("VISION_CACHE_TTL_SECONDS", str(60 * 60 * 24 * 7)))
+
+# Uploads are capped, then downscaled and re-encoded before going to Gemini
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+VISION_MAX_DIMENSION = int(os.getenv("VISION_MAX_DIMENSION", "1024"))
+VISION_JPEG_QUALITY = int(os.getenv("VISION_JPEG_QUALITY", "85"))
+
+# Per-user wardrobe snapshots (bucketed + pre-rendered prompt text)
+WARDROBE_SNAPSHOT_TTL_SECONDS = int(os.getenv("WARDROBE_SNAPSHOT_TTL_SECONDS", "300"))
+WARDROBE_SNAPSHOT_MAX_USERS = int(os.getenv("WARDROBE_SNAPSHOT_MAX_USERS", "1000"))
+
+# Wardrobes larger than the token budget are pruned to the most relevant
+# items per request (at most WARDROBE_TOP_K per category)
+WARDROBE_PROMPT_TOKEN_BUDGET = int(os.getenv("WARDROBE_PROMPT_TOKEN_BUDGET", "400"))
+WARDROBE_TOP_K = int(os.getenv("WARDROBE_TOP_K", "25"))
+
+# POST /chat/batch: items per batch, and generations in flight per batch
+CHAT_BATCH_MAX_ITEMS = int(os.getenv("CHAT_BATCH_MAX_ITEMS", "50"))
+CHAT_BATCH_CONCURRENCY = int(os.getenv("CHAT_BATCH_CONCURRENCY", "8"))
+
+# List endpoints are paginated; `limit` defaults to the page size and is capped
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "200"))
+
 # JWT Authentication
 SECRET_KEY = os.getenv("SECRET_KEY")
 if not SECRET_KEY:
@@ -49,3 +185,23 @@ if not SECRET_KEY:
     
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
+
+# Password hashing: bcrypt cost and the dedicated pool it runs in.
+# Changing BCRYPT_ROUNDS rehashes passwords transparently on next login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", "2"))
+BCRYPT_MAX_PENDING = int(os.getenv("BCRYPT_MAX_PENDING", "64"))
+BCRYPT_USE_PROCESSES = os.getenv("BCRYPT_USE_PROCESSES", "true").lower() == "true"
+
+# Resolved users are cached per token subject to skip the lookup query
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "1000"))
+
+# Sampling profiler (off unless a sample rate or a debug token is set).
+# Profiled requests write folded stacks (flamegraph.pl / speedscope) to PROFILE_DIR.
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DEBUG_TOKEN = os.getenv("PROFILE_DEBUG_TOKEN", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "100"))
+PROFILING_ENABLED = PROFILE_SAMPLE_RATE > 0 or bool(PROFILE_DEBUG_TOKEN)
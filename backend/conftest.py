@@ -0,0 +1,23 @@
+"""
+Shared pytest fixtures for the backend tests.
+"""
+import argparse
+import os
+from unittest import mock
+
+import pytest
+
+import loadtest
+
+
+@pytest.fixture(scope="module")
+def environment():
+    """
+    Point the app modules at a throwaway database with caching off.
+
+    Test modules that import config-dependent modules use this; os.environ
+    is restored when the module is done, so other modules never see it.
+    """
+    with mock.patch.dict(os.environ):
+        loadtest.configure_environment(argparse.Namespace(bcrypt_rounds=4, cache=False))
+        yield
@@ -1,21 +1,80 @@
 """
 Database setup and models for DripMate.
-Simple SQLite database with SQLAlchemy.
+SQLite by default (WAL mode), or any SQLAlchemy URL via DRIPMATE_DB_URL.
 """
-from sqlalchemy import create_engine, Column, Integer, String, Enum, ForeignKey, DateTime, Text
+from sqlalchemy import create_engine, Column, Integer, String, Enum, ForeignKey, DateTime, Text, Index, func, inspect, event
 from sqlalchemy.orm import sessionmaker, declarative_base, relationship
 from sqlalchemy.exc import IntegrityError
 from datetime import datetime
 import enum
-
-from config import DB_URL
+import threading
+import time
+from typing import Callable, Optional
+
+from config import (
+    DB_URL, SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS, SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_MMAP_SIZE, SQLITE_CACHE_SIZE, DB_POOL_SIZE, DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING,
+)
+from metrics import db_checkout_seconds
+
+IS_SQLITE = DB_URL.startswith("sqlite")
+SQLITE_PRAGMAS = {
+    "journal_mode": SQLITE_JOURNAL_MODE,
+    "synchronous": SQLITE_SYNCHRONOUS,
+    "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+    "mmap_size": SQLITE_MMAP_SIZE,
+    "cache_size": SQLITE_CACHE_SIZE,
+}
+
+
+def _engine_options() -> dict:
+    """create_engine keyword arguments for the configured database."""
+    if IS_SQLITE:
+        return {
+            "connect_args": {
+                "check_same_thread": False,
+                "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000,
+            }
+        }
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
 
 
 # Database setup
-engine = create_engine(
-    DB_URL,
-    connect_args={"check_same_thread": False} if DB_URL.startswith("sqlite") else {}
-)
+engine = create_engine(DB_URL, **_engine_options())
+
+
+@event.listens_for(engine, "connect")
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Apply SQLITE_PRAGMAS to each new SQLite connection."""
+    if not IS_SQLITE:
+        return
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+    cursor.close()
+
+
+@event.listens_for(engine, "checkout")
+def _mark_checkout(dbapi_connection, connection_record, connection_proxy):
+    """Remember when a pooled connection was handed out."""
+    connection_record.info["checked_out_at"] = time.perf_counter()
+
+
+@event.listens_for(engine, "checkin")
+def _observe_checkin(dbapi_connection, connection_record):
+    """Record how long the connection was held (see /metrics)."""
+    started = connection_record.info.pop("checked_out_at", None)
+    if started is not None:
+        db_checkout_seconds.observe(time.perf_counter() - started)
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -57,6 +116,14 @@ class WardrobeItem(Base):
     notes = Column(String(500), nullable=True)
     
     user = relationship("User", back_populates="wardrobe_items")
+    
+    __table_args__ = (
+        # Filtered, id-ordered pages of GET /wardrobe
+        Index("ix_wardrobe_items_user_category_id", user_id, category, id),
+        Index("ix_wardrobe_items_user_season", user_id, func.lower(season)),
+        Index("ix_wardrobe_items_user_color", user_id, func.lower(color)),
+        Index("ix_wardrobe_items_user_name", user_id, func.lower(name)),
+    )
 
 
 class FavoriteOutfit(Base):
@@ -71,11 +138,22 @@ class FavoriteOutfit(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     
     user = relationship("User", back_populates="favorites")
+    
+    __table_args__ = (
+        # Keyset pagination of GET /favorites (newest first)
+        Index("ix_favorite_outfits_user_created_id", "user_id", "created_at", "id"),
+    )
 
 
 # Helper functions
+_init_thread: Optional[threading.Thread] = None
+
+
 def get_db():
     """Dependency for FastAPI routes to get database session."""
+    if _init_thread is not None:
+        # Schema setup runs in the background at startup; wait for it
+        _init_thread.join()
     db = SessionLocal()
     try:
         yield db
@@ -86,7 +164,66 @@ def get_db():
 def init_db():
     """Initialize database tables."""
     Base.metadata.create_all(bind=engine)
+    # create_all skips tables that already exist, so add indexes introduced later
+    with engine.begin() as conn:
+        existing = _index_names(conn)
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(bind=conn)
     print("✓ Database initialized")
+    for key, value in describe_engine().items():
+        print(f"  {key}: {value}")
+
+
+def init_db_in_background(on_done: Optional[Callable[[], None]] = None) -> threading.Thread:
+    """
+    Run init_db on a thread so the server can start answering right away.
+    
+    get_db waits for it, so only requests that touch the database are held
+    until the schema is ready.
+    """
+    global _init_thread
+    
+    def run():
+        try:
+            init_db()
+        except Exception as e:
+            print(f"⚠ Database initialization failed: {e}")
+        if on_done:
+            on_done()
+    
+    _init_thread = threading.Thread(target=run, name="init-db", daemon=True)
+    _init_thread.start()
+    return _init_thread
+
+
+def describe_engine() -> dict:
+    """Effective engine settings (read back from the database where possible)."""
+    info = {"dialect": engine.dialect.name, "pool": type(engine.pool).__name__}
+    if IS_SQLITE:
+        with engine.connect() as conn:
+            for name in SQLITE_PRAGMAS:
+                info[name] = conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+    else:
+        info.update(
+            pool_size=engine.pool.size(),
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING,
+        )
+    return info
+
+
+def _index_names(conn) -> set:
+    """Names of indexes that already exist in the database."""
+    if conn.dialect.name == "sqlite":
+        # SQLite reflection skips expression indexes, so ask sqlite_master
+        rows = conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index'")
+        return {row[0] for row in rows}
+    insp = inspect(conn)
+    return {ix["name"] for table in insp.get_table_names() for ix in insp.get_indexes(table)}
 
 
 def get_or_create_guest_user(db):
@@ -0,0 +1,330 @@
+"""
+Tolerant JSON parsing for model output.
+One linear scan over the reply repairs what LLMs typically get wrong:
+markdown fences and prose around the object, // and /* */ comments,
+trailing or missing commas, single-quoted strings, unquoted keys, Python
+literals, raw newlines inside strings, and output cut off mid-document.
+The scanner can be fed chunk by chunk, so streaming replies are repaired
+as they arrive.
+"""
+import json
+import re
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+
+_TOKEN = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<str>"(?:[^"\\]|\\.)*")
+  | (?P<sq>'(?:[^'\\]|\\.)*')
+  | (?P<punct>[{}\[\]:,])
+  | (?P<line_comment>//[^\n]*(?:\n|$))
+  | (?P<block_comment>/\*.*?\*/)
+  | (?P<word>[^\s"'{}\[\]:,/`]+)
+  | (?P<fence>`+)
+  | (?P<other>.)
+""", re.VERBOSE | re.DOTALL)
+
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?")
+_LITERALS = {
+    "true": "true", "false": "false", "null": "null",
+    "True": "true", "False": "false", "None": "null",
+    "NaN": "null", "Infinity": "null", "-Infinity": "null", "undefined": "null",
+}
+_CONTROL = re.compile(r"[\x00-\x1f]")
+# End of a string cut off mid-escape: a lone backslash, a partial \uXXXX, or
+# a high surrogate whose low half never arrived. Escaped backslashes stay.
+_PARTIAL_ESCAPE = re.compile(
+    r"(?<!\\)((?:\\\\)*)(?:\\u[dD][89abAB][0-9a-fA-F]{2})?(?:\\(?:u[0-9a-fA-F]{0,3})?)?\Z"
+)
+_CLOSERS = {"{": "}", "[": "]"}
+
+# Tokens that may continue in the next chunk; kept back until more text arrives
+_OPEN_ENDED = {"ws", "word", "line_comment", "fence"}
+
+
+class _Frame:
+    """One open object or array."""
+
+    __slots__ = ("opener", "member_start", "repairs_at_open", "out_start")
+
+    def __init__(self, opener: str, out_start: int, repairs: int):
+        self.opener = opener
+        self.out_start = out_start
+        self.member_start = -1   # output index where the current key began
+        self.repairs_at_open = repairs
+
+
+class JSONScanner:
+    """
+    Incremental tolerant scanner for the first JSON object in a reply.
+
+    Feed text with `feed`; `finish` closes whatever is still open and
+    returns the repaired document. With `capture`, `feed` also returns
+    each container that closes at that path as soon as it is complete,
+    e.g. ("{", "[", "{") yields the objects of `{"outfits": [{...}, ...]}`.
+    """
+
+    def __init__(self, capture: Optional[Sequence[str]] = None):
+        self._buf = ""
+        self._out: List[str] = []
+        self._stack: List[_Frame] = []
+        self._expect = "value"       # key | colon | value | comma
+        self._pending_comma = False
+        self._capture = list(capture) if capture else None
+        self.started = False
+        self.done = False
+        self.repairs = 0
+
+    # --- Public API ---
+
+    def feed(self, chunk: str) -> List[Tuple[str, bool]]:
+        """
+        Scan a chunk.
+
+        Returns:
+            (json_text, repaired) for each captured container completed by it
+        """
+        self._buf += chunk
+        return self._scan(final=False)
+
+    def finish(self) -> str:
+        """Scan the rest, close open containers and return the repaired JSON."""
+        self._scan(final=True)
+        while self._stack:
+            self.repairs += 1
+            self._close(self._stack[-1].opener, capture=False)
+        return "".join(self._out)
+
+    # --- Scanning ---
+
+    def _scan(self, final: bool) -> List[Tuple[str, bool]]:
+        captured: List[Tuple[str, bool]] = []
+        buf = self._buf
+        pos = 0
+        if not self.started:
+            # Skip prose and fences before the document
+            pos = buf.find("{")
+            if pos == -1:
+                self._buf = ""
+                return captured
+            self.started = True
+
+        end = len(buf)
+        while pos < end and not self.done:
+            match = _TOKEN.match(buf, pos)
+            kind = match.lastgroup
+            if not final and match.end() == end and kind in _OPEN_ENDED:
+                break
+            if kind == "other":
+                consumed = self._other(buf, pos, final)
+                if consumed is None:
+                    break
+                pos = consumed
+                continue
+            pos = match.end()
+            token = match.group()
+
+            if kind == "str":
+                self._string(token)
+            elif kind == "punct":
+                self._punct(token, captured)
+            elif kind == "word":
+                if final and pos == end:
+                    token = _complete_literal(token)
+                self._word(token)
+            elif kind == "sq":
+                self._string(_requote(token))
+            elif kind == "fence":
+                # A closing fence before the document closed: it was cut off
+                self.repairs += 1
+                self.done = True
+            elif kind != "ws":
+                self.repairs += 1   # comment
+
+        self._buf = "" if self.done else buf[pos:]
+        return captured
+
+    def _other(self, buf: str, pos: int, final: bool) -> Optional[int]:
+        """Unterminated string or comment, or a stray character."""
+        ch = buf[pos]
+        if ch in "\"'":
+            if not final:
+                return None
+            # Cut off inside a string: close it
+            text = _PARTIAL_ESCAPE.sub(r"\1", buf[pos + 1:], count=1)
+            self.repairs += 1
+            self._string(_requote(ch + text + ch) if ch == "'" else '"' + text + '"')
+            return len(buf)
+        if ch == "/":
+            if pos + 1 == len(buf) and not final:
+                return None
+            if buf.startswith("/*", pos):
+                if not final:
+                    return None
+                self.repairs += 1
+                return len(buf)   # unterminated comment runs to the end
+        self.repairs += 1
+        return pos + 1
+
+    # --- Tokens ---
+
+    def _begin_value(self) -> bool:
+        """Get ready for a key or value, inserting missing punctuation."""
+        if not self._stack:
+            return False
+        if self._expect == "comma":
+            self.repairs += 1
+            self._pending_comma = True
+            self._expect = "key" if self._stack[-1].opener == "{" else "value"
+        elif self._expect == "colon":
+            self.repairs += 1
+            self._out.append(":")
+            self._expect = "value"
+        if self._expect == "key":
+            self._stack[-1].member_start = len(self._out)
+        if self._pending_comma:
+            self._out.append(",")
+            self._pending_comma = False
+        return True
+
+    def _string(self, token: str) -> None:
+        if _CONTROL.search(token):
+            self.repairs += 1
+            token = _CONTROL.sub(_escape_control, token)
+        if not self._begin_value():
+            return
+        self._out.append(token)
+        self._expect = "colon" if self._expect == "key" else "comma"
+
+    def _word(self, word: str) -> None:
+        if not self._begin_value():
+            return
+        if self._expect == "key":
+            self.repairs += 1
+            self._out.append(json.dumps(word))
+            self._expect = "colon"
+            return
+        value = _LITERALS.get(word)
+        if value is None:
+            value = word if _NUMBER.fullmatch(word) else _coerce_number(word)
+        if value != word:
+            self.repairs += 1
+        self._out.append(value)
+        self._expect = "comma"
+
+    def _punct(self, token: str, captured: List[Tuple[str, bool]]) -> None:
+        if token in "{[":
+            if not self._stack:
+                self._out.append(token)
+            elif not self._begin_value():
+                return
+            else:
+                if self._expect == "key":
+                    # A container where a key belongs; cannot be repaired sensibly
+                    self._expect = "value"
+                self._out.append(token)
+            self._stack.append(_Frame(token, len(self._out) - 1, self.repairs))
+            self._expect = "key" if token == "{" else "value"
+        elif token in "}]":
+            opener = "{" if token == "}" else "["
+            if not any(frame.opener == opener for frame in self._stack):
+                self.repairs += 1
+                return
+            while self._stack[-1].opener != opener:
+                self.repairs += 1
+                self._close(self._stack[-1].opener, capture=False)
+            result = self._close(opener, capture=True)
+            if result is not None:
+                captured.append(result)
+        elif token == ":":
+            if self._expect == "colon":
+                self._out.append(":")
+                self._expect = "value"
+            else:
+                self.repairs += 1
+        elif token == ",":
+            if self._expect == "comma":
+                self._pending_comma = True
+                self._expect = "key" if self._stack[-1].opener == "{" else "value"
+            else:
+                self.repairs += 1
+
+    def _close(self, opener: str, capture: bool) -> Optional[Tuple[str, bool]]:
+        """Close the innermost container, dropping a dangling key or comma."""
+        frame = self._stack[-1]
+        if opener == "{" and self._expect in ("colon", "value") and frame.member_start >= 0:
+            # `"key"` or `"key":` with no value
+            self.repairs += 1
+            del self._out[frame.member_start:]
+        if self._pending_comma:
+            self.repairs += 1
+            self._pending_comma = False
+        self._out.append(_CLOSERS[opener])
+
+        result = None
+        if capture and self._capture is not None and [f.opener for f in self._stack] == self._capture:
+            result = ("".join(self._out[frame.out_start:]), self.repairs > frame.repairs_at_open)
+        self._stack.pop()
+        self._expect = "comma"
+        if not self._stack:
+            self.done = True
+        return result
+
+
+def _requote(token: str) -> str:
+    """'single quoted' -> "double quoted"."""
+    body = token[1:-1].replace("\\'", "'").replace('"', '\\"')
+    return f'"{body}"'
+
+
+def _escape_control(match) -> str:
+    return json.dumps(match.group())[1:-1]
+
+
+def _complete_literal(word: str) -> str:
+    """A literal cut off at the end of the reply ("tru", "nul")."""
+    for literal in ("true", "false", "null"):
+        if literal.startswith(word):
+            return literal
+    return word
+
+
+def _coerce_number(word: str) -> str:
+    """Near-miss numbers ("12.", "+3", "1e") as JSON; anything else as a string."""
+    try:
+        number = float(word)
+    except ValueError:
+        return json.dumps(word)
+    if number != number or number in (float("inf"), float("-inf")):
+        return "null"
+    return str(int(number)) if number.is_integer() and "." not in word and "e" not in word.lower() else repr(number)
+
+
+def repair_json(text: str) -> str:
+    """
+    Repaired JSON text of the first object in `text`.
+
+    Raises:
+        ValueError: if `text` contains no JSON object
+    """
+    scanner = JSONScanner()
+    scanner.feed(text or "")
+    repaired = scanner.finish()
+    if not repaired:
+        raise ValueError("No JSON object found")
+    return repaired
+
+
+def loads(text: str, on_repair: Optional[Callable[[], None]] = None) -> Any:
+    """
+    `json.loads`, falling back to `repair_json` for malformed replies.
+
+    `on_repair` is called when the fallback was needed (for metrics).
+    """
+    try:
+        return json.loads(text)
+    except (TypeError, ValueError):
+        pass
+    if on_repair is not None:
+        on_repair()
+    return json.loads(repair_json(text if isinstance(text, str) else ""))
@@ -2,29 +2,46 @@
 LLM abstraction layer for DripMate.
 Supports Groq (primary), Gemini, and Ollama (fallback).
 """
+import asyncio
 import json
-import re
-import requests
-from typing import Optional, List, Dict
+import math
+import threading
+import time
+import httpx
+from typing import AsyncIterator, Optional, List, Dict, Tuple
 
-from config import GEMINI_API_KEY, GROQ_API_KEY, OLLAMA_URL
+from config import (
+    GROQ_API_KEY, OLLAMA_URL, OLLAMA_MODELS, OLLAMA_KEEP_ALIVE, OLLAMA_MODEL_CONCURRENCY,
+    LLM_TIMEOUT_SECONDS, LLM_MAX_CONNECTIONS, LLM_FAILOVER_ENABLED, LLM_PROVIDER_ORDER,
+    CHAT_CACHE_ENABLED, CHAT_CACHE_MAX_ENTRIES, CHAT_CACHE_TTL_SECONDS, CHAT_CACHE_PATH,
+    SEMANTIC_CACHE_ENABLED, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MAX_ENTRIES,
+    SEMANTIC_CACHE_TTL_SECONDS, COALESCE_REQUESTS,
+    GROQ_MAX_CONCURRENCY, GROQ_QUEUE_DEPTH, GEMINI_MAX_CONCURRENCY, GEMINI_QUEUE_DEPTH,
+    OLLAMA_MAX_CONCURRENCY, OLLAMA_QUEUE_DEPTH, RATE_LIMIT_REROUTE_SECONDS,
+)
+from cache import ResponseCache, make_cache_key
+from semantic_cache import SemanticCache
+from singleflight import SingleFlight
+from routing import call_with_failover, get_health, pick_provider, rank_providers
+from metrics import observe_llm, record_tokens, json_repairs
+from jsonrepair import JSONScanner, loads as tolerant_loads
+from ollama_client import OllamaClient
+from wardrobe_index import WardrobeIndex, needs_pruning
+from ratelimit import (
+    RateLimited, estimate_request_tokens, reserve, track_usage,
+    report_error, report_headers, report_usage,
+)
+from providers import (
+    LazySDK, Provider, ProviderBusy, groq_sdk, gemini_sdk,
+    PROVIDER_REGISTRY, get_provider, register_provider,
+)
 
 
 # --- Groq Setup ---
-try:
-    from groq import Groq
-    
-    if GROQ_API_KEY:
-        groq_client = Groq(api_key=GROQ_API_KEY)
-        GROQ_AVAILABLE = True
-    else:
-        groq_client = None
-        GROQ_AVAILABLE = False
-        print("⚠ GROQ_API_KEY not set")
-except Exception as e:
-    print(f"⚠ Groq not available: {e}")
-    GROQ_AVAILABLE = False
-    groq_client = None
+# The SDK is imported on first use (providers.py); available = key configured
+GROQ_AVAILABLE = groq_sdk.configured
+if not GROQ_AVAILABLE:
+    print("⚠ GROQ_API_KEY not set")
 
 
 # Available Groq models
@@ -37,19 +54,9 @@ DEFAULT_GROQ_MODEL = "llama-3.3-70b"
 
 
 # --- Gemini Setup ---
-try:
-    import google.generativeai as genai
-    
-    if GEMINI_API_KEY:
-        genai.configure(api_key=GEMINI_API_KEY)
-        GEMINI_AVAILABLE = True
-    else:
-        GEMINI_AVAILABLE = False
-        print("⚠ GEMINI_API_KEY not set")
-except Exception as e:
-    print(f"⚠ Gemini not available: {e}")
-    GEMINI_AVAILABLE = False
-    genai = None
+GEMINI_AVAILABLE = gemini_sdk.configured
+if not GEMINI_AVAILABLE:
+    print("⚠ GEMINI_API_KEY not set")
 
 
 # Available models
@@ -60,7 +67,38 @@ GEMINI_MODELS = {
     "gemini-2.5-flash": "gemini-2.5-flash",
 }
 DEFAULT_GEMINI_MODEL = "gemini-2.5-flash"
-DEFAULT_OLLAMA_MODEL = "llama3:8b"
+
+
+# --- Ollama Setup ---
+# Local models from OLLAMA_MODELS; the first is the default
+OLLAMA_MODEL_NAMES = {name: name for name in OLLAMA_MODELS}
+DEFAULT_OLLAMA_MODEL = OLLAMA_MODELS[0]
+
+
+# Shared connection limits for the pooled async clients
+_HTTP_LIMITS = httpx.Limits(
+    max_connections=LLM_MAX_CONNECTIONS,
+    max_keepalive_connections=LLM_MAX_CONNECTIONS,
+)
+
+
+# --- Response cache ---
+response_cache = ResponseCache(
+    "chat",
+    max_entries=CHAT_CACHE_MAX_ENTRIES,
+    ttl_seconds=CHAT_CACHE_TTL_SECONDS,
+    path=CHAT_CACHE_PATH or None,
+) if CHAT_CACHE_ENABLED else None
+
+semantic_cache = SemanticCache(
+    "chat_semantic",
+    max_entries=SEMANTIC_CACHE_MAX_ENTRIES,
+    threshold=SEMANTIC_CACHE_THRESHOLD,
+    ttl_seconds=SEMANTIC_CACHE_TTL_SECONDS,
+) if SEMANTIC_CACHE_ENABLED else None
+
+# Identical /chat requests in flight at the same time share one provider call
+suggestion_flight = SingleFlight("chat") if COALESCE_REQUESTS else None
 
 
 def get_style_suggestion(
@@ -79,6 +117,9 @@ def get_style_suggestion(
     """
     Get outfit suggestions using AI (Groq, Gemini or Ollama).
     
+    Blocking entry point for callers without an event loop (scripts, the
+    REPL); the API awaits `get_style_suggestion_async` instead.
+    
     Args:
         item: Base clothing item
         vibe: Desired outfit vibe
@@ -88,179 +129,798 @@ def get_style_suggestion(
         num_ideas: Number of outfit ideas (1-3)
         more_details: Additional constraints
         layering_preference: "Suggest Layers", "No Layers", or "AI Decides"
-        wardrobe: Optional user wardrobe items
-        provider: "groq", "gemini" or "ollama"
+        wardrobe: Optional user wardrobe items (names per category, or a
+            WardrobeSnapshot with the prompt block pre-rendered)
+        provider: "groq", "gemini", "ollama", or "auto" for failover routing
         model_name: Specific model name
     
     Returns:
         Dict with 'outfits' list or 'error' message
     """
-    if provider == "groq":
-        return _groq_suggestion(
-            item, vibe, gender, age_group, skin_colour,
-            num_ideas, more_details, layering_preference, wardrobe, model_name
-        )
-    elif provider == "gemini":
-        return _gemini_suggestion(
-            item, vibe, gender, age_group, skin_colour,
-            num_ideas, more_details, layering_preference, wardrobe, model_name
-        )
-    elif provider == "ollama":
-        return _ollama_suggestion(
-            item, vibe, gender, age_group, skin_colour,
-            num_ideas, more_details, layering_preference, wardrobe
-        )
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
     else:
-        return {"error": f"Unknown provider: {provider}", "outfits": []}
+        raise RuntimeError("get_style_suggestion blocks; await get_style_suggestion_async instead")
+    return _run_blocking(get_style_suggestion_async(
+        item, vibe, gender, age_group, skin_colour, num_ideas,
+        more_details, layering_preference, wardrobe, provider, model_name
+    ))
 
 
-def _groq_suggestion(
-    item: str, vibe: str, gender: str,
-    age_group: Optional[str], skin_colour: Optional[str],
-    num_ideas: int, more_details: Optional[str],
-    layering_preference: str, wardrobe: Optional[Dict],
-    model_name: Optional[str]
+async def get_style_suggestion_async(
+    item: str,
+    vibe: str,
+    gender: str,
+    age_group: Optional[str] = None,
+    skin_colour: Optional[str] = None,
+    num_ideas: int = 1,
+    more_details: Optional[str] = None,
+    layering_preference: str = "AI Decides",
+    wardrobe: Optional[Dict[str, List[str]]] = None,
+    provider: str = "groq",
+    model_name: str = None,
 ) -> dict:
-    """Get outfit suggestions from Groq (LLaMA 3.3 70B)."""
-    if not GROQ_AVAILABLE:
-        return {
-            "error": "Groq not configured. Set GROQ_API_KEY.",
-            "outfits": []
-        }
+    """
+    Async variant of `get_style_suggestion`.
     
-    # Select model
-    if not model_name or model_name not in GROQ_MODELS:
-        model_name = DEFAULT_GROQ_MODEL
+    Uses the pooled async clients, so the event loop is free while the
+    provider is generating. Concurrent identical requests share a single
+    upstream call. Arguments and return value are the same.
+    """
+    cached, cache_key, partition = await _cached_suggestion(
+        item, vibe, gender, age_group, skin_colour, num_ideas,
+        more_details, layering_preference, wardrobe, provider, model_name
+    )
+    if cached is not None:
+        return cached
     
-    # Build prompt
     prompt = _build_prompt(
         item, vibe, gender, age_group, skin_colour,
         num_ideas, more_details, layering_preference, wardrobe
     )
+    if provider != "auto" and provider not in PROVIDER_REGISTRY:
+        return {"error": f"Unknown provider: {provider}", "outfits": []}
     
-    try:
-        response = groq_client.chat.completions.create(
-            model=GROQ_MODELS[model_name],
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are DripMate, a world-class AI fashion stylist. Always respond with valid JSON only."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.9,
-            max_tokens=2048,
-            response_format={"type": "json_object"}
-        )
+    async def generate() -> dict:
+        result, answered_by = await _generate_suggestion_async(prompt, provider, model_name)
+        await _store_suggestion(cache_key, partition, item, vibe, result, provider, answered_by)
+        return result
+    
+    if suggestion_flight is None:
+        return await generate()
+    flight_key = cache_key or _suggestion_cache_key(
+        item, vibe, gender, age_group, skin_colour, num_ideas,
+        more_details, layering_preference, wardrobe, provider, model_name
+    )
+    return await suggestion_flight.do(flight_key, generate)
+
+
+async def _generate_suggestion_async(
+    prompt: str, provider: str, model_name: Optional[str]
+) -> Tuple[dict, str]:
+    """
+    One generation: a single provider, or failover routing for "auto".
+    
+    Returns:
+        (result, the provider that produced it)
+    """
+    if provider == "auto" or (LLM_FAILOVER_ENABLED and provider in PROVIDER_REGISTRY):
+        order = _failover_order(provider)
+        attempts = []
         
-        raw = response.choices[0].message.content.strip()
+        async def call(candidate: str) -> dict:
+            # The requested model only applies to the requested provider.
+            # Only the last candidate waits out a rate limit; the others
+            # hand over to the next provider instead.
+            result = await _call_provider_async(
+                candidate, prompt, model_name if candidate == provider else None,
+                max_wait=None if candidate == order[-1] else RATE_LIMIT_REROUTE_SECONDS,
+            )
+            attempts.append((result, candidate))
+            return result
         
-        # Parse JSON
+        result = await call_with_failover(order, call)
+        return result, next((c for r, c in attempts if r is result), provider)
+    return await _call_provider_async(provider, prompt, model_name), provider
+
+
+def _failover_order(provider: str) -> List[str]:
+    """
+    Configured providers from LLM_PROVIDER_ORDER, ranked by health and load.
+
+    An explicitly requested provider is always tried first.
+    """
+    order = [p for p in LLM_PROVIDER_ORDER if p in PROVIDER_REGISTRY and p != provider]
+    ranked = rank_providers(order, _provider_load)
+    if provider in PROVIDER_REGISTRY:
+        ranked = [provider] + ranked
+    return ranked
+
+
+def _provider_load(provider: str) -> Optional[float]:
+    """Queue load of a provider, or None if it cannot take a call now."""
+    spec = PROVIDER_REGISTRY[provider]
+    if not spec.available() or not spec.pool.has_room():
+        return None
+    return spec.pool.load()
+
+
+async def _call_provider_async(
+    provider: str,
+    prompt: str,
+    model_name: Optional[str],
+    max_wait: Optional[float] = None,
+) -> dict:
+    """
+    Call one provider within its rate and concurrency limits and feed the
+    outcome into its circuit breaker.
+
+    `max_wait` caps how long to wait for rate-limit budget (default
+    RATE_LIMIT_MAX_WAIT_SECONDS).
+    """
+    spec = PROVIDER_REGISTRY[provider]
+    model = spec.resolve_model(model_name)
+    health = get_health(provider)
+    # Until the provider is called, every way out (rate limited, busy, or
+    # cancelled while waiting) frees the probe slot without a breaker verdict
+    try:
+        reservation = await reserve(provider, model, estimate_request_tokens(prompt), max_wait)
+        await spec.pool.acquire()
+    except RateLimited as e:
+        health.release_probe()
+        return _rate_limited_result(e)
+    except ProviderBusy as e:
+        health.release_probe()
+        return {"error": str(e), "outfits": []}
+    except BaseException:
+        health.release_probe()
+        raise
+    
+    with track_usage(reservation):
+        start = time.perf_counter()
         try:
-            data = json.loads(raw)
-        except:
-            cleaned = _clean_json(raw)
-            data = json.loads(cleaned)
-        
-        return _normalize_outfits(data)
-        
-    except Exception as e:
-        return {"error": f"Groq error: {e}", "outfits": []}
+            result = await spec.generate_async(prompt, model_name)
+        finally:
+            spec.pool.release()
+    elapsed = time.perf_counter() - start
+    ok = bool(result.get("outfits")) and not result.get("error")
+    if result.get("retry_after") is not None:
+        # A 429 says nothing about the provider's health
+        health.release_probe()
+    else:
+        health.record(ok, elapsed)
+    observe_llm(provider, model, elapsed, ok)
+    return result
+
+
+def _rate_limited_result(error: RateLimited) -> dict:
+    """Error result for a call shed by the client-side rate limiter."""
+    return {"error": str(error), "outfits": [], "retry_after": error.retry_after}
+
+
+def _provider_error(label: str, error: Exception) -> dict:
+    """Error result for a failed provider call; a 429 carries `retry_after`."""
+    retry_after = report_error(error)
+    if retry_after is not None:
+        return {
+            "error": f"{label} rate limit reached, retry in {math.ceil(retry_after)}s",
+            "outfits": [],
+            "retry_after": retry_after,
+        }
+    return {"error": f"{label} error: {error}", "outfits": []}
+
+
+def _norm_text(value: Optional[str]) -> str:
+    """Case- and whitespace-insensitive form of a free-text field."""
+    return " ".join(str(value).split()).lower() if value else ""
+
+
+def _resolve_model(provider: str, model_name: Optional[str]) -> Optional[str]:
+    """Return the model a provider will actually use for `model_name`."""
+    spec = PROVIDER_REGISTRY.get(provider)
+    return spec.resolve_model(model_name) if spec else model_name
+
 
+def wardrobe_fingerprint(wardrobe: Optional[Dict]) -> Optional[str]:
+    """Order-insensitive hash of the wardrobe lists used in the prompt."""
+    if not wardrobe:
+        return None
+    if getattr(wardrobe, "fingerprint", None):
+        return wardrobe.fingerprint
+    return make_cache_key({
+        category: sorted(_norm_text(name) for name in (names or []))
+        for category, names in wardrobe.items()
+    })
 
-def _gemini_suggestion(
+
+def _suggestion_cache_key(
     item: str, vibe: str, gender: str,
     age_group: Optional[str], skin_colour: Optional[str],
     num_ideas: int, more_details: Optional[str],
     layering_preference: str, wardrobe: Optional[Dict],
-    model_name: Optional[str]
-) -> dict:
-    """Get outfit suggestions from Gemini."""
+    provider: str, model_name: Optional[str]
+) -> str:
+    """Cache key over the normalized inputs of `get_style_suggestion`."""
+    return make_cache_key(
+        _norm_text(item), _norm_text(vibe), _norm_text(gender),
+        _norm_text(age_group), _norm_text(skin_colour), int(num_ideas),
+        _norm_text(more_details), layering_preference,
+        wardrobe_fingerprint(wardrobe), provider, _resolve_model(provider, model_name),
+    )
+
+
+def _semantic_partition(
+    gender: str, age_group: Optional[str], skin_colour: Optional[str],
+    num_ideas: int, more_details: Optional[str],
+    layering_preference: str, wardrobe: Optional[Dict],
+    provider: str, model_name: Optional[str]
+) -> str:
+    """Every input except item and vibe, which the semantic cache compares by similarity."""
+    return make_cache_key(
+        _norm_text(gender), _norm_text(age_group), _norm_text(skin_colour), int(num_ideas),
+        _norm_text(more_details), layering_preference,
+        wardrobe_fingerprint(wardrobe), provider, _resolve_model(provider, model_name),
+    )
+
+
+def _lookup_suggestion(
+    item: str, vibe: str, gender: str,
+    age_group: Optional[str], skin_colour: Optional[str],
+    num_ideas: int, more_details: Optional[str],
+    layering_preference: str, wardrobe: Optional[Dict],
+    provider: str, model_name: Optional[str]
+):
+    """
+    Check the exact cache, then the near-duplicate cache.
+    
+    Returns:
+        (cached result or None, cache_key, partition) - a key is None when
+        its cache is disabled
+    """
+    cache_key = partition = None
+    if response_cache is not None:
+        cache_key = _suggestion_cache_key(
+            item, vibe, gender, age_group, skin_colour, num_ideas,
+            more_details, layering_preference, wardrobe, provider, model_name
+        )
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached, cache_key, partition
+    if semantic_cache is not None:
+        partition = _semantic_partition(
+            gender, age_group, skin_colour, num_ideas,
+            more_details, layering_preference, wardrobe, provider, model_name
+        )
+        cached = semantic_cache.get(partition, item, vibe)
+        if cached is not None:
+            return cached, cache_key, partition
+    return None, cache_key, partition
+
+
+def _remember_suggestion(
+    cache_key: Optional[str], partition: Optional[str], item: str, vibe: str, result: dict
+) -> None:
+    """Store a successful result in whichever caches are enabled."""
+    if cache_key:
+        response_cache.set(cache_key, result)
+    if partition:
+        semantic_cache.set(partition, item, vibe, result)
+
+
+async def _cached_suggestion(
+    item: str, vibe: str, gender: str,
+    age_group: Optional[str], skin_colour: Optional[str],
+    num_ideas: int, more_details: Optional[str],
+    layering_preference: str, wardrobe: Optional[Dict],
+    provider: str, model_name: Optional[str]
+):
+    """
+    `_lookup_suggestion` on a worker thread, since a memory miss falls
+    through to the SQLite disk cache.
+    """
+    return await asyncio.to_thread(
+        _lookup_suggestion,
+        item, vibe, gender, age_group, skin_colour, num_ideas,
+        more_details, layering_preference, wardrobe, provider, model_name
+    )
+
+
+async def _store_suggestion(
+    cache_key: Optional[str], partition: Optional[str], item: str, vibe: str,
+    result: dict, requested: str, answered_by: str
+) -> None:
+    """
+    Cache a successful result on a worker thread (the disk write commits
+    to SQLite). Errors are not cached, and a request pinned to one provider
+    is not cached when another provider answered it through failover.
+    """
+    if not result.get("outfits") or result.get("error"):
+        return
+    if requested not in ("auto", answered_by):
+        return
+    await asyncio.to_thread(_remember_suggestion, cache_key, partition, item, vibe, result)
+
+
+def get_cache_stats() -> dict:
+    """Hit/miss counters for the /chat response cache."""
+    if response_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **response_cache.stats()}
+
+
+def get_coalescing_stats() -> dict:
+    """Provider calls made vs. requests that joined an identical one in flight."""
+    if suggestion_flight is None:
+        return {"enabled": False}
+    return {"enabled": True, **suggestion_flight.stats()}
+
+
+def get_semantic_cache_stats() -> dict:
+    """Hit/miss counters and hit similarity for the near-duplicate cache."""
+    if semantic_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **semantic_cache.stats()}
+
+
+# --- Pooled clients ---
+# Created once on first use and reused, so every call rides on an existing
+# HTTP/gRPC connection pool instead of opening a new one.
+_async_groq_client = None
+_gemini_models: Dict[str, object] = {}
+ollama = OllamaClient(
+    OLLAMA_URL,
+    OLLAMA_MODELS,
+    keep_alive=OLLAMA_KEEP_ALIVE,
+    max_concurrency=OLLAMA_MODEL_CONCURRENCY,
+    max_queue=OLLAMA_QUEUE_DEPTH,
+    timeout=LLM_TIMEOUT_SECONDS,
+    max_connections=LLM_MAX_CONNECTIONS,
+)
+
+
+# The pooled clients belong to the loop that first used them, so blocking
+# callers share one private loop instead of a fresh asyncio.run() each time
+_blocking_loop: Optional[asyncio.AbstractEventLoop] = None
+_blocking_loop_lock = threading.Lock()
+
+
+def _run_blocking(coro):
+    """Run a coroutine on llm's private background loop and wait for it."""
+    global _blocking_loop
+    with _blocking_loop_lock:
+        if _blocking_loop is None:
+            _blocking_loop = asyncio.new_event_loop()
+            threading.Thread(target=_blocking_loop.run_forever, name="llm-blocking", daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coro, _blocking_loop).result()
+
+
+def _require(sdk: LazySDK):
+    """Load an SDK, raising if it is unavailable."""
+    module = sdk.get()
+    if module is None:
+        raise RuntimeError(f"{sdk.name} SDK not available: {sdk.error or 'not configured'}")
+    return module
+
+
+def _get_async_groq_client():
+    """Shared AsyncGroq client (httpx connection pool inside)."""
+    global _async_groq_client
+    if _async_groq_client is None:
+        _async_groq_client = _require(groq_sdk).AsyncGroq(
+            api_key=GROQ_API_KEY,
+            timeout=LLM_TIMEOUT_SECONDS,
+            http_client=httpx.AsyncClient(limits=_HTTP_LIMITS, timeout=LLM_TIMEOUT_SECONDS),
+        )
+    return _async_groq_client
+
+
+def _get_gemini_model(model_name: str):
+    """Shared GenerativeModel per model name."""
+    model = _gemini_models.get(model_name)
+    if model is None:
+        model = _require(gemini_sdk).GenerativeModel(GEMINI_MODELS[model_name])
+        _gemini_models[model_name] = model
+    return model
+
+
+def warm_up() -> None:
+    """Import the configured SDKs and build their default clients ahead of the first request."""
+    if GROQ_AVAILABLE:
+        _get_async_groq_client()
+    if GEMINI_AVAILABLE:
+        _get_gemini_model(DEFAULT_GEMINI_MODEL)
+
+
+async def close_clients() -> None:
+    """Close pooled clients (called on app shutdown)."""
+    global _async_groq_client
+    if _async_groq_client is not None:
+        await _async_groq_client.close()
+        _async_groq_client = None
+    await ollama.aclose()
+
+
+async def preload_ollama() -> None:
+    """Load the configured Ollama models so the first request does not wait for them."""
+    results = await ollama.preload()
+    for model, result in results.items():
+        if result["state"] == "loaded":
+            print(f"✓ Ollama model {model} loaded ({result['ms']:.0f} ms, keep_alive {ollama.keep_alive})")
+        else:
+            print(f"ℹ Ollama model {model} not preloaded: {result.get('error')}")
+
+
+def get_ollama_stats() -> dict:
+    """Ollama per-model slots and load state (for /stats)."""
+    return ollama.stats()
+
+
+# --- Providers ---
+GROQ_SYSTEM_PROMPT = "You are DripMate, a world-class AI fashion stylist. Always respond with valid JSON only."
+
+
+def _groq_request(prompt: str, model_name: Optional[str]) -> dict:
+    """Keyword arguments for a Groq chat completion."""
+    if not model_name or model_name not in GROQ_MODELS:
+        model_name = DEFAULT_GROQ_MODEL
+    return {
+        "model": GROQ_MODELS[model_name],
+        "messages": [
+            {"role": "system", "content": GROQ_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ],
+        "temperature": 0.9,
+        "max_tokens": 2048,
+        "response_format": {"type": "json_object"},
+    }
+
+
+async def _groq_suggestion_async(prompt: str, model_name: Optional[str]) -> dict:
+    """Async Groq call on the shared client."""
+    if not GROQ_AVAILABLE:
+        return {
+            "error": "Groq not configured. Set GROQ_API_KEY.",
+            "outfits": []
+        }
+    
+    try:
+        client = _get_async_groq_client()
+        # The raw response carries the x-ratelimit-* headers
+        raw = await client.chat.completions.with_raw_response.create(
+            **_groq_request(prompt, model_name)
+        )
+        report_headers(raw.headers)
+        response = await raw.parse()
+        _record_usage("groq", model_name, response)
+        return _parse_outfits(response.choices[0].message.content)
+    except Exception as e:
+        return _provider_error("Groq", e)
+
+
+def _gemini_generation_config():
+    """Sampling settings shared by plain and streamed Gemini calls."""
+    return _require(gemini_sdk).types.GenerationConfig(
+        temperature=0.9,
+        top_p=0.95,
+        top_k=40,
+    )
+
+
+async def _gemini_suggestion_async(prompt: str, model_name: Optional[str]) -> dict:
+    """Async Gemini call (gRPC aio transport)."""
     if not GEMINI_AVAILABLE:
         return {
             "error": "Gemini not configured. Set GEMINI_API_KEY.",
             "outfits": []
         }
     
-    # Select model
     if not model_name or model_name not in GEMINI_MODELS:
         model_name = DEFAULT_GEMINI_MODEL
     
     try:
-        model = genai.GenerativeModel(GEMINI_MODELS[model_name])
+        model = _get_gemini_model(model_name)
     except Exception as e:
         return {"error": f"Failed to load model: {e}", "outfits": []}
     
-    # Build prompt
-    prompt = _build_prompt(
-        item, vibe, gender, age_group, skin_colour,
-        num_ideas, more_details, layering_preference, wardrobe
-    )
-    
     try:
-        response = model.generate_content(
-            prompt,
-            generation_config=genai.types.GenerationConfig(
-                temperature=0.9,
-                top_p=0.95,
-                top_k=40,
-            )
+        response = await model.generate_content_async(
+            prompt, generation_config=_gemini_generation_config()
         )
+        _record_usage("gemini", model_name, response)
+        return _parse_outfits(response.text)
+    except Exception as e:
+        return _provider_error("Gemini", e)
+
+
+async def _ollama_suggestion_async(prompt: str, model_name: Optional[str] = None) -> dict:
+    """Async Ollama call on the shared httpx client."""
+    try:
+        data = await ollama.agenerate(prompt, model_name)
+        _record_usage("ollama", model_name, data)
+        return _parse_outfits(data.get('response', '') if isinstance(data, dict) else '')
+    except Exception as e:
+        return {"error": f"Ollama error: {e}", "outfits": []}
+
+
+def _parse_outfits(raw: str) -> dict:
+    """Parse a provider's raw text into normalized outfits."""
+    data = tolerant_loads((raw or "").strip(), on_repair=lambda: json_repairs.inc("chat"))
+    return _normalize_outfits(data)
+
+
+def _record_usage(provider: str, model_name: Optional[str], response) -> None:
+    """Feed the token counts a provider reports into the metrics and rate limiter."""
+    model = _resolve_model(provider, model_name)
+    counts = None
+    if provider == "groq":
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            counts = usage.prompt_tokens, usage.completion_tokens
+    elif provider == "gemini":
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            counts = usage.prompt_token_count, usage.candidates_token_count
+    elif isinstance(response, dict):
+        # Ollama: token counts come back as eval counts on the final message
+        counts = response.get("prompt_eval_count"), response.get("eval_count")
+    if counts is not None:
+        record_tokens(provider, model, *counts)
+        # Settles the rate-limit reservation of the current call
+        report_usage(*counts)
+
+
+# --- Streaming ---
+
+class _OutfitStreamParser:
+    """
+    Incremental parser for the `{"outfits": [ {...}, ... ]}` document.
+    
+    Text is fed chunk by chunk as the provider generates it. Every object
+    that closes directly inside the outfits array is repaired, parsed and
+    returned right away, so callers can emit outfits before the document
+    is done.
+    """
+    
+    def __init__(self):
+        self.count = 0
+        self._scanner = JSONScanner(capture=("{", "[", "{"))
+        self._text: List[str] = []
+    
+    def feed(self, chunk: str) -> List[dict]:
+        """Consume a chunk and return outfits completed by it."""
+        self._text.append(chunk)
+        completed = []
+        for text, repaired in self._scanner.feed(chunk):
+            if repaired:
+                json_repairs.inc("stream")
+            outfit = self._parse_object(text)
+            if outfit is not None:
+                completed.append(outfit)
+        return completed
+    
+    def finish(self) -> List[dict]:
+        """
+        Outfits the incremental pass could not see.
         
-        raw = response.text.strip()
-        
-        # Parse JSON
+        Only used when nothing was emitted while streaming, e.g. when the
+        model wrapped the document in an unexpected shape.
+        """
+        if self.count:
+            return []
         try:
-            data = json.loads(raw)
-        except:
-            cleaned = _clean_json(raw)
-            data = json.loads(cleaned)
-        
-        return _normalize_outfits(data)
-        
-    except Exception as e:
-        return {"error": f"Gemini error: {e}", "outfits": []}
+            outfits = _parse_outfits("".join(self._text))["outfits"]
+        except Exception:
+            return []
+        self.count = len(outfits)
+        return outfits
+    
+    def _parse_object(self, text: str) -> Optional[dict]:
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return None
+        outfit = _normalize_outfit(data, self.count + 1)
+        if outfit is not None:
+            self.count += 1
+        return outfit
 
 
-def _ollama_suggestion(
-    item: str, vibe: str, gender: str,
-    age_group: Optional[str], skin_colour: Optional[str],
-    num_ideas: int, more_details: Optional[str],
-    layering_preference: str, wardrobe: Optional[Dict]
-) -> dict:
-    """Get outfit suggestions from Ollama."""
+async def stream_style_suggestion(
+    item: str,
+    vibe: str,
+    gender: str,
+    age_group: Optional[str] = None,
+    skin_colour: Optional[str] = None,
+    num_ideas: int = 1,
+    more_details: Optional[str] = None,
+    layering_preference: str = "AI Decides",
+    wardrobe: Optional[Dict[str, List[str]]] = None,
+    provider: str = "groq",
+    model_name: str = None,
+) -> AsyncIterator[dict]:
+    """
+    Stream outfit suggestions as they are generated.
+    
+    Takes the same arguments as `get_style_suggestion` and yields events:
+    {"type": "outfit", "outfit": {...}} for each outfit as soon as its JSON
+    object closes, then {"type": "done", "count": n} or
+    {"type": "error", "error": "..."}.
+    """
+    cached, cache_key, partition = await _cached_suggestion(
+        item, vibe, gender, age_group, skin_colour, num_ideas,
+        more_details, layering_preference, wardrobe, provider, model_name
+    )
+    if cached is not None:
+        for outfit in cached["outfits"]:
+            yield {"type": "outfit", "outfit": outfit}
+        yield {"type": "done", "count": len(cached["outfits"])}
+        return
+    
     prompt = _build_prompt(
         item, vibe, gender, age_group, skin_colour,
         num_ideas, more_details, layering_preference, wardrobe
     )
+    requested = provider
+    if provider == "auto" or (LLM_FAILOVER_ENABLED and provider in PROVIDER_REGISTRY):
+        # A started stream cannot fail over, so only the breaker check applies
+        provider = pick_provider(_failover_order(provider)) or ""
+        if provider != requested:
+            model_name = None
+        if not provider:
+            yield {"type": "error", "error": "All AI providers are unavailable right now."}
+            return
     
-    payload = {
-        "model": DEFAULT_OLLAMA_MODEL,
-        "prompt": prompt,
-        "stream": False,
-        "format": "json"
-    }
+    spec = get_provider(provider)
+    if spec is None:
+        yield {"type": "error", "error": f"Unknown provider: {provider}"}
+        return
     
+    health = get_health(provider)
+    model = spec.resolve_model(model_name)
+    # Until the provider is called, every way out (rate limited, busy, or the
+    # client going away while waiting) frees the probe slot without a verdict
     try:
-        response = requests.post(OLLAMA_URL, json=payload, timeout=90)
-        response.raise_for_status()
-        data = response.json()
-        raw = data.get('response', '') if isinstance(data, dict) else ''
-        
-        # Parse JSON
+        reservation = await reserve(provider, model, estimate_request_tokens(prompt))
+        await spec.pool.acquire()
+    except RateLimited as e:
+        health.release_probe()
+        yield {"type": "error", "error": str(e), "retry_after": e.retry_after}
+        return
+    except ProviderBusy as e:
+        health.release_probe()
+        yield {"type": "error", "error": str(e)}
+        return
+    except BaseException:
+        health.release_probe()
+        raise
+    
+    parser = _OutfitStreamParser()
+    outfits = []
+    with track_usage(reservation):
+        start = time.perf_counter()
         try:
-            result = json.loads(raw)
-        except:
-            cleaned = _clean_json(raw)
-            result = json.loads(cleaned)
-        
-        return _normalize_outfits(result)
-        
-    except Exception as e:
-        return {"error": f"Ollama error: {e}", "outfits": []}
+            async for chunk in spec.stream(prompt, model_name):
+                for outfit in parser.feed(chunk):
+                    outfits.append(outfit)
+                    yield {"type": "outfit", "outfit": outfit}
+        except Exception as e:
+            elapsed = time.perf_counter() - start
+            error = _provider_error(spec.label, e)
+            if error.get("retry_after") is not None:
+                health.release_probe()
+            else:
+                health.record(False, elapsed)
+            observe_llm(provider, model, elapsed, False)
+            yield {"type": "error", **{k: v for k, v in error.items() if k != "outfits"}}
+            return
+        except BaseException:
+            # Client went away mid-stream; no verdict on the provider
+            health.release_probe()
+            raise
+        finally:
+            spec.pool.release()
+    
+    for outfit in parser.finish():
+        outfits.append(outfit)
+        yield {"type": "outfit", "outfit": outfit}
+    
+    elapsed = time.perf_counter() - start
+    health.record(bool(outfits), elapsed)
+    observe_llm(provider, model, elapsed, bool(outfits))
+    if not outfits:
+        yield {"type": "error", "error": "Failed to generate outfits"}
+        return
+    
+    await _store_suggestion(cache_key, partition, item, vibe, {"outfits": outfits}, requested, provider)
+    yield {"type": "done", "count": len(outfits)}
+
+
+async def _groq_stream(prompt: str, model_name: Optional[str]) -> AsyncIterator[str]:
+    """Yield Groq completion text deltas."""
+    if not GROQ_AVAILABLE:
+        raise RuntimeError("Groq not configured. Set GROQ_API_KEY.")
+    request = _groq_request(prompt, model_name)
+    # Groq's JSON mode does not support streaming; the prompt already asks
+    # for JSON only and the stream parser tolerates stray text.
+    request.pop("response_format", None)
+    stream = await _get_async_groq_client().chat.completions.create(**request, stream=True)
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+        # Groq reports usage on the final chunk under x_groq
+        x_groq = getattr(chunk, "x_groq", None)
+        if getattr(x_groq, "usage", None) is not None:
+            _record_usage("groq", model_name, x_groq)
+
+
+async def _gemini_stream(prompt: str, model_name: Optional[str]) -> AsyncIterator[str]:
+    """Yield Gemini response text chunks."""
+    if not GEMINI_AVAILABLE:
+        raise RuntimeError("Gemini not configured. Set GEMINI_API_KEY.")
+    if not model_name or model_name not in GEMINI_MODELS:
+        model_name = DEFAULT_GEMINI_MODEL
+    response = await _get_gemini_model(model_name).generate_content_async(
+        prompt, generation_config=_gemini_generation_config(), stream=True
+    )
+    usage_source = None
+    async for chunk in response:
+        if chunk.text:
+            yield chunk.text
+        usage_source = chunk
+    # usage_metadata is cumulative; the last chunk carries the totals
+    if usage_source is not None:
+        _record_usage("gemini", model_name, usage_source)
+
+
+async def _ollama_stream(prompt: str, model_name: Optional[str] = None) -> AsyncIterator[str]:
+    """Yield Ollama response fragments from its NDJSON stream."""
+    async for data in ollama.stream(prompt, model_name):
+        if data.get("response"):
+            yield data["response"]
+        if data.get("done"):
+            _record_usage("ollama", model_name, data)
+
+
+# --- Provider registry ---
+# The lambdas look the call functions up at call time, so they can be
+# swapped out (loadtest.py replaces them with fakes).
+register_provider(Provider(
+    name="groq",
+    label="Groq",
+    display_name="Groq (LLaMA 3.3 70B)",
+    models=GROQ_MODELS,
+    default_model=DEFAULT_GROQ_MODEL,
+    generate_async=lambda prompt, model_name: _groq_suggestion_async(prompt, model_name),
+    stream=lambda prompt, model_name: _groq_stream(prompt, model_name),
+    max_concurrency=GROQ_MAX_CONCURRENCY,
+    max_queue=GROQ_QUEUE_DEPTH,
+    available=lambda: GROQ_AVAILABLE,
+))
+register_provider(Provider(
+    name="gemini",
+    label="Gemini",
+    display_name="Google Gemini",
+    models=GEMINI_MODELS,
+    default_model=DEFAULT_GEMINI_MODEL,
+    generate_async=lambda prompt, model_name: _gemini_suggestion_async(prompt, model_name),
+    stream=lambda prompt, model_name: _gemini_stream(prompt, model_name),
+    max_concurrency=GEMINI_MAX_CONCURRENCY,
+    max_queue=GEMINI_QUEUE_DEPTH,
+    available=lambda: GEMINI_AVAILABLE,
+))
+register_provider(Provider(
+    name="ollama",
+    label="Ollama",
+    display_name="Ollama (Local)",
+    models=OLLAMA_MODEL_NAMES,
+    default_model=DEFAULT_OLLAMA_MODEL,
+    generate_async=lambda prompt, model_name: _ollama_suggestion_async(prompt, model_name),
+    stream=lambda prompt, model_name: _ollama_stream(prompt, model_name),
+    max_concurrency=OLLAMA_MAX_CONCURRENCY,
+    max_queue=OLLAMA_QUEUE_DEPTH,
+))
 
 
 def _build_prompt(
@@ -307,14 +967,7 @@ def _build_prompt(
     
     # Wardrobe constraint
     if wardrobe:
-        parts.extend([
-            "\n**WARDROBE CONSTRAINT:**",
-            "You MUST ONLY use items from these lists:",
-            f"- CLOTHING: {', '.join(wardrobe.get('clothing', []) or ['(none)'])}",
-            f"- ACCESSORIES: {', '.join(wardrobe.get('accessory', []) or ['(none)'])}",
-            f"- FOOTWEAR: {', '.join(wardrobe.get('footwear', []) or ['(none)'])}",
-            "If empty, do your best with available categories.",
-        ])
+        parts.append(_wardrobe_block(wardrobe, item, vibe))
     
     # Output format
     parts.extend([
@@ -339,39 +992,35 @@ def _build_prompt(
     return "\n".join(parts)
 
 
-def _clean_json(text: str) -> str:
-    """Clean LLM JSON output (remove markdown, comments, trailing commas)."""
-    if not isinstance(text, str):
-        return '{}'
-    
-    s = text.strip()
-    
-    # Remove code fences
-    if '```' in s:
-        parts = s.split('```')
-        for block in parts:
-            block = block.strip()
-            if block.lower().startswith('json'):
-                block = block[4:].strip()
-            if block.startswith('{') and block.endswith('}'):
-                s = block
-                break
-    
-    # Extract JSON object if surrounded by text
-    if not (s.startswith('{') and s.endswith('}')):
-        first = s.find('{')
-        last = s.rfind('}')
-        if first != -1 and last != -1 and last > first:
-            s = s[first:last+1]
-    
-    # Remove comments
-    s = re.sub(r"^\s*//.*$", "", s, flags=re.MULTILINE)
-    s = re.sub(r"/\*.*?\*/", "", s, flags=re.DOTALL)
-    
-    # Remove trailing commas
-    s = re.sub(r",(\s*[}\]])", r"\1", s)
+def _wardrobe_block(wardrobe, item: str, vibe: str) -> str:
+    """
+    WARDROBE CONSTRAINT block for a request.
     
-    return s
+    Small wardrobes are listed in full (a WardrobeSnapshot carries that
+    pre-rendered); large ones are pruned to the items most relevant to
+    the base item and vibe.
+    """
+    index = getattr(wardrobe, "index", None)
+    if not isinstance(index, WardrobeIndex):
+        index = None
+    if index is None and not hasattr(wardrobe, "prompt_text"):
+        if needs_pruning([name for names in wardrobe.values() for name in (names or [])]):
+            index = WardrobeIndex.from_buckets(wardrobe)
+    if index is not None:
+        return render_wardrobe_block(index.select_buckets(item, vibe))
+    return getattr(wardrobe, "prompt_text", None) or render_wardrobe_block(wardrobe)
+
+
+def render_wardrobe_block(wardrobe: Dict[str, List[str]]) -> str:
+    """The WARDROBE CONSTRAINT section of the prompt."""
+    return "\n".join([
+        "\n**WARDROBE CONSTRAINT:**",
+        "You MUST ONLY use items from these lists:",
+        f"- CLOTHING: {', '.join(wardrobe.get('clothing', []) or ['(none)'])}",
+        f"- ACCESSORIES: {', '.join(wardrobe.get('accessory', []) or ['(none)'])}",
+        f"- FOOTWEAR: {', '.join(wardrobe.get('footwear', []) or ['(none)'])}",
+        "If empty, do your best with available categories.",
+    ])
 
 
 def _normalize_outfits(data: dict) -> dict:
@@ -384,6 +1033,19 @@ def _normalize_outfits(data: dict) -> dict:
     if not isinstance(outfits, list):
         return result
     
+    for idx, outfit in enumerate(outfits, start=1):
+        normalized = _normalize_outfit(outfit, idx)
+        if normalized is not None:
+            result["outfits"].append(normalized)
+    
+    return result
+
+
+def _normalize_outfit(outfit: dict, idx: int) -> Optional[dict]:
+    """Normalize a single outfit object; `idx` is the fallback id."""
+    if not isinstance(outfit, dict):
+        return None
+    
     def _coerce_item(d):
         if not isinstance(d, dict):
             return {"name": "", "reason": ""}
@@ -394,46 +1056,38 @@ def _normalize_outfits(data: dict) -> dict:
             "reason": "" if reason is None else str(reason)
         }
     
-    for idx, outfit in enumerate(outfits, start=1):
-        if not isinstance(outfit, dict):
-            continue
-        
-        item1 = _coerce_item(outfit.get("item1"))
-        item2 = _coerce_item(outfit.get("item2"))
-        footwear = _coerce_item(outfit.get("footwear"))
-        
-        outfit_id = outfit.get("id", idx)
-        try:
-            outfit_id = int(outfit_id)
-        except:
-            outfit_id = idx
-        
-        result["outfits"].append({
-            "id": outfit_id,
-            "item1": item1,
-            "item2": item2,
-            "footwear": footwear,
-        })
+    outfit_id = outfit.get("id", idx)
+    try:
+        outfit_id = int(outfit_id)
+    except:
+        outfit_id = idx
     
-    return result
+    return {
+        "id": outfit_id,
+        "item1": _coerce_item(outfit.get("item1")),
+        "item2": _coerce_item(outfit.get("item2")),
+        "footwear": _coerce_item(outfit.get("footwear")),
+    }
 
 
 def get_available_models() -> dict:
-    """Get available models for each provider."""
-    return {
-        "groq": {
-            "available": GROQ_AVAILABLE,
-            "models": list(GROQ_MODELS.keys()),
-            "default": DEFAULT_GROQ_MODEL
-        },
-        "gemini": {
-            "available": GEMINI_AVAILABLE,
-            "models": list(GEMINI_MODELS.keys()),
-            "default": DEFAULT_GEMINI_MODEL
-        },
-        "ollama": {
-            "available": True,
-            "models": [DEFAULT_OLLAMA_MODEL],
-            "default": DEFAULT_OLLAMA_MODEL
+    """
+    Models and live capacity of each registered provider.
+
+    `available` is true when the provider is configured, its circuit
+    breaker is not open and it can take another call right now.
+    """
+    models = {}
+    for name, spec in PROVIDER_REGISTRY.items():
+        health = get_health(name)
+        configured = spec.available()
+        models[name] = {
+            "name": spec.display_name,
+            "available": configured and health.weight() > 0 and spec.pool.has_room(),
+            "configured": configured,
+            "models": list(spec.models.keys()),
+            "default": spec.default_model,
+            "health": health.stats()["state"],
+            "capacity": spec.pool.stats(),
         }
-    }
+    return models
@@ -0,0 +1,339 @@
+#!/usr/bin/env python
+"""
+Offline load test for the DripMate API.
+
+Drives the app in-process (default) or a server on localhost with
+configurable concurrency. Groq/Gemini/Ollama and Gemini Vision are
+replaced by fake providers with lognormal latency, so no API keys or
+network access are needed. Reports p50/p95/p99 latency and throughput
+per endpoint and can diff the results against a stored baseline.
+
+Usage:
+    python loadtest.py                                  # in-process run
+    python loadtest.py --concurrency 50 --requests 500
+    python loadtest.py --save-baseline baseline.json
+    python loadtest.py --baseline baseline.json         # exit 1 on regression
+
+    python loadtest.py serve --port 8001                # app with fake providers
+    python loadtest.py --url http://localhost:8001      # drive that server
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+ENDPOINTS = ["chat", "upload-image", "wardrobe", "favorites", "login"]
+
+FAKE_OUTFITS = {
+    "outfits": [
+        {
+            "id": i,
+            "item1": {"name": f"Relaxed tee {i}", "reason": "Keeps the base item the focus."},
+            "item2": {"name": f"Straight-leg jeans {i}", "reason": "Balances the silhouette."},
+            "footwear": {"name": f"White sneakers {i}", "reason": "Clean and versatile."},
+        }
+        for i in range(1, 4)
+    ]
+}
+FAKE_VISION = {
+    "detected_item": {
+        "category": "clothing", "name": "black hoodie", "color": "black",
+        "pattern": "plain", "style": "streetwear", "season": "all-season",
+        "description": "A plain black pullover hoodie.",
+    },
+    "outfits": [{"name": "Street", "item1": {"name": "black hoodie", "id": None},
+                 "item2": {"name": "cargo pants", "id": None},
+                 "footwear": {"name": "high-tops", "id": None},
+                 "accessories": {"name": "none", "id": None}, "reason": "Classic."}],
+}
+
+
+def configure_environment(args) -> None:
+    """Point the app at a throwaway database before it is imported."""
+    workdir = tempfile.mkdtemp(prefix="dripmate_load_")
+    os.environ.setdefault("SECRET_KEY", "loadtest-secret-key")
+    os.environ["DRIPMATE_DB_URL"] = f"sqlite:///{os.path.join(workdir, 'load.db')}"
+    os.environ["CHAT_CACHE_PATH"] = ""
+    os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+    # Fake providers have no quota; configured limits would only throttle the run
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    os.environ.setdefault("OLLAMA_PRELOAD", "false")
+    if not args.cache:
+        os.environ["CHAT_CACHE_ENABLED"] = "false"
+        os.environ["VISION_CACHE_ENABLED"] = "false"
+        os.environ["SEMANTIC_CACHE_ENABLED"] = "false"
+        os.environ["COALESCE_REQUESTS"] = "false"
+
+
+def install_fake_providers(median_ms: float, sigma: float, error_rate: float, patch=setattr) -> None:
+    """
+    Replace every upstream model call with a fake of the given latency.
+
+    Tests pass `monkeypatch.setattr` as `patch` so the real calls come back afterwards.
+    """
+    import llm
+    import vision
+
+    def delay() -> float:
+        return random.lognormvariate(0, sigma) * median_ms / 1000
+
+    def maybe_fail(name: str) -> None:
+        if random.random() < error_rate:
+            raise RuntimeError(f"fake {name} failure")
+
+    async def fake_suggestion(prompt, model_name=None, provider="fake"):
+        await asyncio.sleep(delay())
+        try:
+            maybe_fail(provider)
+        except RuntimeError as e:
+            return {"error": str(e), "outfits": []}
+        return llm._parse_outfits(json.dumps(FAKE_OUTFITS))
+
+    async def fake_stream(prompt, model_name=None):
+        maybe_fail("stream")
+        text = json.dumps(FAKE_OUTFITS)
+        step = max(1, len(text) // 20)
+        for i in range(0, len(text), step):
+            await asyncio.sleep(delay() / 20)
+            yield text[i:i + step]
+
+    patch(llm, "GROQ_AVAILABLE", True)
+    patch(llm, "GEMINI_AVAILABLE", True)
+    patch(llm, "_groq_suggestion_async", lambda p, m=None: fake_suggestion(p, m, "groq"))
+    patch(llm, "_gemini_suggestion_async", lambda p, m=None: fake_suggestion(p, m, "gemini"))
+    patch(llm, "_ollama_suggestion_async", lambda p, m=None: fake_suggestion(p, m, "ollama"))
+    for name in ("_groq_stream", "_gemini_stream", "_ollama_stream"):
+        patch(llm, name, fake_stream)
+
+    class FakeResponse:
+        def __init__(self, text):
+            self.text = text
+
+    class FakeVisionModel:
+        def generate_content(self, parts):
+            time.sleep(delay())
+            maybe_fail("vision")
+            prompt = parts[0]
+            if prompt.startswith("Identify"):
+                return FakeResponse(json.dumps(FAKE_VISION))
+            if prompt.startswith("Analyze"):
+                return FakeResponse(json.dumps(FAKE_VISION["detected_item"]))
+            return FakeResponse(json.dumps({"outfits": FAKE_VISION["outfits"]}))
+
+    patch(vision, "_gemini_model", FakeVisionModel())
+
+
+def sample_image() -> bytes:
+    """A phone-sized JPEG so upload decoding and downscaling are exercised."""
+    from PIL import Image
+    buf = io.BytesIO()
+    Image.effect_noise((3000, 2000), 40).convert("RGB").save(buf, "JPEG", quality=85)
+    return buf.getvalue()
+
+
+def percentile(values, pct: float) -> float:
+    """Linear-interpolated percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+class LoadTest:
+    """Runs each endpoint as its own phase and collects latencies."""
+
+    def __init__(self, client, args):
+        self.client = client
+        self.args = args
+        self.users = []
+        self.image = sample_image()
+
+    async def setup(self) -> None:
+        """Create users with a small wardrobe and some favorites."""
+        for _ in range(self.args.users):
+            email = f"load-{uuid.uuid4().hex[:10]}@example.com"
+            r = await self.client.post("/signup", json={
+                "name": "Load", "email": email, "password": "load-password", "gender": "male",
+            })
+            r.raise_for_status()
+            headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+            for i in range(self.args.wardrobe_size):
+                category = ("clothing", "footwear", "accessory")[i % 3]
+                await self.client.post("/wardrobe", headers=headers, json={
+                    "category": category, "name": f"{category} item {i}",
+                    "color": random.choice(["black", "white", "blue"]), "season": "all-season",
+                })
+            for i in range(self.args.favorites):
+                await self.client.post("/favorites", headers=headers, json={
+                    "title": f"Look {i}", "source_item": "hoodie", "vibe": "street",
+                    "payload": FAKE_OUTFITS["outfits"][0],
+                })
+            self.users.append((email, headers))
+
+    def request_for(self, endpoint: str, n: int):
+        """The n-th request for an endpoint, spread across the test users."""
+        email, headers = self.users[n % len(self.users)]
+        if endpoint == "chat":
+            return self.client.post("/chat", headers=headers, json={
+                "item": f"hoodie {n}", "vibe": "streetwear", "num_ideas": 3,
+                "use_wardrobe_only": n % 2 == 0,
+            })
+        if endpoint == "upload-image":
+            return self.client.post(
+                "/upload-image", headers=headers,
+                files={"file": ("photo.jpg", self.image, "image/jpeg")},
+                data={"use_wardrobe": "true"},
+            )
+        if endpoint == "wardrobe":
+            return self.client.get("/wardrobe", headers=headers)
+        if endpoint == "favorites":
+            return self.client.get("/favorites", headers=headers)
+        if endpoint == "login":
+            return self.client.post("/login", json={"email": email, "password": "load-password"})
+        raise ValueError(endpoint)
+
+    async def run_endpoint(self, endpoint: str) -> dict:
+        """Send --requests requests from --concurrency workers and summarize."""
+        latencies, errors = [], 0
+        counter = iter(range(self.args.requests))
+        started = time.perf_counter()
+
+        async def worker():
+            nonlocal errors
+            for n in counter:
+                start = time.perf_counter()
+                try:
+                    r = await self.request_for(endpoint, n)
+                    if r.status_code >= 400:
+                        errors += 1
+                except Exception:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(worker() for _ in range(self.args.concurrency)))
+        wall = time.perf_counter() - started
+        ms = [v * 1000 for v in latencies]
+        return {
+            "requests": len(ms),
+            "errors": errors,
+            "p50_ms": round(percentile(ms, 50), 2),
+            "p95_ms": round(percentile(ms, 95), 2),
+            "p99_ms": round(percentile(ms, 99), 2),
+            "throughput_rps": round(len(ms) / wall, 2) if wall else 0.0,
+        }
+
+
+def print_report(results: dict) -> None:
+    """Per-endpoint latency/throughput table."""
+    print(f"\n{'endpoint':<14}{'reqs':>7}{'errs':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}")
+    for endpoint, r in results.items():
+        print(f"{endpoint:<14}{r['requests']:>7}{r['errors']:>6}{r['p50_ms']:>10}"
+              f"{r['p95_ms']:>10}{r['p99_ms']:>10}{r['throughput_rps']:>10}")
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> bool:
+    """Print per-metric deltas against a baseline; True if nothing regressed."""
+    ok = True
+    print(f"\nvs baseline (tolerance {tolerance:.0%}):")
+    for endpoint, r in results.items():
+        base = baseline.get(endpoint)
+        if not base:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+            old, new = base.get(metric), r.get(metric)
+            if not old:
+                continue
+            change = (new - old) / old
+            worse = change < -tolerance if metric == "throughput_rps" else change > tolerance
+            ok &= not worse
+            flag = "  REGRESSION" if worse else ""
+            print(f"  {endpoint:<14}{metric:<16}{old:>10} -> {new:<10} ({change:+.1%}){flag}")
+    return ok
+
+
+async def run(args) -> dict:
+    """Set up the client (in-process or --url), seed data and run every phase."""
+    import httpx
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=120)
+    else:
+        configure_environment(args)
+        from main import app
+        from db import init_db
+        init_db()   # ASGITransport does not run the app's lifespan
+        install_fake_providers(args.latency_ms, args.latency_sigma, args.error_rate)
+        transport = httpx.ASGITransport(app=app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=120)
+
+    async with client:
+        test = LoadTest(client, args)
+        await test.setup()
+        results = {}
+        for endpoint in args.endpoints:
+            results[endpoint] = await test.run_endpoint(endpoint)
+            print(f"✓ {endpoint} done")
+    return results
+
+
+def serve(args) -> None:
+    """Run the app with fake providers so external tools can drive it."""
+    import uvicorn
+    configure_environment(args)
+    from main import app
+    install_fake_providers(args.latency_ms, args.latency_sigma, args.error_rate)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="DripMate offline load test")
+    parser.add_argument("mode", nargs="?", choices=["run", "serve"], default="run")
+    parser.add_argument("--url", help="Drive a running server instead of the in-process app")
+    parser.add_argument("--port", type=int, default=8001, help="Port for serve mode")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint")
+    parser.add_argument("--endpoints", nargs="+", default=ENDPOINTS, choices=ENDPOINTS)
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--wardrobe-size", type=int, default=30)
+    parser.add_argument("--favorites", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=800, help="Median fake provider latency")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Lognormal spread of fake latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of fake provider calls that fail")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--cache", action="store_true", help="Keep the response caches and request coalescing enabled")
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--baseline", metavar="PATH", help="Compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    if args.mode == "serve":
+        serve(args)
+        return 0
+
+    results = asyncio.run(run(args))
+    print_report(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✓ Baseline saved to {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
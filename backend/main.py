@@ -2,34 +2,122 @@
 DripMate - AI-Powered Fashion Assistant
 Backend with auth, wardrobe, and favorites.
 """
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, status
+import startup  # first, so the import timer covers everything below
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, Query, Header, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse, FileResponse
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, or_, func
 from sqlalchemy.orm import Session
-import tempfile
-import shutil
+from contextlib import asynccontextmanager
 import os
+import asyncio
 import json
+import math
+import base64
 from typing import Optional, List
-from datetime import timedelta
+from datetime import datetime, timedelta
 
-from db import get_db, init_db, User, WardrobeItem, FavoriteOutfit
+from config import (
+    MAX_UPLOAD_BYTES, PAGE_SIZE, MAX_PAGE_SIZE, PROFILING_ENABLED, PROFILE_DEBUG_TOKEN, CHAT_BATCH_CONCURRENCY,
+    PROVIDER_WARMUP, OLLAMA_PRELOAD,
+)
+from db import get_db, init_db_in_background, User, WardrobeItem, FavoriteOutfit
 from schemas import (
-    ChatRequest, ChatResponse, UserSignup, UserLogin, UserProfile, Token,
-    WardrobeItemCreate, WardrobeItemOut, FavoriteCreate, FavoriteOut
+    ChatRequest, ChatResponse, BatchChatRequest, BatchChatResponse, UserSignup, UserLogin, UserProfile, Token,
+    WardrobeItemCreate, WardrobeItemOut, FavoriteCreate, FavoriteOut, ItemCategory
+)
+from llm import (
+    get_style_suggestion_async, stream_style_suggestion,
+    get_available_models, get_cache_stats, get_semantic_cache_stats, get_coalescing_stats,
+    get_ollama_stats, close_clients, preload_ollama, warm_up as warm_up_llm
+)
+from vision import (
+    get_outfit_from_image_async, get_vision_cache_stats, get_upload_coalescing_stats, sniff_image_type,
+    warm_up as warm_up_vision
 )
-from llm import get_style_suggestion, get_available_models
-from vision import get_outfit_from_image
+from providers import get_pool_stats, get_sdk_stats
+from ratelimit import PRIORITY_BATCH, get_rate_limit_stats, request_priority
+from routing import get_provider_stats
+from metrics import MetricsMiddleware, render_metrics
+from responses import FastJSONResponse
+from wardrobe import get_wardrobe_snapshot, bump_wardrobe_version, get_wardrobe_stats
 from auth import (
-    get_password_hash, verify_password, create_access_token,
-    get_current_user, ACCESS_TOKEN_EXPIRE_MINUTES
+    get_password_hash_async, verify_password_async, create_access_token,
+    CurrentUser, get_current_user, get_user_cache_stats,
+    password_hasher, ACCESS_TOKEN_EXPIRE_MINUTES
 )
+from passwords import HasherBusy
+
+
+startup.mark("imports")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start serving immediately: the schema is created and providers warmed
+    up in the background, and local Ollama models loaded. Release pooled
+    clients and the bcrypt pool on shutdown.
+    """
+    startup.print_import_report()
+    init_db_in_background(on_done=lambda: startup.mark("database"))
+    background = []
+    if PROVIDER_WARMUP:
+        background.append(asyncio.create_task(_warm_up_providers()))
+    if OLLAMA_PRELOAD:
+        background.append(asyncio.create_task(preload_ollama()))
+    yield
+    for task in background:
+        task.cancel()
+    await close_clients()
+    password_hasher.shutdown()
+
+
+async def _warm_up_providers():
+    """Import provider SDKs and build their clients before the first request needs them."""
+    try:
+        await asyncio.to_thread(warm_up_llm)
+        await asyncio.to_thread(warm_up_vision)
+    except Exception as e:
+        print(f"⚠ Provider warm-up failed: {e}")
+        return
+    startup.mark("providers")
+
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class UploadSizeLimitMiddleware:
+    """Reject uploads whose declared Content-Length exceeds MAX_UPLOAD_BYTES before the body is read."""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] == "/upload-image":
+            length = dict(scope["headers"]).get(b"content-length")
+            # Multipart framing adds a little on top of the file itself
+            if length and length.isdigit() and int(length) > MAX_UPLOAD_BYTES + UPLOAD_CHUNK_SIZE:
+                response = JSONResponse({"detail": "Image too large"}, status_code=413)
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
 
 # Initialize FastAPI
 app = FastAPI(
     title="DripMate API",
     description="AI-Powered Fashion Assistant with Gemini",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan,
 )
+app.add_middleware(UploadSizeLimitMiddleware)
+
+# Sampling profiler: not installed at all unless configured
+if PROFILING_ENABLED:
+    from profiler import ProfilerMiddleware, list_profiles, profile_path, check_debug_token
+    app.add_middleware(ProfilerMiddleware)
 
 # CORS - Allow frontend access
 allowed_origins = os.getenv("ALLOWED_ORIGINS", "*").split(",")
@@ -39,11 +127,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Profile-Id"],
 )
-
-# Initialize database
-init_db()
-
+# Outermost, so the timings include the other middleware
+app.add_middleware(MetricsMiddleware)
 
 @app.get("/")
 def root():
@@ -59,23 +146,21 @@ def root():
 # === AUTH ===
 
 @app.post("/signup", response_model=Token)
-def signup(user_data: UserSignup, db: Session = Depends(get_db)):
+async def signup(user_data: UserSignup, db: Session = Depends(get_db)):
     """Register new user."""
-    existing = db.query(User).filter(User.email == user_data.email).first()
+    existing = await run_in_threadpool(_find_user, db, user_data.email)
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
     
     new_user = User(
         name=user_data.name,
         email=user_data.email,
-        hashed_password=get_password_hash(user_data.password),
+        hashed_password=await _hash_or_503(get_password_hash_async(user_data.password)),
         gender=user_data.gender,
         age_group=user_data.age_group,
         skin_colour=user_data.skin_colour
     )
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await run_in_threadpool(_save, db, new_user)
     
     token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     token = create_access_token(data={"sub": new_user.email}, expires_delta=token_expires)
@@ -84,11 +169,19 @@ def signup(user_data: UserSignup, db: Session = Depends(get_db)):
 
 
 @app.post("/login", response_model=Token)
-def login(user_data: UserLogin, db: Session = Depends(get_db)):
+async def login(user_data: UserLogin, db: Session = Depends(get_db)):
     """Login user."""
-    user = db.query(User).filter(User.email == user_data.email).first()
-    if not user or not verify_password(user_data.password, user.hashed_password):
+    user = await run_in_threadpool(_find_user, db, user_data.email)
+    if not user:
         raise HTTPException(status_code=401, detail="Incorrect email or password")
+    valid, new_hash = await _hash_or_503(verify_password_async(user_data.password, user.hashed_password))
+    if not valid:
+        raise HTTPException(status_code=401, detail="Incorrect email or password")
+    
+    if new_hash:
+        # BCRYPT_ROUNDS changed since this hash was made; upgrade it in place
+        user.hashed_password = new_hash
+        await run_in_threadpool(_save, db, user)
     
     token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     token = create_access_token(data={"sub": user.email}, expires_delta=token_expires)
@@ -96,8 +189,32 @@ def login(user_data: UserLogin, db: Session = Depends(get_db)):
     return {"access_token": token, "token_type": "bearer"}
 
 
+def _find_user(db: Session, email: str) -> Optional[User]:
+    """User by email, or None."""
+    return db.query(User).filter(User.email == email).first()
+
+
+def _save(db: Session, obj) -> None:
+    """Add, commit and refresh a row."""
+    db.add(obj)
+    db.commit()
+    db.refresh(obj)
+
+
+async def _hash_or_503(job):
+    """Await a password job, turning a full bcrypt queue into a 503."""
+    try:
+        return await job
+    except HasherBusy:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many sign-in attempts right now, please retry",
+            headers={"Retry-After": "1"},
+        )
+
+
 @app.get("/profile", response_model=UserProfile)
-def get_profile(current_user: User = Depends(get_current_user)):
+def get_profile(current_user: CurrentUser = Depends(get_current_user)):
     """Get user profile."""
     return current_user
 
@@ -105,48 +222,170 @@ def get_profile(current_user: User = Depends(get_current_user)):
 def health_check():
     return {"status": "ok"}
 
+
+@app.get("/stats")
+def stats():
+    """Runtime counters (caches, queues)."""
+    return {
+        "chat_cache": get_cache_stats(),
+        "semantic_cache": get_semantic_cache_stats(),
+        "coalescing": {"chat": get_coalescing_stats(), "upload": get_upload_coalescing_stats()},
+        "vision_cache": get_vision_cache_stats(),
+        "user_cache": get_user_cache_stats(),
+        "wardrobe_snapshots": get_wardrobe_stats(),
+        "password_hasher": password_hasher.stats(),
+        "providers": get_provider_stats(),
+        "provider_pools": get_pool_stats(),
+        "ollama": get_ollama_stats(),
+        "rate_limits": get_rate_limit_stats(),
+        "sdks": get_sdk_stats(),
+        "startup": startup.get_startup_stats(),
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus metrics (latency histograms, token counts, JSON repairs)."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+# Profiles expose code paths and arguments; only served behind a token
+if PROFILING_ENABLED and PROFILE_DEBUG_TOKEN:
+    @app.get("/debug/profiles")
+    def debug_profiles(x_debug_profile: Optional[str] = Header(None)):
+        """Recent request profiles, newest first."""
+        if not check_debug_token(x_debug_profile):
+            raise HTTPException(status_code=403, detail="Invalid debug token")
+        return {"profiles": list_profiles()}
+
+    @app.get("/debug/profiles/{name}")
+    def debug_profile(name: str, x_debug_profile: Optional[str] = Header(None)):
+        """Download one profile as folded stacks."""
+        if not check_debug_token(x_debug_profile):
+            raise HTTPException(status_code=403, detail="Invalid debug token")
+        path = profile_path(name)
+        if not path:
+            raise HTTPException(status_code=404, detail="Profile not found")
+        return FileResponse(path, media_type="text/plain", filename=name)
+
 # === CHAT ===
 
 @app.post("/chat", response_model=ChatResponse)
-def chat(
+async def chat(
     request: ChatRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get AI outfit suggestions using user profile."""
-    # Use user profile as defaults
-    gender = request.gender or current_user.gender
-    age_group = request.age_group or current_user.age_group
-    skin_colour = request.skin_colour or current_user.skin_colour
+    suggestion_args = await _suggestion_args(request, current_user, db)
+    result = await get_style_suggestion_async(**suggestion_args)
     
-    # Get wardrobe if requested
+    if not result.get("outfits"):
+        _raise_if_rate_limited(result)
+        raise HTTPException(status_code=500, detail=result.get("error", "Failed to generate outfits"))
+    
+    # The LLM layer already normalized every outfit to the ChatResponse
+    # shape; skip re-validating it
+    return FastJSONResponse({"outfits": result["outfits"]})
+
+
+@app.post("/chat/stream")
+async def chat_stream(
+    request: ChatRequest,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Stream AI outfit suggestions as NDJSON.
+    
+    One JSON object per line: {"type": "outfit", "outfit": {...}} as each
+    outfit is generated, then {"type": "done", "count": n} or
+    {"type": "error", "error": "..."}.
+    """
+    suggestion_args = await _suggestion_args(request, current_user, db)
+    
+    async def events():
+        async for event in stream_style_suggestion(**suggestion_args):
+            yield json.dumps(event) + "\n"
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@app.post("/chat/batch", response_model=BatchChatResponse)
+async def chat_batch(
+    batch: BatchChatRequest,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get outfit suggestions for several requests at once.
+    
+    The user and wardrobe are resolved once and the generations run
+    concurrently (at most CHAT_BATCH_CONCURRENCY at a time). Results come
+    back in request order; a failed item carries an error instead of
+    failing the whole batch.
+    """
     wardrobe = None
-    if request.use_wardrobe_only:
-        items = db.query(WardrobeItem).filter(WardrobeItem.user_id == current_user.id).all()
-        wardrobe = {
-            "clothing": [i.name for i in items if i.category.value == "clothing"],
-            "accessory": [i.name for i in items if i.category.value == "accessory"],
-            "footwear": [i.name for i in items if i.category.value == "footwear"],
-        }
+    if any(request.use_wardrobe_only for request in batch.requests):
+        wardrobe = await run_in_threadpool(get_wardrobe_snapshot, db, current_user.id)
     
-    result = get_style_suggestion(
-        item=request.item,
-        vibe=request.vibe,
-        gender=gender,
-        age_group=age_group,
-        skin_colour=skin_colour,
-        num_ideas=request.num_ideas,
-        more_details=request.more_details,
-        layering_preference=request.layering_preference,
-        wardrobe=wardrobe,
-        provider=request.ai_provider,
-        model_name=request.model,
-    )
+    semaphore = asyncio.Semaphore(min(batch.concurrency or CHAT_BATCH_CONCURRENCY, CHAT_BATCH_CONCURRENCY))
     
-    if not result.get("outfits"):
-        raise HTTPException(status_code=500, detail=result.get("error", "Failed to generate outfits"))
+    async def generate(index: int, request: ChatRequest) -> dict:
+        async with semaphore:
+            try:
+                result = await get_style_suggestion_async(
+                    **_build_suggestion_args(request, current_user, wardrobe)
+                )
+            except Exception as e:
+                result = {"error": f"Failed to generate outfits: {e}", "outfits": []}
+        if not result.get("outfits"):
+            return {"index": index, "outfits": [], "error": result.get("error", "Failed to generate outfits")}
+        try:
+            outfits = ChatResponse.model_validate(result).outfits
+        except ValueError as e:
+            return {"index": index, "outfits": [], "error": f"Malformed outfits: {e}"}
+        return {"index": index, "outfits": outfits}
     
-    return result
+    # Batch items queue behind interactive requests for rate-limit budget
+    with request_priority(PRIORITY_BATCH):
+        results = await asyncio.gather(*(generate(i, r) for i, r in enumerate(batch.requests)))
+    return {"results": results}
+
+
+def _raise_if_rate_limited(result: dict) -> None:
+    """Turn a rate-limited LLM result into a 429 with Retry-After."""
+    retry_after = result.get("retry_after")
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=429,
+            detail=result.get("error", "Rate limit reached"),
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+
+async def _suggestion_args(request: ChatRequest, current_user: CurrentUser, db: Session) -> dict:
+    """Keyword arguments for the LLM layer, using the user profile as defaults."""
+    # Get wardrobe if requested
+    wardrobe = None
+    if request.use_wardrobe_only:
+        wardrobe = await run_in_threadpool(get_wardrobe_snapshot, db, current_user.id)
+    return _build_suggestion_args(request, current_user, wardrobe)
+
+
+def _build_suggestion_args(request: ChatRequest, current_user: CurrentUser, wardrobe) -> dict:
+    """`_suggestion_args` with the wardrobe snapshot already loaded (or None)."""
+    return {
+        "item": request.item,
+        "vibe": request.vibe,
+        "gender": request.gender or current_user.gender,
+        "age_group": request.age_group or current_user.age_group,
+        "skin_colour": request.skin_colour or current_user.skin_colour,
+        "num_ideas": request.num_ideas,
+        "more_details": request.more_details,
+        "layering_preference": request.layering_preference,
+        "wardrobe": wardrobe if request.use_wardrobe_only else None,
+        "provider": request.ai_provider,
+        "model_name": request.model,
+    }
 
 
 @app.post("/upload-image")
@@ -154,7 +393,7 @@ async def upload_image(
     file: UploadFile = File(...),
     prompt: Optional[str] = Form(None),
     use_wardrobe: bool = Form(False),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Upload image for outfit suggestions."""
@@ -162,76 +401,93 @@ async def upload_image(
     if file.content_type not in ALLOWED:
         raise HTTPException(status_code=400, detail="Invalid file type")
     
-    tmpdir = tempfile.mkdtemp(prefix="dripmate_")
-    try:
-        ext = {
-            "image/jpeg": ".jpg",
-            "image/png": ".png",
-            "image/webp": ".webp"
-        }[file.content_type]
-        
-        tmp_path = os.path.join(tmpdir, f"upload{ext}")
-        with open(tmp_path, "wb") as f:
-            shutil.copyfileobj(file.file, f)
-        
-        wardrobe_items = None
-        if use_wardrobe:
-            items = db.query(WardrobeItem).filter(WardrobeItem.user_id == current_user.id).all()
-            wardrobe_items = [
-                {"id": i.id, "category": i.category.value, "name": i.name, "color": i.color}
-                for i in items
-            ]
-        
-        result = get_outfit_from_image(tmp_path, user_prompt=prompt, wardrobe_items=wardrobe_items)
-        return result
-    finally:
-        try:
-            shutil.rmtree(tmpdir)
-        except:
-            pass
+    # Read in chunks so oversized uploads and non-images are rejected early
+    chunks = []
+    size = 0
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        if not chunks and sniff_image_type(chunk[:16]) not in ALLOWED:
+            raise HTTPException(status_code=400, detail="Invalid file type")
+        size += len(chunk)
+        if size > MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail="Image too large")
+        chunks.append(chunk)
+    if not chunks:
+        raise HTTPException(status_code=400, detail="Empty file")
+    data = b"".join(chunks)
+    
+    wardrobe_items = None
+    if use_wardrobe:
+        snapshot = await run_in_threadpool(get_wardrobe_snapshot, db, current_user.id)
+        wardrobe_items = snapshot if snapshot.items else None
+    
+    # Decoding and the Gemini round-trip run on a worker thread; identical
+    # uploads in flight share one call
+    result = await get_outfit_from_image_async(data, user_prompt=prompt, wardrobe_items=wardrobe_items)
+    _raise_if_rate_limited(result)
+    return result
 
 
 @app.get("/models")
 def models():
-    """Get available AI models."""
-    available = get_available_models()
-    return {
+    """Get available AI models and each provider's live capacity."""
+    return FastJSONResponse({
         "default_provider": "groq",
-        "providers": {
-            "groq": {
-                "name": "Groq (LLaMA 3.3 70B)",
-                "available": available["groq"]["available"],
-                "models": available["groq"]["models"],
-                "default": available["groq"]["default"]
-            },
-            "gemini": {
-                "name": "Google Gemini",
-                "available": available["gemini"]["available"],
-                "models": available["gemini"]["models"],
-                "default": available["gemini"]["default"],
-            },
-            "ollama": {
-                "name": "Ollama (Local)",
-                "available": available["ollama"]["available"],
-                "models": available["ollama"]["models"],
-                "default": available["ollama"]["default"],
-            }
-        }
-    }
+        "providers": get_available_models(),
+    })
 
 
 # === WARDROBE ===
 
 @app.get("/wardrobe", response_model=List[WardrobeItemOut])
-def get_wardrobe(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Get all wardrobe items."""
-    return db.query(WardrobeItem).filter(WardrobeItem.user_id == current_user.id).all()
+def get_wardrobe(
+    response: Response,
+    category: Optional[ItemCategory] = None,
+    season: Optional[str] = None,
+    color: Optional[str] = None,
+    name_prefix: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get wardrobe items, optionally filtered, one page at a time.
+    
+    season, color and name_prefix match case-insensitively. The cursor for
+    the next page is returned in the X-Next-Cursor header.
+    """
+    query = db.query(WardrobeItem).filter(WardrobeItem.user_id == current_user.id)
+    if category:
+        query = query.filter(WardrobeItem.category == category.value)
+    if season:
+        query = query.filter(func.lower(WardrobeItem.season) == season.lower())
+    if color:
+        query = query.filter(func.lower(WardrobeItem.color) == color.lower())
+    if name_prefix:
+        # Range instead of LIKE so the (user_id, lower(name)) index applies
+        prefix = name_prefix.lower()
+        query = query.filter(
+            func.lower(WardrobeItem.name) >= prefix,
+            func.lower(WardrobeItem.name) < prefix + "\uffff",
+        )
+    if cursor:
+        (after_id,) = _decode_cursor(cursor, int)
+        query = query.filter(WardrobeItem.id > after_id)
+    
+    items = query.order_by(WardrobeItem.id).limit(limit + 1).all()
+    if len(items) > limit:
+        items = items[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(items[-1].id)
+    return items
 
 
 @app.post("/wardrobe", response_model=WardrobeItemOut, status_code=201)
 def add_wardrobe_item(
     item: WardrobeItemCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Add wardrobe item."""
@@ -247,13 +503,14 @@ def add_wardrobe_item(
     db.add(new_item)
     db.commit()
     db.refresh(new_item)
+    bump_wardrobe_version(current_user.id)
     return new_item
 
 
 @app.delete("/wardrobe/{item_id}", status_code=204)
 def delete_wardrobe_item(
     item_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Delete wardrobe item."""
@@ -265,35 +522,105 @@ def delete_wardrobe_item(
         raise HTTPException(status_code=404, detail="Item not found")
     db.delete(item)
     db.commit()
+    bump_wardrobe_version(current_user.id)
 
 
 # === FAVORITES ===
 
 @app.get("/favorites")
-def get_favorites(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Get all favorites."""
-    favorites = db.query(FavoriteOutfit).filter(
-        FavoriteOutfit.user_id == current_user.id
-    ).order_by(FavoriteOutfit.created_at.desc()).all()
+def get_favorites(
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get favorites, newest first, one page at a time.
     
-    # Parse payload JSON string back to dict for each favorite
-    result = []
-    for fav in favorites:
-        result.append({
-            "id": fav.id,
-            "title": fav.title,
-            "source_item": fav.source_item,
-            "vibe": fav.vibe,
-            "payload": json.loads(fav.payload),
-            "created_at": fav.created_at
-        })
-    return result
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    """
+    query = db.query(
+        FavoriteOutfit.id, FavoriteOutfit.title, FavoriteOutfit.source_item,
+        FavoriteOutfit.vibe, FavoriteOutfit.payload, FavoriteOutfit.created_at
+    ).filter(FavoriteOutfit.user_id == current_user.id)
+    
+    if cursor:
+        created_at, fav_id = _decode_cursor(cursor, datetime, int)
+        query = query.filter(or_(
+            FavoriteOutfit.created_at < created_at,
+            and_(FavoriteOutfit.created_at == created_at, FavoriteOutfit.id < fav_id)
+        ))
+    
+    rows = query.order_by(
+        FavoriteOutfit.created_at.desc(), FavoriteOutfit.id.desc()
+    ).limit(limit + 1).all()
+    
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = _encode_cursor(rows[-1].created_at, rows[-1].id)
+    
+    # The stored payload is already JSON; splice it in rather than parsing
+    # and re-serializing every favorite
+    body = "[" + ",".join(
+        '{"id":%d,"title":%s,"source_item":%s,"vibe":%s,"payload":%s,"created_at":%s}' % (
+            row.id, _json(row.title), _json(row.source_item), _json(row.vibe),
+            row.payload, _json(row.created_at.isoformat())
+        )
+        for row in rows
+    ) + "]"
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _json(value) -> str:
+    """Encode a scalar the way JSONResponse would."""
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _encode_cursor(*values) -> str:
+    """Opaque pagination cursor for the last row of a page."""
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str, *types: type) -> tuple:
+    """
+    Inverse of `_encode_cursor`, checked against the value types an endpoint
+    expects (datetime values are parsed from their ISO form).
+    
+    The cursor must hold exactly one value of each type, so a cursor from
+    another endpoint is rejected rather than misread.
+    
+    Raises:
+        HTTPException: 400 if the cursor is malformed or has the wrong shape
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list):
+            raise ValueError("cursor is not a list")
+        if len(values) != len(types):
+            raise ValueError("wrong number of cursor values")
+        return tuple(_cursor_value(v, t) for v, t in zip(values, types))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _cursor_value(value, expected: type):
+    """One decoded cursor value, checked against the type the query needs."""
+    if expected is datetime:
+        if not isinstance(value, str):
+            raise ValueError("cursor timestamp is not a string")
+        return datetime.fromisoformat(value)
+    # bool is an int subclass; a cursor never holds one
+    if isinstance(value, bool) or not isinstance(value, expected):
+        raise ValueError(f"cursor value is not {expected.__name__}")
+    return value
 
 
 @app.post("/favorites", response_model=FavoriteOut, status_code=201)
 def add_favorite(
     favorite: FavoriteCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Save favorite outfit."""
@@ -313,7 +640,7 @@ def add_favorite(
 @app.delete("/favorites/{favorite_id}", status_code=204)
 def delete_favorite(
     favorite_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Delete favorite."""
@@ -0,0 +1,237 @@
+"""
+Prometheus metrics for DripMate.
+Small in-process counters and histograms rendered in the Prometheus text
+exposition format by GET /metrics.
+"""
+import bisect
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+# Request latencies (seconds)
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Upstream model calls are much slower than local work
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+# DB connection checkouts are usually sub-millisecond
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0, 5.0)
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the text format."""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Render `{name="value",...}` (empty string if there are no labels)."""
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value; integers without a trailing .0."""
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    """Base for labelled metrics; one child series per label tuple."""
+
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Sequence[str]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labels):
+            raise ValueError(f"{self.name} expects labels {self.labels}")
+        return tuple(str(v) for v in labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic counter."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        """Add `amount` to the series for these label values."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        """Current value of one series (0 if never incremented)."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram with sum and count."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = HTTP_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label tuple -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        """Record one observation."""
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labels: str) -> int:
+        """Number of observations in one series."""
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return series[2] if series else 0
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                labels = _format_labels(self.labels, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+# --- Registry ---
+REGISTRY: List[_Metric] = []
+
+
+def _register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+http_request_seconds = _register(Histogram(
+    "dripmate_http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ("method", "route", "status"),
+))
+llm_request_seconds = _register(Histogram(
+    "dripmate_llm_request_duration_seconds",
+    "Upstream model call latency.",
+    ("provider", "model", "outcome"),
+    buckets=LLM_BUCKETS,
+))
+llm_errors = _register(Counter(
+    "dripmate_llm_errors_total",
+    "Upstream model calls that failed or returned no outfits.",
+    ("provider", "model"),
+))
+llm_tokens = _register(Counter(
+    "dripmate_llm_tokens_total",
+    "Tokens reported by the provider.",
+    ("provider", "model", "kind"),
+))
+json_repairs = _register(Counter(
+    "dripmate_json_repair_total",
+    "Model replies that needed JSON cleanup before parsing.",
+    ("source",),
+))
+rate_limit_events = _register(Counter(
+    "dripmate_llm_rate_limit_total",
+    "Calls delayed or shed by client-side rate limits, and 429s from providers.",
+    ("limiter", "outcome"),
+))
+db_checkout_seconds = _register(Histogram(
+    "dripmate_db_connection_checkout_seconds",
+    "Time a pooled DB connection stays checked out.",
+    buckets=DB_BUCKETS,
+))
+
+
+def observe_llm(provider: str, model: Optional[str], seconds: float, ok: bool) -> None:
+    """Record one upstream model call."""
+    model = model or "unknown"
+    llm_request_seconds.observe(seconds, provider, model, "ok" if ok else "error")
+    if not ok:
+        llm_errors.inc(provider, model)
+
+
+def record_tokens(provider: str, model: Optional[str],
+                  prompt_tokens: Optional[int], completion_tokens: Optional[int]) -> None:
+    """Add provider-reported token usage (missing counts are skipped)."""
+    model = model or "unknown"
+    if prompt_tokens:
+        llm_tokens.inc(provider, model, "prompt", amount=prompt_tokens)
+    if completion_tokens:
+        llm_tokens.inc(provider, model, "completion", amount=completion_tokens)
+
+
+def render_metrics() -> str:
+    """All registered metrics in Prometheus text format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """Time every HTTP request, labelled by the matched route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Templates ("/wardrobe/{item_id}") keep label cardinality bounded
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            http_request_seconds.observe(
+                time.perf_counter() - start, scope["method"], path, str(status[0])
+            )
@@ -0,0 +1,210 @@
+"""
+Client for a local Ollama server.
+Calls ride on a pooled keep-alive httpx connection and ask Ollama to keep the model loaded for
+`keep_alive`, so a quiet spell does not cost a multi-second reload. The
+configured models can be preloaded at startup, and each model has its
+own concurrency limit so one busy model does not starve the others.
+"""
+import asyncio
+import json
+import time
+from typing import AsyncIterator, Dict, List, Optional, Union
+
+import httpx
+
+from providers import ConcurrencyPool
+
+
+class OllamaClient:
+    """
+    Pooled client for Ollama's /api/generate.
+
+    Args:
+        url: Server base URL; a full ".../api/generate" URL is accepted too
+        models: Local model names; the first is the default
+        keep_alive: How long Ollama keeps a model loaded after a call
+            ("30m", seconds, or -1 for forever)
+        max_concurrency: Calls in flight at once per model
+        max_queue: Calls per model allowed to wait for a slot
+        timeout: Seconds before a call is abandoned
+        max_connections: Size of the connection pool
+    """
+
+    def __init__(
+        self,
+        url: str,
+        models: List[str],
+        keep_alive: Union[str, int] = "30m",
+        max_concurrency: int = 1,
+        max_queue: int = 8,
+        timeout: float = 90,
+        max_connections: int = 10,
+    ):
+        if not models:
+            raise ValueError("At least one Ollama model is required")
+        self.base_url = url.split("/api/")[0].rstrip("/")
+        self.models = list(dict.fromkeys(models))
+        self.default_model = self.models[0]
+        self.keep_alive = _parse_keep_alive(keep_alive)
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.pools: Dict[str, ConcurrencyPool] = {
+            model: ConcurrencyPool(f"ollama/{model}", max_concurrency, max_queue)
+            for model in self.models
+        }
+        self._preload: Dict[str, dict] = {model: {"state": "pending"} for model in self.models}
+        self._last_load_ms: Dict[str, Optional[float]] = {model: None for model in self.models}
+        self._async_client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def generate_url(self) -> str:
+        return f"{self.base_url}/api/generate"
+
+    def resolve_model(self, model: Optional[str]) -> str:
+        """`model` if it is configured, else the default model."""
+        return model if model in self.pools else self.default_model
+
+    # --- Connection pool ---
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """Shared keep-alive httpx client."""
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                timeout=self.timeout,
+            )
+        return self._async_client
+
+    async def aclose(self) -> None:
+        """Close the connection pool."""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+    # --- Generation ---
+
+    def payload(self, prompt: str, model: str, stream: bool = False, json_mode: bool = True) -> dict:
+        """Request body for /api/generate."""
+        body = {"model": model, "prompt": prompt, "stream": stream, "keep_alive": self.keep_alive}
+        if json_mode:
+            body["format"] = "json"
+        return body
+
+    async def agenerate(self, prompt: str, model: Optional[str] = None) -> dict:
+        """
+        Async generation, queueing for the model's slot.
+
+        Raises:
+            ProviderBusy: if the model's queue is full
+            httpx.HTTPError: on connection or HTTP errors
+        """
+        model = self.resolve_model(model)
+        pool = self.pools[model]
+        await pool.acquire()
+        try:
+            response = await self._get_async_client().post(self.generate_url, json=self.payload(prompt, model))
+            response.raise_for_status()
+            data = response.json()
+        finally:
+            pool.release()
+        self._observe(model, data)
+        return data
+
+    async def stream(self, prompt: str, model: Optional[str] = None) -> AsyncIterator[dict]:
+        """
+        Streaming generation: yields each NDJSON message as it arrives.
+
+        The last message has "done": true and carries the eval counts.
+        """
+        model = self.resolve_model(model)
+        pool = self.pools[model]
+        await pool.acquire()
+        try:
+            payload = self.payload(prompt, model, stream=True)
+            async with self._get_async_client().stream("POST", self.generate_url, json=payload) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if data.get("error"):
+                        raise RuntimeError(data["error"])
+                    if data.get("done"):
+                        self._observe(model, data)
+                    yield data
+                    if data.get("done"):
+                        break
+        finally:
+            pool.release()
+
+    def _observe(self, model: str, data) -> None:
+        """Remember how long Ollama spent loading the model for this call."""
+        if isinstance(data, dict) and isinstance(data.get("load_duration"), (int, float)):
+            self._last_load_ms[model] = round(data["load_duration"] / 1e6, 1)
+
+    # --- Preloading ---
+
+    async def preload(self, models: Optional[List[str]] = None) -> Dict[str, dict]:
+        """
+        Load models into Ollama's memory ahead of the first request.
+
+        A generate call without a prompt only loads the model and applies
+        keep_alive. Models load concurrently; failures are recorded, not raised.
+
+        Returns:
+            Preload state per model
+        """
+        targets = [self.resolve_model(m) for m in models] if models else self.models
+        await asyncio.gather(*(self._preload_one(model) for model in dict.fromkeys(targets)))
+        return {model: dict(self._preload[model]) for model in targets}
+
+    async def _preload_one(self, model: str) -> None:
+        self._preload[model] = {"state": "loading"}
+        start = time.perf_counter()
+        try:
+            response = await self._get_async_client().post(
+                self.generate_url, json={"model": model, "keep_alive": self.keep_alive}
+            )
+            response.raise_for_status()
+        except Exception as e:
+            self._preload[model] = {"state": "failed", "error": _describe(e)}
+            return
+        self._preload[model] = {
+            "state": "loaded",
+            "ms": round((time.perf_counter() - start) * 1000, 1),
+        }
+
+    def stats(self) -> dict:
+        """Per-model slots, preload state and last load time, for /stats."""
+        return {
+            "url": self.base_url,
+            "keep_alive": self.keep_alive,
+            "default_model": self.default_model,
+            "models": {
+                model: {
+                    **pool.stats(),
+                    "preload": dict(self._preload[model]),
+                    "last_load_ms": self._last_load_ms[model],
+                }
+                for model, pool in self.pools.items()
+            },
+        }
+
+
+def _parse_keep_alive(value: Union[str, int]) -> Union[str, int]:
+    """Ollama takes a duration string ("30m") or a number of seconds (-1 = forever)."""
+    if isinstance(value, str) and value.strip().lstrip("-").isdigit():
+        return int(value)
+    return value
+
+
+def _describe(error: Exception) -> str:
+    """Short reason for a failed request."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return f"HTTP {error.response.status_code}: {error.response.text[:200]}"
+    if isinstance(error, httpx.ConnectError):
+        return "server not reachable"
+    return str(error) or type(error).__name__
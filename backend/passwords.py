@@ -0,0 +1,176 @@
+"""
+Password hashing off the request threadpool.
+bcrypt runs in a small dedicated process pool so a burst of logins cannot
+tie up the workers that serve the rest of the API.
+
+Workers are spawned, so each one imports this module and the launching
+script's __main__: cheap under `uvicorn main:app`, but `python main.py`
+makes every worker import the whole app. If the pool breaks (a worker is
+killed, or workers cannot start) the job is retried once on a fresh pool,
+and after that hashing stays on threads; bcrypt releases the GIL.
+"""
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Tuple
+
+from passlib.context import CryptContext
+
+
+_contexts: Dict[int, CryptContext] = {}
+
+
+def _context(rounds: int) -> CryptContext:
+    """CryptContext for a bcrypt cost factor (one per process)."""
+    ctx = _contexts.get(rounds)
+    if ctx is None:
+        ctx = _contexts[rounds] = CryptContext(
+            schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds
+        )
+    return ctx
+
+
+def hash_rounds(hashed: str) -> Optional[int]:
+    """Cost factor stored in a bcrypt hash ("$2b$12$..." -> 12)."""
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError, AttributeError):
+        return None
+
+
+def hash_password(password: str, rounds: int) -> str:
+    """Hash a password with the given bcrypt cost."""
+    return _context(rounds).hash(password)
+
+
+def verify_and_update(password: str, hashed: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and rehash it if its cost is out of date.
+
+    Returns:
+        (valid, new_hash) - new_hash is None unless the stored hash should
+        be replaced
+    """
+    ctx = _context(rounds)
+    try:
+        if not ctx.verify(password, hashed):
+            return False, None
+    except (ValueError, TypeError):
+        return False, None
+    if hash_rounds(hashed) != rounds or ctx.needs_update(hashed):
+        return True, ctx.hash(password)
+    return True, None
+
+
+class HasherBusy(Exception):
+    """Raised when too many hashing jobs are already queued."""
+
+
+class PasswordHasher:
+    """
+    Bounded executor for bcrypt work with queue-depth counters.
+
+    Jobs beyond `max_pending` are refused with HasherBusy instead of
+    queueing without limit.
+    """
+
+    def __init__(self, rounds: int, workers: int, max_pending: int, use_processes: bool = True):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_pending = max_pending
+        self.use_processes = use_processes
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.max_pending_seen = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+
+    def _get_executor(self) -> Executor:
+        """Create the pool on first use."""
+        with self._lock:
+            if self._executor is None:
+                if self.use_processes:
+                    # Forking a multithreaded server can copy a held lock into
+                    # the child and deadlock it; spawned workers start clean
+                    try:
+                        self._executor = ProcessPoolExecutor(
+                            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                        )
+                    except (OSError, NotImplementedError) as e:
+                        print(f"⚠ Process pool unavailable for bcrypt, using threads: {e}")
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="bcrypt"
+                    )
+            return self._executor
+
+    def _discard(self, executor: Executor, error: BaseException, use_threads: bool) -> None:
+        """Drop a broken pool so the next job gets a new one."""
+        with self._lock:
+            if use_threads and self.use_processes:
+                print(f"⚠ bcrypt process pool keeps breaking, using threads: {error!r}")
+                self.use_processes = False
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, fn, *args):
+        """Run `fn` in the pool, refusing work past `max_pending`."""
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HasherBusy("Too many password operations in progress")
+            self.pending += 1
+            self.max_pending_seen = max(self.max_pending_seen, self.pending)
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            # First break: retry on a fresh process pool; second: on threads
+            for attempt in range(3):
+                executor = self._get_executor()
+                try:
+                    return await loop.run_in_executor(executor, fn, *args)
+                except BrokenProcessPool as e:
+                    if attempt == 2:
+                        raise
+                    self._discard(executor, e, use_threads=attempt == 1)
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+                self.total_seconds += time.perf_counter() - start
+
+    async def hash(self, password: str) -> str:
+        """Hash a password with the configured cost."""
+        return await self._run(hash_password, password, self.rounds)
+
+    async def verify(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """Verify a password; also returns a new hash if the cost changed."""
+        return await self._run(verify_and_update, password, hashed, self.rounds)
+
+    def shutdown(self) -> None:
+        """Stop the worker pool."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def stats(self) -> dict:
+        """Queue depth and timing counters."""
+        with self._lock:
+            return {
+                "rounds": self.rounds,
+                "workers": self.workers,
+                "pending": self.pending,
+                "queued": max(0, self.pending - self.workers),
+                "max_pending": self.max_pending,
+                "max_pending_seen": self.max_pending_seen,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_seconds": round(self.total_seconds / self.completed, 4) if self.completed else 0.0,
+            }
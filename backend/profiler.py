@@ -0,0 +1,209 @@
+"""
+Opt-in sampling profiler for slow requests.
+A profiled request gets a background thread that samples every thread's
+stack at a fixed interval; the result is written as folded stacks
+("frame;frame;frame count" per line), which flamegraph.pl and speedscope
+read directly. main.py only installs this when PROFILING_ENABLED is set.
+"""
+import asyncio
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional
+
+from config import (
+    PROFILE_SAMPLE_RATE, PROFILE_DEBUG_TOKEN, PROFILE_DIR,
+    PROFILE_INTERVAL_MS, PROFILE_KEEP,
+)
+
+
+PROFILE_HEADER = b"x-debug-profile"
+PROFILE_SUFFIX = ".folded"
+_SAFE_NAME = re.compile(r"[^A-Za-z0-9_.-]+")
+
+# Leaf frames of threads parked with nothing to do: idle threadpool workers,
+# and the process pool's manager thread (which selects via connection.wait).
+# The event loop's own select is kept; it shows time spent awaiting I/O.
+_IDLE_LEAVES = {("threading.py", "wait"), ("queue.py", "get"), ("thread.py", "_worker")}
+_IDLE_SELECT_CALLERS = {("connection.py", "wait")}
+
+
+class StackSampler:
+    """Samples all threads' stacks from a daemon thread until stopped."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            if len(names) != threading.active_count():
+                names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = _fold(frame)
+                if stack is None:
+                    continue
+                self.samples[f"{names.get(ident, ident)};{stack}"] += 1
+            self.sample_count += 1
+
+    def folded(self) -> str:
+        """Samples in folded-stack format, heaviest stacks first."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+def _fold(frame) -> Optional[str]:
+    """Root-first "file:function;..." for a frame, or None for an idle thread."""
+    if _frame_id(frame) in _IDLE_LEAVES:
+        return None
+    if frame.f_back is not None and _frame_id(frame.f_back) in _IDLE_SELECT_CALLERS:
+        return None
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    parts.reverse()
+    return ";".join(parts)
+
+
+def _frame_id(frame):
+    code = frame.f_code
+    return os.path.basename(code.co_filename), code.co_name
+
+
+def _should_profile(scope) -> bool:
+    """Debug header with the right token, or a random sample."""
+    if PROFILE_DEBUG_TOKEN:
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return check_debug_token(value.decode("latin-1"))
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def _profile_name(scope) -> str:
+    """File name for a request's profile: time, method, path and a random suffix."""
+    return "{}-{}-{}-{}{}".format(
+        time.strftime("%Y%m%dT%H%M%S"),
+        scope["method"],
+        _SAFE_NAME.sub("_", scope["path"].strip("/"))[:60] or "root",
+        uuid.uuid4().hex[:8],
+        PROFILE_SUFFIX,
+    )
+
+
+def _write_profile(name: str, scope, sampler: StackSampler, elapsed: float, status: int) -> None:
+    """Write one profile file and prune old ones."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    header = (
+        f"# {scope['method']} {scope['path']} status={status} "
+        f"elapsed_ms={elapsed * 1000:.1f} samples={sampler.sample_count} "
+        f"interval_ms={PROFILE_INTERVAL_MS}\n"
+    )
+    with open(os.path.join(PROFILE_DIR, name), "w") as f:
+        f.write(header + sampler.folded())
+    _prune()
+
+
+def _finish_profile(name: str, scope, sampler: StackSampler, elapsed: float, status: int) -> None:
+    """Stop sampling and write the profile; blocks, so it runs on a worker thread."""
+    sampler.stop()
+    _write_profile(name, scope, sampler, elapsed, status)
+
+
+def _prune() -> None:
+    """Keep only the newest PROFILE_KEEP profiles."""
+    for entry in list_profiles()[PROFILE_KEEP:]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, entry["name"]))
+        except OSError:
+            pass
+
+
+def list_profiles() -> List[Dict]:
+    """Profiles on disk, newest first."""
+    try:
+        entries = [e for e in os.scandir(PROFILE_DIR) if e.name.endswith(PROFILE_SUFFIX)]
+    except FileNotFoundError:
+        return []
+    profiles = []
+    for entry in entries:
+        stat = entry.stat()
+        profiles.append({"name": entry.name, "bytes": stat.st_size, "created": stat.st_mtime})
+    profiles.sort(key=lambda p: p["created"], reverse=True)
+    return profiles
+
+
+def profile_path(name: str) -> Optional[str]:
+    """Path of a profile by name, or None if it does not exist."""
+    if not name.endswith(PROFILE_SUFFIX) or _SAFE_NAME.search(name):
+        return None
+    path = os.path.join(PROFILE_DIR, name)
+    return path if os.path.isfile(path) else None
+
+
+def check_debug_token(token: Optional[str]) -> bool:
+    """Whether a request may read profiles (never, if no token is configured)."""
+    if not PROFILE_DEBUG_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode(), PROFILE_DEBUG_TOKEN.encode())
+
+
+class ProfilerMiddleware:
+    """
+    Profile sampled requests and return the profile's name in X-Profile-Id.
+
+    Samples cover every thread, so the event loop and threadpool work
+    (DB queries, image decoding) both show up; on a busy server they also
+    include concurrent requests.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        sampler = StackSampler(PROFILE_INTERVAL_MS / 1000)
+        name = _profile_name(scope)
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", name.encode())
+                ]
+            await send(message)
+
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Joining the sampler thread and the file I/O would stall every
+            # request on the event loop
+            await asyncio.to_thread(
+                _finish_profile, name, scope, sampler, time.perf_counter() - start, status[0]
+            )
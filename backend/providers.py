@@ -0,0 +1,261 @@
+"""
+Provider SDKs and the chat provider registry.
+groq and google.generativeai are slow to import, so they are imported and
+configured on first use (or by the optional warm-up once the server is
+accepting traffic) instead of when the app starts.
+
+Each chat provider registers its models, call functions and concurrency
+limits here; llm.py dispatches and routes through the registry.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from types import SimpleNamespace
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from config import GEMINI_API_KEY, GROQ_API_KEY
+
+
+class LazySDK:
+    """An SDK imported and configured once, on first `get()`."""
+
+    def __init__(self, name: str, loader: Callable[[], Any], configured: bool):
+        self.name = name
+        self.configured = configured
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._value = None
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+
+    def get(self) -> Optional[Any]:
+        """The loaded SDK, or None if it is not configured or failed to import."""
+        if self._loaded:
+            return self._value
+        with self._lock:
+            if not self._loaded:
+                if self.configured:
+                    start = time.perf_counter()
+                    try:
+                        self._value = self._loader()
+                    except Exception as e:
+                        print(f"⚠ {self.name} not available: {e}")
+                        self.error = str(e)
+                    self.load_seconds = time.perf_counter() - start
+                self._loaded = True
+        return self._value
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def stats(self) -> dict:
+        return {
+            "configured": self.configured,
+            "loaded": self._loaded,
+            "load_ms": round(self.load_seconds * 1000, 1) if self.load_seconds is not None else None,
+            "error": self.error,
+        }
+
+
+def _load_groq():
+    from groq import Groq, AsyncGroq
+    return SimpleNamespace(Groq=Groq, AsyncGroq=AsyncGroq)
+
+
+def _load_gemini():
+    import google.generativeai as genai
+    # Configured once here for both chat (llm.py) and vision (vision.py)
+    genai.configure(api_key=GEMINI_API_KEY)
+    return genai
+
+
+groq_sdk = LazySDK("groq", _load_groq, configured=bool(GROQ_API_KEY))
+gemini_sdk = LazySDK("gemini", _load_gemini, configured=bool(GEMINI_API_KEY))
+SDKS: Dict[str, LazySDK] = {"groq": groq_sdk, "gemini": gemini_sdk}
+
+
+def get_sdk_stats() -> dict:
+    """Load state and import time of each SDK."""
+    return {name: sdk.stats() for name, sdk in SDKS.items()}
+
+
+# --- Concurrency pools ---
+class ProviderBusy(Exception):
+    """Raised when a provider's queue is full."""
+
+
+class ConcurrencyPool:
+    """
+    At most `max_concurrency` calls in flight, `max_queue` more waiting.
+
+    Waiters are served first come, first served.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.queued_total = 0
+        self.rejected = 0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def load(self) -> float:
+        """Calls in flight or waiting, relative to the concurrency limit."""
+        return (self.in_flight + len(self._waiters)) / self.max_concurrency
+
+    def has_room(self) -> bool:
+        """Whether a new call would run or queue rather than be rejected."""
+        return self.in_flight < self.max_concurrency or len(self._waiters) < self.max_queue
+
+    async def acquire(self) -> None:
+        """Take a slot, waiting in line if all are busy."""
+        with self._lock:
+            if self.in_flight < self.max_concurrency and not self._waiters:
+                self.in_flight += 1
+                self.admitted += 1
+                return
+            if len(self._waiters) >= self.max_queue:
+                self.rejected += 1
+                raise ProviderBusy(f"{self.name} is busy, try again shortly")
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            self.queued_total += 1
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            # The slot was handed over as we were cancelled; pass it on
+            if not waiter.cancelled():
+                self.release()
+            raise
+        with self._lock:
+            self.admitted += 1
+
+    def release(self) -> None:
+        """Give a slot back, handing it to the next waiter if there is one."""
+        with self._lock:
+            self.in_flight -= 1
+        self._wake_next()
+
+    def _wake_next(self) -> None:
+        with self._lock:
+            while self._waiters and self.in_flight < self.max_concurrency:
+                waiter = self._waiters.popleft()
+                if waiter.done():
+                    continue
+                self.in_flight += 1
+                loop = waiter.get_loop()
+                if _running_loop() is loop:
+                    waiter.set_result(None)
+                else:
+                    # Released from a worker thread
+                    loop.call_soon_threadsafe(self._deliver, waiter)
+                return
+
+    def _deliver(self, waiter: asyncio.Future) -> None:
+        if waiter.done():
+            with self._lock:
+                self.in_flight -= 1
+            self._wake_next()
+        else:
+            waiter.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "free": max(0, self.max_concurrency - self.in_flight),
+            "admitted": self.admitted,
+            "queued_total": self.queued_total,
+            "rejected": self.rejected,
+        }
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+# --- Provider registry ---
+class Provider:
+    """
+    A chat provider: its models, call functions and concurrency limits.
+
+    Args:
+        name: Registry key and `ai_provider` value
+        label: Short name used in error messages
+        display_name: Name shown by /models
+        models: Public model name -> provider model id
+        default_model: Model used when none (or an unknown one) is requested
+        generate_async: (prompt, model_name) -> awaitable result dict
+        stream: (prompt, model_name) -> async iterator of text chunks
+        max_concurrency: Calls allowed in flight at once
+        max_queue: Calls allowed to wait for a slot before rejecting
+        available: Whether the provider is configured
+    """
+
+    def __init__(
+        self,
+        name: str,
+        label: str,
+        display_name: str,
+        models: Dict[str, str],
+        default_model: str,
+        generate_async: Callable,
+        stream: Callable,
+        max_concurrency: int,
+        max_queue: int,
+        available: Callable[[], bool] = lambda: True,
+    ):
+        self.name = name
+        self.label = label
+        self.display_name = display_name
+        self.models = models
+        self.default_model = default_model
+        self.generate_async = generate_async
+        self.stream = stream
+        self.available = available
+        self.pool = ConcurrencyPool(name, max_concurrency, max_queue)
+
+    def resolve_model(self, model_name: Optional[str]) -> str:
+        """The model a call with `model_name` will actually use."""
+        return model_name if model_name in self.models else self.default_model
+
+
+PROVIDER_REGISTRY: Dict[str, Provider] = {}
+
+
+def register_provider(provider: Provider) -> Provider:
+    """Add (or replace) a chat provider."""
+    PROVIDER_REGISTRY[provider.name] = provider
+    return provider
+
+
+def get_provider(name: str) -> Optional[Provider]:
+    return PROVIDER_REGISTRY.get(name)
+
+
+def provider_names() -> List[str]:
+    return list(PROVIDER_REGISTRY)
+
+
+def get_pool_stats() -> dict:
+    """Concurrency pool state of every registered provider."""
+    return {name: provider.pool.stats() for name, provider in PROVIDER_REGISTRY.items()}
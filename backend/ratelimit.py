@@ -0,0 +1,410 @@
+"""
+Client-side rate limiting for Groq and Gemini.
+Each provider/model gets token buckets for requests and tokens per minute.
+Calls reserve their estimated cost before going out; calls that cannot go
+yet wait in a priority queue, and ones that would wait too long are shed
+with a retry hint instead of running into a 429. Retry-After and
+x-ratelimit-* headers from the provider tighten the buckets further.
+"""
+import asyncio
+import heapq
+import itertools
+import math
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Mapping, Optional
+
+from config import (
+    RATE_LIMIT_ENABLED, GROQ_RPM, GROQ_TPM, GEMINI_RPM, GEMINI_TPM, RATE_LIMITS,
+    RATE_LIMIT_MAX_WAIT_SECONDS, RATE_LIMIT_COMPLETION_TOKENS,
+)
+from metrics import rate_limit_events
+from tokens import estimate_tokens
+
+
+# Queued calls are served lowest value first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+
+# Back-off for a 429 that carries no retry hint
+DEFAULT_RETRY_SECONDS = 10.0
+
+_PROVIDER_LIMITS = {"groq": (GROQ_RPM, GROQ_TPM), "gemini": (GEMINI_RPM, GEMINI_TPM)}
+
+_priority: ContextVar[int] = ContextVar("rate_limit_priority", default=PRIORITY_INTERACTIVE)
+_reservation: ContextVar[Optional["Reservation"]] = ContextVar("rate_limit_reservation", default=None)
+
+# "1.5", "7.66s", "2m59.56s", "120ms"
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+# Gemini puts the hint in the message: "Please retry in 13.2s" / "retry_delay { seconds: 13 }"
+_RETRY_HINT = re.compile(r"retry in (\d+(?:\.\d+)?)s|retry_delay\s*\{\s*seconds:\s*(\d+)", re.IGNORECASE)
+
+
+class RateLimited(Exception):
+    """A call would have to wait too long for a provider's rate limit."""
+
+    def __init__(self, key: str, retry_after: float):
+        super().__init__(f"{key} rate limit reached, retry in {math.ceil(retry_after)}s")
+        self.key = key
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Refills `per_minute` units a minute and holds at most a minute's worth."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` is available (a full bucket for oversized amounts)."""
+        self._refill(now)
+        deficit = min(amount, self.capacity) - self.level
+        return deficit / self.rate if deficit > 0 else 0.0
+
+    def take(self, amount: float, now: float) -> None:
+        # May go negative; later callers then wait for the debt to refill
+        self._refill(now)
+        self.level -= amount
+
+    def give_back(self, amount: float) -> None:
+        self.level = min(self.capacity, self.level + amount)
+
+    def cap(self, remaining: float, now: float) -> None:
+        """Lower the level to what the provider says is left."""
+        self._refill(now)
+        self.level = min(self.level, remaining)
+
+
+class Reservation:
+    """Tokens held for one call; corrected to the reported usage on close."""
+
+    def __init__(self, limiter: "RateLimiter", tokens: int):
+        self.limiter = limiter
+        self.tokens = tokens
+        self.used: Optional[int] = None
+        self.synced = False
+
+    def add_usage(self, tokens: int) -> None:
+        self.used = (self.used or 0) + tokens
+
+    def close(self) -> None:
+        # Without reported usage the estimate stands; after the provider's
+        # headers set the bucket level it already reflects the real usage
+        if self.used is not None and not self.synced:
+            self.limiter.give_back(self.tokens - self.used)
+
+
+class RateLimiter:
+    """
+    Request and token buckets for one provider/model, with a wait queue.
+
+    Calls that fit go straight through. Otherwise they wait in priority
+    order; a call whose estimated wait exceeds its `max_wait` (or that is
+    still queued at its deadline) fails with RateLimited.
+    """
+
+    def __init__(self, key: str, rpm: int, tpm: int):
+        self.key = key
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        self.blocked_until = 0.0
+        self._queue: List[tuple] = []   # (priority, seq, deadline, tokens, future)
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.delayed = 0
+        self.shed = 0
+        self.throttled = 0
+
+    def _wait(self, tokens: float, requests: int, now: float) -> float:
+        """Seconds until `requests` calls costing `tokens` fit. Caller holds the lock."""
+        waits = [self.blocked_until - now]
+        if self.requests is not None:
+            waits.append(self.requests.wait_time(requests, now))
+        if self.tokens is not None:
+            waits.append(self.tokens.wait_time(tokens, now))
+        return max(0.0, *waits)
+
+    def _take(self, tokens: int, now: float) -> None:
+        if self.requests is not None:
+            self.requests.take(1, now)
+        if self.tokens is not None:
+            self.tokens.take(tokens, now)
+        self.admitted += 1
+
+    async def acquire(
+        self,
+        tokens: int,
+        priority: Optional[int] = None,
+        max_wait: float = RATE_LIMIT_MAX_WAIT_SECONDS,
+    ) -> Reservation:
+        """Reserve a call costing `tokens`, waiting in line if needed."""
+        priority = _priority.get() if priority is None else priority
+        with self._lock:
+            now = time.monotonic()
+            if not self._queue and self._wait(tokens, 1, now) <= 0:
+                self._take(tokens, now)
+                return Reservation(self, tokens)
+
+            # Estimated wait behind everything queued at the same or higher priority
+            ahead = [w for w in self._queue if w[0] <= priority]
+            estimate = self._wait(tokens + sum(w[3] for w in ahead), len(ahead) + 1, now)
+            if estimate > max_wait:
+                self.shed += 1
+                rate_limit_events.inc(self.key, "shed")
+                raise RateLimited(self.key, estimate)
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._queue, (priority, next(self._seq), now + max_wait, tokens, future))
+            self.delayed += 1
+        rate_limit_events.inc(self.key, "delayed")
+        self._pump()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                # Admitted just as the caller went away
+                self.give_back(tokens, request=True)
+            raise
+        return Reservation(self, tokens)
+
+    def _pump(self) -> None:
+        """Admit queued calls that fit now, shed overdue ones, and re-arm the timer."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            now = time.monotonic()
+            overdue = [w for w in self._queue if w[2] <= now or w[4].done()]
+            if overdue:
+                self._queue = [w for w in self._queue if w[2] > now and not w[4].done()]
+                heapq.heapify(self._queue)
+                for _, _, _, tokens, future in overdue:
+                    if not future.done():
+                        self.shed += 1
+                        rate_limit_events.inc(self.key, "shed")
+                        future.set_exception(RateLimited(self.key, self._wait(tokens, 1, now)))
+
+            wait = 0.0
+            while self._queue:
+                tokens, future = self._queue[0][3], self._queue[0][4]
+                wait = self._wait(tokens, 1, now)
+                if wait > 0:
+                    break
+                heapq.heappop(self._queue)
+                self._take(tokens, now)
+                future.set_result(None)
+
+            if self._queue:
+                next_deadline = min(w[2] for w in self._queue)
+                delay = max(0.0, min(wait, next_deadline - now))
+                self._timer = asyncio.get_running_loop().call_later(delay, self._pump)
+
+    def give_back(self, tokens: float, request: bool = False) -> None:
+        """Return unused tokens (negative to charge more), and optionally the request."""
+        with self._lock:
+            if self.tokens is not None:
+                self.tokens.give_back(tokens)
+            if request and self.requests is not None:
+                self.requests.give_back(1)
+
+    def throttle(self, retry_after: float) -> None:
+        """The provider answered 429: send nothing more until `retry_after` passes."""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+            self.throttled += 1
+        rate_limit_events.inc(self.key, "throttled")
+
+    def observe_headers(self, headers: Mapping[str, str]) -> None:
+        """Apply Retry-After and x-ratelimit-* response headers."""
+        retry_after = parse_duration(headers.get("retry-after"))
+        remaining_tokens = _parse_int(headers.get("x-ratelimit-remaining-tokens"))
+        remaining_requests = _parse_int(headers.get("x-ratelimit-remaining-requests"))
+        with self._lock:
+            now = time.monotonic()
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+            if remaining_tokens is not None and self.tokens is not None:
+                self.tokens.cap(remaining_tokens, now)
+            if remaining_requests == 0:
+                reset = parse_duration(headers.get("x-ratelimit-reset-requests"))
+                if reset:
+                    self.blocked_until = max(self.blocked_until, now + reset)
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            if self.requests is not None:
+                self.requests._refill(now)
+            if self.tokens is not None:
+                self.tokens._refill(now)
+            return {
+                "rpm": int(self.requests.capacity) if self.requests is not None else None,
+                "tpm": int(self.tokens.capacity) if self.tokens is not None else None,
+                "requests_available": round(self.requests.level, 1) if self.requests is not None else None,
+                "tokens_available": round(self.tokens.level) if self.tokens is not None else None,
+                "blocked_for_seconds": round(max(0.0, self.blocked_until - now), 1),
+                "queued": len(self._queue),
+                "admitted": self.admitted,
+                "delayed": self.delayed,
+                "shed": self.shed,
+                "throttled": self.throttled,
+            }
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After / x-ratelimit-reset-* value (HTTP dates are ignored)."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+
+def _parse_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+def retry_after_from_error(error: Exception) -> Optional[float]:
+    """Seconds to back off if `error` is a provider 429, else None."""
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if status != 429:
+        return None
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    seconds = parse_duration(headers.get("retry-after"))
+    if seconds is None:
+        match = _RETRY_HINT.search(str(error))
+        if match:
+            seconds = float(match.group(1) or match.group(2))
+    return seconds if seconds else DEFAULT_RETRY_SECONDS
+
+
+# --- Limiter registry ---
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider: str, model: Optional[str]) -> Optional[RateLimiter]:
+    """Limiter for a provider/model, or None if it is not rate limited."""
+    if not RATE_LIMIT_ENABLED or (provider not in _PROVIDER_LIMITS and model not in RATE_LIMITS):
+        return None
+    key = f"{provider}/{model}"
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            rpm, tpm = RATE_LIMITS.get(model) or _PROVIDER_LIMITS.get(provider, (0, 0))
+            limiter = _limiters[key] = RateLimiter(key, rpm, tpm)
+        return limiter
+
+
+def estimate_request_tokens(prompt: str, extra: int = 0) -> int:
+    """Prompt tokens plus the expected completion, for reserving budget."""
+    return estimate_tokens(prompt) + extra + RATE_LIMIT_COMPLETION_TOKENS
+
+
+async def reserve(
+    provider: str,
+    model: Optional[str],
+    tokens: int,
+    max_wait: Optional[float] = None,
+) -> Optional[Reservation]:
+    """
+    Wait for rate-limit budget for one call.
+
+    Returns:
+        The reservation, or None if the provider/model is not limited
+
+    Raises:
+        RateLimited: if the wait would exceed `max_wait`
+    """
+    limiter = get_limiter(provider, model)
+    if limiter is None:
+        return None
+    return await limiter.acquire(
+        tokens, max_wait=RATE_LIMIT_MAX_WAIT_SECONDS if max_wait is None else max_wait
+    )
+
+
+@contextmanager
+def track_usage(reservation: Optional[Reservation]) -> Iterator[None]:
+    """
+    Make `reservation` the target of report_* calls made inside the block
+    (including worker threads started with asyncio.to_thread), and settle
+    it against the reported usage afterwards.
+    """
+    if reservation is None:
+        yield
+        return
+    token = _reservation.set(reservation)
+    try:
+        yield
+    finally:
+        _reservation.reset(token)
+        reservation.close()
+
+
+@contextmanager
+def request_priority(priority: int) -> Iterator[None]:
+    """Queue the calls made inside the block at `priority`."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def report_usage(prompt_tokens: Optional[int], completion_tokens: Optional[int]) -> None:
+    """Provider-reported token usage of the current call."""
+    reservation = _reservation.get()
+    if reservation is not None:
+        reservation.add_usage((prompt_tokens or 0) + (completion_tokens or 0))
+
+
+def report_headers(headers: Optional[Mapping[str, str]]) -> None:
+    """Response headers of the current call."""
+    reservation = _reservation.get()
+    if reservation is not None and headers:
+        reservation.limiter.observe_headers(headers)
+        reservation.synced = "x-ratelimit-remaining-tokens" in headers
+
+
+def report_error(error: Exception) -> Optional[float]:
+    """
+    Check a failed call for a 429 and back the limiter off accordingly.
+
+    Returns:
+        Seconds until a retry makes sense, or None if it was not a 429
+    """
+    retry_after = retry_after_from_error(error)
+    reservation = _reservation.get()
+    if retry_after is not None and reservation is not None:
+        reservation.limiter.throttle(retry_after)
+    return retry_after
+
+
+def get_rate_limit_stats() -> dict:
+    """Bucket levels and queue counters of every limiter in use."""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {"enabled": RATE_LIMIT_ENABLED, "limiters": {l.key: l.stats() for l in limiters}}
@@ -0,0 +1,44 @@
+"""
+Fast JSON responses for hot endpoints.
+Payloads that are already in their wire shape (normalized outfits, the
+/models listing) skip FastAPI's response_model validation and are encoded
+with orjson when it is installed. The bytes match what JSONResponse
+produces for the same content.
+"""
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional speed-up; the stdlib encoder gives the same output
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON, byte-for-byte what JSONResponse would render."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(content)
+        except TypeError:
+            pass   # non-str keys, ints over 64 bits, ...: let json decide
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse encoded with `dumps`.
+
+    Returning one from a route bypasses response_model serialization, so
+    only use it for content that already has the documented shape.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,253 @@
+"""
+Provider routing for DripMate.
+Per-provider circuit breakers, load-aware ordering, failover and optional
+hedged requests.
+"""
+import asyncio
+import time
+import threading
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from config import (
+    LLM_BREAKER_WINDOW, LLM_BREAKER_MIN_CALLS, LLM_BREAKER_ERROR_RATE,
+    LLM_BREAKER_SLOW_SECONDS, LLM_BREAKER_COOLDOWN_SECONDS,
+    LLM_HEDGE_ENABLED, LLM_HEDGE_MIN_DELAY_SECONDS, LLM_HEDGE_DEFAULT_DELAY_SECONDS,
+)
+
+
+# Weight of a provider whose breaker is waiting on (or due for) a probe call
+PROBE_WEIGHT = 0.1
+# Each step down the configured order scales a provider's score by this, so
+# the preferred provider keeps traffic until it is noticeably busier
+ORDER_PREFERENCE = 0.8
+
+
+class ProviderHealth:
+    """
+    Rolling call stats and a circuit breaker for one provider.
+
+    Errors and calls slower than LLM_BREAKER_SLOW_SECONDS both count as
+    bad outcomes. Once the bad rate over the window passes the threshold
+    the breaker opens; after the cooldown a single probe call is let
+    through (half-open) and its outcome closes or re-opens the breaker.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.calls = 0
+        self.errors = 0
+        self._outcomes: deque = deque(maxlen=LLM_BREAKER_WINDOW)  # (ok, latency)
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may be sent to this provider now."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < LLM_BREAKER_COOLDOWN_SECONDS:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record(self, ok: bool, latency: float) -> None:
+        """Record the outcome of a finished call."""
+        with self._lock:
+            self.calls += 1
+            if not ok:
+                self.errors += 1
+            good = ok and latency < LLM_BREAKER_SLOW_SECONDS
+            self._outcomes.append((good, latency))
+
+            if self.state == self.HALF_OPEN:
+                self._probe_in_flight = False
+                if good:
+                    self.state = self.CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._open()
+                return
+
+            if self.state == self.CLOSED and len(self._outcomes) >= LLM_BREAKER_MIN_CALLS:
+                bad = sum(1 for g, _ in self._outcomes if not g)
+                if bad / len(self._outcomes) >= LLM_BREAKER_ERROR_RATE:
+                    self._open()
+
+    def release_probe(self) -> None:
+        """Give back a half-open probe slot that ended without an outcome."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def p95(self) -> Optional[float]:
+        """95th percentile latency of recent successful calls."""
+        with self._lock:
+            latencies = sorted(lat for good, lat in self._outcomes if good)
+        if len(latencies) < LLM_BREAKER_MIN_CALLS:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+    def hedge_delay(self) -> float:
+        """How long to wait on this provider before firing a hedge."""
+        p95 = self.p95()
+        if p95 is None:
+            return LLM_HEDGE_DEFAULT_DELAY_SECONDS
+        return max(LLM_HEDGE_MIN_DELAY_SECONDS, p95)
+
+    def weight(self) -> float:
+        """
+        Routing weight from 0 to 1, without claiming a probe slot.
+
+        A cooling-down open breaker scores 0, a breaker due for its probe
+        a little more, and a closed one its recent good-call rate.
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < LLM_BREAKER_COOLDOWN_SECONDS:
+                    return 0.0
+                return PROBE_WEIGHT
+            if self.state == self.HALF_OPEN:
+                return PROBE_WEIGHT
+            if not self._outcomes:
+                return 1.0
+            good = sum(1 for g, _ in self._outcomes if g)
+            return max(PROBE_WEIGHT, good / len(self._outcomes))
+
+    def stats(self) -> dict:
+        """Snapshot for /stats."""
+        p95 = self.p95()
+        with self._lock:
+            return {
+                "state": self.state,
+                "calls": self.calls,
+                "errors": self.errors,
+                "window": len(self._outcomes),
+                "p95_seconds": round(p95, 3) if p95 is not None else None,
+            }
+
+    def _open(self) -> None:
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        print(f"⚠ Circuit breaker opened for {self.name}")
+
+
+_health: Dict[str, ProviderHealth] = {}
+_health_lock = threading.Lock()
+
+
+def get_health(provider: str) -> ProviderHealth:
+    """Health tracker for a provider (created on first use)."""
+    with _health_lock:
+        health = _health.get(provider)
+        if health is None:
+            health = _health[provider] = ProviderHealth(provider)
+        return health
+
+
+def get_provider_stats() -> dict:
+    """Breaker state and latency stats for every provider seen so far."""
+    with _health_lock:
+        providers = list(_health.values())
+    return {h.name: h.stats() for h in providers}
+
+
+def pick_provider(order: List[str]) -> Optional[str]:
+    """First provider in `order` whose breaker lets a call through."""
+    for provider in order:
+        if get_health(provider).allow():
+            return provider
+    return None
+
+
+def rank_providers(order: List[str], load: Callable[[str], Optional[float]]) -> List[str]:
+    """
+    Reorder providers by health and how busy they are.
+
+    Score = health weight * ORDER_PREFERENCE ** position / (1 + load), where
+    `load(provider)` is its calls in flight or queued per concurrency slot,
+    or None if it cannot take another call (dropped from the result).
+    Breakers are not consulted for admission here; `call_with_failover`
+    still skips open ones.
+    """
+    scored = []
+    for position, provider in enumerate(order):
+        current = load(provider)
+        if current is None:
+            continue
+        score = get_health(provider).weight() * ORDER_PREFERENCE ** position / (1.0 + current)
+        scored.append((-score, position, provider))
+    return [provider for _, _, provider in sorted(scored)]
+
+
+async def call_with_failover(
+    order: List[str],
+    call: Callable[[str], Awaitable[dict]],
+    hedge: bool = LLM_HEDGE_ENABLED,
+) -> dict:
+    """
+    Run `call(provider)` down `order` until one returns outfits.
+
+    Providers with an open breaker are skipped. With `hedge`, if the
+    running provider has not answered within its p95-based delay the next
+    one is started too, and the first successful answer wins.
+
+    `call` must record its own outcome via `get_health(provider).record`.
+
+    Returns:
+        The first successful result, or the last error result
+    """
+    candidates = iter(order)
+    pending: Dict[asyncio.Task, str] = {}
+    last_result = {"error": "All AI providers are unavailable right now.", "outfits": []}
+
+    def launch_next() -> Optional[str]:
+        for provider in candidates:
+            if get_health(provider).allow():
+                pending[asyncio.ensure_future(call(provider))] = provider
+                return provider
+        return None
+
+    latest = launch_next()
+    try:
+        while pending:
+            timeout = None
+            if hedge and len(pending) == 1:
+                timeout = get_health(latest).hedge_delay()
+            done, _ = await asyncio.wait(
+                pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                # Slow answer: fire the next provider alongside it
+                latest = launch_next() or latest
+                if len(pending) == 1:
+                    hedge = False
+                continue
+
+            for task in done:
+                pending.pop(task)
+                try:
+                    result = task.result()
+                except Exception as e:
+                    result = {"error": str(e), "outfits": []}
+                if result.get("outfits") and not result.get("error"):
+                    return result
+                last_result = result
+
+            if not pending:
+                latest = launch_next() or latest
+        return last_result
+    finally:
+        for task, provider in pending.items():
+            task.cancel()
+            get_health(provider).release_probe()
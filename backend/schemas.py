@@ -6,6 +6,8 @@ from typing import List, Optional
 from datetime import datetime
 from enum import Enum
 
+from config import CHAT_BATCH_MAX_ITEMS
+
 
 # Enums
 class ItemCategory(str, Enum):
@@ -63,7 +65,7 @@ class ChatRequest(BaseModel):
     use_wardrobe_only: bool = False
     
     # Model selection
-    ai_provider: str = "groq"  # "groq", "gemini" or "ollama"
+    ai_provider: str = "groq"  # "groq", "gemini", "ollama" or "auto" (failover)
     model: str = "llama-3.3-70b"
 
 
@@ -86,6 +88,24 @@ class ChatResponse(BaseModel):
     outfits: List[Outfit]
 
 
+class BatchChatRequest(BaseModel):
+    """Several outfit requests answered in one call."""
+    requests: List[ChatRequest] = Field(..., min_length=1, max_length=CHAT_BATCH_MAX_ITEMS)
+    concurrency: Optional[int] = Field(default=None, ge=1)  # capped by CHAT_BATCH_CONCURRENCY
+
+
+class BatchChatItem(BaseModel):
+    """Result for one request of a batch; `error` is set if it failed."""
+    index: int
+    outfits: List[Outfit] = []
+    error: Optional[str] = None
+
+
+class BatchChatResponse(BaseModel):
+    """Batch results, in request order."""
+    results: List[BatchChatItem]
+
+
 # Image upload schemas
 class ImageUploadResponse(BaseModel):
     """Response from image-based outfit analysis."""
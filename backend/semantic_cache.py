@@ -0,0 +1,185 @@
+"""
+Near-duplicate cache for outfit suggestions.
+Requests are partitioned by the fields that must match exactly (profile,
+options, wardrobe, provider/model); within a partition, the item and vibe
+texts are compared by cosine similarity so "black hoodies" / "street wear"
+can reuse the result stored for "Black hoodie" / "streetwear".
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from similarity import DEFAULT_DIM, vectorize
+
+
+# Lookups scoring this far below the threshold are counted as near misses,
+# to help tune SEMANTIC_CACHE_THRESHOLD
+NEAR_MISS_MARGIN = 0.1
+# Stores this similar to an existing entry replace it instead of adding one
+DUPLICATE_SIMILARITY = 0.999
+
+
+class _Partition:
+    """Item/vibe vectors of one partition, stored as growable matrices."""
+
+    def __init__(self, dim: int):
+        self.size = 0
+        self.items = np.zeros((8, dim), dtype=np.float32)
+        self.vibes = np.zeros((8, dim), dtype=np.float32)
+        self.expires = np.zeros(8, dtype=np.float64)
+        self.ids = []
+        self.values = []
+        self.rows: Dict[int, int] = {}
+
+    def best(self, item_vec: np.ndarray, vibe_vec: np.ndarray, now: float) -> Tuple[int, float]:
+        """Row of the closest live entry and its similarity (-1, -1.0 if none)."""
+        n = self.size
+        if not n:
+            return -1, -1.0
+        # Both texts must match: an entry is as similar as its weaker field
+        scores = np.minimum(self.items[:n] @ item_vec, self.vibes[:n] @ vibe_vec)
+        scores[self.expires[:n] <= now] = -1.0
+        row = int(np.argmax(scores))
+        return row, float(scores[row])
+
+    def add(self, entry_id: int, item_vec, vibe_vec, value, expires_at: float) -> None:
+        if self.size == len(self.expires):
+            grow = len(self.expires)
+            self.items = np.vstack([self.items, np.zeros_like(self.items[:grow])])
+            self.vibes = np.vstack([self.vibes, np.zeros_like(self.vibes[:grow])])
+            self.expires = np.concatenate([self.expires, np.zeros(grow)])
+        row = self.size
+        self.items[row], self.vibes[row], self.expires[row] = item_vec, vibe_vec, expires_at
+        self.ids.append(entry_id)
+        self.values.append(value)
+        self.rows[entry_id] = row
+        self.size += 1
+
+    def remove(self, entry_id: int) -> None:
+        """Drop an entry by moving the last row into its slot."""
+        row = self.rows.pop(entry_id)
+        last = self.size - 1
+        if row != last:
+            moved = self.ids[last]
+            self.items[row], self.vibes[row] = self.items[last], self.vibes[last]
+            self.expires[row] = self.expires[last]
+            self.ids[row], self.values[row] = moved, self.values[last]
+            self.rows[moved] = row
+        self.ids.pop()
+        self.values.pop()
+        self.size = last
+
+
+class SemanticCache:
+    """
+    Thread-safe similarity cache with TTL and global LRU eviction.
+
+    `get` returns a stored value whose item and vibe are both at least
+    `threshold` similar to the query within the same partition.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 1000,
+        threshold: float = 0.9,
+        ttl_seconds: float = 3600,
+        dim: int = DEFAULT_DIM,
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.dim = dim
+        self._partitions: Dict[str, _Partition] = {}
+        self._lru: "OrderedDict[int, str]" = OrderedDict()   # entry id -> partition key
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.near_misses = 0
+        self.evictions = 0
+        self._hit_similarity_sum = 0.0
+        self._min_hit_similarity = None
+
+    def _vectors(self, item: str, vibe: str):
+        vectors = vectorize([item, vibe], self.dim)
+        return vectors[0], vectors[1]
+
+    def get(self, partition: str, item: str, vibe: str) -> Optional[Any]:
+        """Closest stored value for (item, vibe) above the threshold, else None."""
+        item_vec, vibe_vec = self._vectors(item, vibe)
+        with self._lock:
+            part = self._partitions.get(partition)
+            row, score = part.best(item_vec, vibe_vec, time.time()) if part else (-1, -1.0)
+            if row < 0 or score < self.threshold:
+                self.misses += 1
+                if score >= self.threshold - NEAR_MISS_MARGIN:
+                    self.near_misses += 1
+                return None
+
+            self.hits += 1
+            self._hit_similarity_sum += score
+            if self._min_hit_similarity is None or score < self._min_hit_similarity:
+                self._min_hit_similarity = score
+            self._lru.move_to_end(part.ids[row])
+            return part.values[row]
+
+    def set(self, partition: str, item: str, vibe: str, value: Any) -> None:
+        """Store a value, replacing an entry for the same texts if present."""
+        item_vec, vibe_vec = self._vectors(item, vibe)
+        now = time.time()
+        with self._lock:
+            part = self._partitions.get(partition)
+            if part is not None:
+                expired = [part.ids[i] for i in np.flatnonzero(part.expires[:part.size] <= now)]
+                row, score = part.best(item_vec, vibe_vec, now)
+                if row >= 0 and score >= DUPLICATE_SIMILARITY:
+                    expired.append(part.ids[row])
+                for entry_id in expired:
+                    self._remove(entry_id)
+            part = self._partitions.get(partition)
+            if part is None:
+                part = self._partitions[partition] = _Partition(self.dim)
+
+            entry_id = self._next_id
+            self._next_id += 1
+            part.add(entry_id, item_vec, vibe_vec, value, now + self.ttl_seconds)
+            self._lru[entry_id] = partition
+            while len(self._lru) > self.max_entries:
+                self._remove(next(iter(self._lru)))
+                self.evictions += 1
+
+    def _remove(self, entry_id: int) -> None:
+        """Drop one entry (and its partition once empty). Caller holds the lock."""
+        partition = self._lru.pop(entry_id)
+        part = self._partitions[partition]
+        part.remove(entry_id)
+        if not part.size:
+            del self._partitions[partition]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._partitions.clear()
+            self._lru.clear()
+
+    def stats(self) -> dict:
+        """Hit/miss counters plus the similarity of served hits."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._lru),
+                "partitions": len(self._partitions),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "near_misses": self.near_misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "avg_hit_similarity": round(self._hit_similarity_sum / self.hits, 4) if self.hits else None,
+                "min_hit_similarity": round(self._min_hit_similarity, 4) if self.hits else None,
+            }
@@ -0,0 +1,74 @@
+"""
+Lightweight text vectors for local similarity search.
+Hashed character trigrams, L2-normalized, so cosine similarity is a dot
+product. No model download; spacing, case and plural differences
+("street wear" vs "Streetwear", "hoodies" vs "hoodie") map to the same vector.
+"""
+import re
+import zlib
+from functools import lru_cache
+from typing import Iterable, List
+
+import numpy as np
+
+
+DEFAULT_DIM = 512
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+# Spelling variants that should not count as different words
+_SPELLINGS = {"gray": "grey", "colour": "color", "colours": "colors"}
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, punctuation to spaces, whitespace collapsed."""
+    return " ".join(_NON_ALNUM.sub(" ", str(text or "").lower()).split())
+
+
+def _stem(word: str) -> str:
+    """Strip a plural ending ("dresses" -> "dress", "sneakers" -> "sneaker")."""
+    word = _SPELLINGS.get(word, word)
+    if len(word) > 4 and word.endswith("es") and word[-3] in "sxz":
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def features(text: str) -> List[str]:
+    """
+    Character trigrams of the stemmed words joined without spaces.
+
+    Joining first makes "street wear", "streetwear" and "t-shirt"/"tshirt"
+    identical, while different words still share few trigrams.
+    """
+    joined = "".join(_stem(word) for word in normalize_text(text).split())
+    return [joined[i:i + 3] for i in range(len(joined) - 2)] or ([joined] if joined else [])
+
+
+@lru_cache(maxsize=65536)
+def _bucket(feature: str, dim: int):
+    """Stable (index, sign) for a feature; crc32 is not salted per process."""
+    h = zlib.crc32(feature.encode("utf-8"))
+    return h % dim, 1.0 if (h >> 31) & 1 else -1.0
+
+
+def vectorize(texts: Iterable[str], dim: int = DEFAULT_DIM) -> np.ndarray:
+    """
+    Hash texts into unit vectors.
+
+    Returns:
+        float32 array of shape (len(texts), dim); empty texts give zero rows
+    """
+    texts = list(texts)
+    matrix = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for feature in features(text):
+            index, sign = _bucket(feature, dim)
+            matrix[row, index] += sign
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def vectorize_one(text: str, dim: int = DEFAULT_DIM) -> np.ndarray:
+    """Single text as a 1-D unit vector."""
+    return vectorize([text], dim)[0]
@@ -0,0 +1,52 @@
+"""
+Cold-start timing.
+main.py marks startup phases (imports done, database ready, providers
+warmed up) and prints a short report when the server starts. Provider SDKs
+found in sys.modules at that point were imported eagerly and are listed,
+since they are meant to load on first use.
+"""
+import sys
+import time
+from typing import Dict, List
+
+from config import STARTUP_IMPORT_BUDGET_MS
+
+
+_STARTED = time.perf_counter()
+_phases: Dict[str, float] = {}
+_eager: List[str] = []
+
+# Slow imports that should stay out of the startup path
+LAZY_MODULES = ("groq", "google.generativeai")
+
+
+def mark(phase: str) -> None:
+    """Record that a phase finished, in ms since main.py started importing."""
+    _phases[phase] = round((time.perf_counter() - _STARTED) * 1000, 1)
+    if phase == "imports":
+        _eager[:] = eager_modules()
+
+
+def eager_modules() -> list:
+    """LAZY_MODULES that are already imported."""
+    return [name for name in LAZY_MODULES if name in sys.modules]
+
+
+def print_import_report() -> None:
+    """One-line import time against STARTUP_IMPORT_BUDGET_MS."""
+    imports_ms = _phases.get("imports")
+    if imports_ms is None:
+        return
+    within = imports_ms <= STARTUP_IMPORT_BUDGET_MS
+    print(f"{'✓' if within else '⚠'} App imported in {imports_ms:.0f} ms (budget {STARTUP_IMPORT_BUDGET_MS} ms)")
+    if _eager:
+        print(f"⚠ Imported at startup instead of on first use: {', '.join(_eager)}")
+
+
+def get_startup_stats() -> dict:
+    """Phase timings for /stats."""
+    return {
+        "phases_ms": dict(_phases),
+        "import_budget_ms": STARTUP_IMPORT_BUDGET_MS,
+        "eager_modules": list(_eager),
+    }
@@ -0,0 +1,117 @@
+"""
+Regression tests and benchmarks for the tolerant JSON scanner.
+The corpus in testdata/jsonrepair_corpus.json holds malformed model
+replies (fences, prose, comments, trailing commas, truncation, ...) with
+the value each should parse to.
+
+Run the tests with pytest; `python test_jsonrepair.py` prints timings.
+"""
+import json
+import os
+import random
+import time
+
+import pytest
+
+from jsonrepair import JSONScanner, loads, repair_json
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "testdata", "jsonrepair_corpus.json")
+with open(CORPUS_PATH, encoding="utf-8") as f:
+    CORPUS = json.load(f)["cases"]
+
+PARSEABLE = [case for case in CORPUS if not case.get("error")]
+
+
+@pytest.mark.parametrize("case", CORPUS, ids=[case["name"] for case in CORPUS])
+def test_corpus(case):
+    """Each malformed reply parses to its expected value (or fails cleanly)."""
+    if case.get("error"):
+        with pytest.raises(ValueError):
+            loads(case["input"])
+    else:
+        assert loads(case["input"]) == case["expected"]
+
+
+@pytest.mark.parametrize("case", PARSEABLE, ids=[case["name"] for case in PARSEABLE])
+def test_valid_json_is_unchanged(case):
+    """Repairing well-formed JSON keeps its value."""
+    text = json.dumps(case["expected"], indent=2)
+    assert json.loads(repair_json(text)) == case["expected"]
+
+
+@pytest.mark.parametrize("case", PARSEABLE, ids=[case["name"] for case in PARSEABLE])
+def test_chunked_feed_matches_one_shot(case):
+    """Feeding a reply in random chunks gives the same result as all at once."""
+    expected = repair_json(case["input"])
+    rng = random.Random(case["name"])
+    for _ in range(20):
+        scanner = JSONScanner()
+        text, pos = case["input"], 0
+        while pos < len(text):
+            size = rng.randint(1, 8)
+            scanner.feed(text[pos:pos + size])
+            pos += size
+        assert scanner.finish() == expected
+
+
+def test_capture_emits_outfits_as_they_close():
+    """Objects in the outfits array are returned by the chunk that closes them."""
+    outfits = [{"id": i, "item1": {"name": f"item {i}", "reason": ""}} for i in (1, 2, 3)]
+    text = "```json\n" + json.dumps({"outfits": outfits}) + "\n```"
+    scanner = JSONScanner(capture=("{", "[", "{"))
+    seen = []
+    for i, ch in enumerate(text):
+        for obj, repaired in scanner.feed(ch):
+            seen.append((json.loads(obj), i))
+            assert not repaired
+    assert [obj for obj, _ in seen] == outfits
+    # The first outfit is out before the second one starts
+    assert seen[0][1] < text.index('"id": 2')
+
+
+def test_capture_reports_repairs():
+    scanner = JSONScanner(capture=("{", "[", "{"))
+    captured = scanner.feed('{"outfits": [{"id": 1,}, {"id": 2}]}')
+    assert [json.loads(text) for text, _ in captured] == [{"id": 1}, {"id": 2}]
+    assert [repaired for _, repaired in captured] == [True, False]
+
+
+def test_on_repair_only_for_malformed():
+    calls = []
+    loads('{"a": 1}', on_repair=lambda: calls.append(1))
+    assert calls == []
+    loads('{"a": 1,}', on_repair=lambda: calls.append(1))
+    assert calls == [1]
+
+
+def test_scan_is_linear():
+    """A reply 20x larger takes roughly 20x longer, not 400x."""
+    outfit = json.dumps({"id": 1, "item1": {"name": "x" * 20, "reason": "y" * 60}}) + ",\n// note\n"
+    small = "{'outfits': [" + outfit * 20
+    large = "{'outfits': [" + outfit * 400
+    t_small = _best_of(lambda: repair_json(small))
+    t_large = _best_of(lambda: repair_json(large))
+    assert t_large < t_small * 60
+
+
+def _best_of(fn, runs: int = 5) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark(repeat: int = 200) -> None:
+    """Print the repair cost per corpus case, next to json.loads on the clean value."""
+    print(f"{'case':36} {'bytes':>6} {'repair us':>10} {'json.loads us':>14}")
+    for case in PARSEABLE:
+        clean = json.dumps(case["expected"])
+        t_repair = _best_of(lambda: [loads(case["input"]) for _ in range(repeat)]) / repeat
+        t_clean = _best_of(lambda: [json.loads(clean) for _ in range(repeat)]) / repeat
+        print(f"{case['name']:36} {len(case['input']):>6} {t_repair * 1e6:>10.1f} {t_clean * 1e6:>14.1f}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,235 @@
+"""
+Tests for the Ollama client against a local stand-in for Ollama's
+/api/generate (http.server on a random port; no Ollama install needed).
+"""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import loadtest
+
+pytestmark = pytest.mark.usefixtures("environment")
+
+REPLY = json.dumps(loadtest.FAKE_OUTFITS)
+
+
+class StandInOllama(BaseHTTPRequestHandler):
+    """Answers /api/generate like Ollama: loads, plain and streamed generations."""
+
+    protocol_version = "HTTP/1.1"   # keep-alive, so connection reuse is observable
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        model = body.get("model")
+        with server.lock:
+            server.requests.append({"body": body, "client": self.client_address})
+            server.active[model] = server.active.get(model, 0) + 1
+            server.peak[model] = max(server.peak.get(model, 0), server.active[model])
+        try:
+            if self.path != "/api/generate":
+                return self._json(404, {"error": "not found"})
+            if model not in server.models:
+                return self._json(404, {"error": f"model '{model}' not found, try pulling it first"})
+            time.sleep(server.delay)
+            if "prompt" not in body:
+                return self._json(200, {"model": model, "response": "", "done": True, "done_reason": "load"})
+            final = {
+                "model": model, "done": True, "prompt_eval_count": 12, "eval_count": 34,
+                "load_duration": 2_500_000,
+            }
+            if not body.get("stream", True):
+                return self._json(200, {**final, "response": REPLY})
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i in range(0, len(REPLY), 40):
+                self._chunk({"model": model, "response": REPLY[i:i + 40], "done": False})
+            self._chunk({**final, "response": ""})
+            self.wfile.write(b"0\r\n\r\n")
+        finally:
+            with server.lock:
+                server.active[model] -= 1
+
+    def _json(self, status: int, data: dict) -> None:
+        payload = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _chunk(self, data: dict) -> None:
+        line = json.dumps(data).encode() + b"\n"
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StandInOllama)
+    httpd.daemon_threads = True
+    httpd.lock = threading.Lock()
+    httpd.requests, httpd.active, httpd.peak = [], {}, {}
+    httpd.models = {"llama3:8b", "phi3:mini"}
+    httpd.delay = 0
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    thread = threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _client(server, **kwargs):
+    from ollama_client import OllamaClient
+
+    return OllamaClient(server.url, kwargs.pop("models", ["llama3:8b", "phi3:mini"]), **kwargs)
+
+
+def _run(client, call):
+    """Run `call(client)` on a fresh event loop, closing the client after."""
+    async def run():
+        try:
+            return await call(client)
+        finally:
+            await client.aclose()
+
+    return asyncio.run(run())
+
+
+def test_generate_sets_keep_alive_and_reuses_connection(server):
+    async def run(client):
+        for model in ("llama3:8b", "phi3:mini", "llama3:8b"):
+            data = await client.agenerate("outfit please", model)
+            assert data["model"] == model
+            assert json.loads(data["response"]) == loadtest.FAKE_OUTFITS
+        return client
+
+    client = _run(_client(server, keep_alive="45m"), run)
+    bodies = [r["body"] for r in server.requests]
+    assert all(b["keep_alive"] == "45m" for b in bodies)
+    assert all(b["format"] == "json" and b["stream"] is False for b in bodies)
+    assert len({r["client"] for r in server.requests}) == 1
+    assert client.stats()["models"]["llama3:8b"]["last_load_ms"] == 2.5
+
+
+def test_unknown_model_uses_default(server):
+    client = _client(server)
+    assert client.resolve_model("phi3:mini") == "phi3:mini"
+    assert _run(client, lambda c: c.agenerate("hi", "not-configured"))["model"] == "llama3:8b"
+
+
+def test_full_generate_url_is_accepted(server):
+    from ollama_client import OllamaClient
+
+    client = OllamaClient(server.url + "/api/generate", ["llama3:8b"], keep_alive="-1")
+    assert client.generate_url == server.url + "/api/generate"
+    _run(client, lambda c: c.agenerate("hi"))
+    assert server.requests[-1]["body"]["keep_alive"] == -1
+
+
+def test_stream_yields_ndjson_messages(server):
+    async def run():
+        client = _client(server)
+        messages = [m async for m in client.stream("outfit please", "phi3:mini")]
+        await client.aclose()
+        return messages
+
+    messages = asyncio.run(run())
+    assert len(messages) > 2
+    assert "".join(m["response"] for m in messages) == REPLY
+    assert messages[-1]["done"] and messages[-1]["eval_count"] == 34
+    assert server.requests[0]["body"]["stream"] is True
+
+
+def test_http_errors_are_raised(server):
+    server.models = {"phi3:mini"}
+    client = _client(server)
+    with pytest.raises(Exception, match="404"):
+        _run(client, lambda c: c.agenerate("hi", "llama3:8b"))
+    assert client.pools["llama3:8b"].in_flight == 0
+
+
+def test_preload_loads_each_model(server):
+    async def run():
+        client = _client(server, keep_alive="1h")
+        result = await client.preload()
+        await client.aclose()
+        return client, result
+
+    client, result = asyncio.run(run())
+    assert {model: r["state"] for model, r in result.items()} == {"llama3:8b": "loaded", "phi3:mini": "loaded"}
+    bodies = sorted((r["body"] for r in server.requests), key=lambda b: b["model"])
+    assert bodies == [{"model": "llama3:8b", "keep_alive": "1h"}, {"model": "phi3:mini", "keep_alive": "1h"}]
+    assert client.stats()["models"]["phi3:mini"]["preload"]["state"] == "loaded"
+
+
+def test_preload_records_failures():
+    from ollama_client import OllamaClient
+
+    async def run():
+        client = OllamaClient("http://127.0.0.1:9", ["llama3:8b"], timeout=2)
+        result = await client.preload()
+        await client.aclose()
+        return result
+
+    result = asyncio.run(run())
+    assert result["llama3:8b"] == {"state": "failed", "error": "server not reachable"}
+
+
+def test_concurrency_is_limited_per_model(server):
+    server.delay = 0.05
+
+    async def run():
+        client = _client(server, max_concurrency=1, max_queue=10)
+        calls = [client.agenerate("hi", model) for model in ["llama3:8b", "phi3:mini"] * 3]
+        await asyncio.gather(*calls)
+        await client.aclose()
+
+    asyncio.run(run())
+    assert server.peak == {"llama3:8b": 1, "phi3:mini": 1}
+
+
+def test_full_model_queue_is_busy(server):
+    from providers import ProviderBusy
+
+    server.delay = 0.05
+
+    async def run():
+        client = _client(server, max_concurrency=1, max_queue=0)
+        results = await asyncio.gather(
+            client.agenerate("hi"), client.agenerate("hi"), client.agenerate("hi", "phi3:mini"),
+            return_exceptions=True,
+        )
+        await client.aclose()
+        return results
+
+    first, second, other = asyncio.run(run())
+    assert first["model"] == "llama3:8b" and other["model"] == "phi3:mini"
+    assert isinstance(second, ProviderBusy)
+
+
+def test_llm_provider_calls_go_through_client(server, monkeypatch):
+    import llm
+
+    monkeypatch.setattr(llm, "ollama", _client(server))
+
+    async def run():
+        result = await llm._ollama_suggestion_async("outfit please", "phi3:mini")
+        chunks = [chunk async for chunk in llm._ollama_stream("outfit please", "phi3:mini")]
+        await llm.ollama.aclose()
+        return result, chunks
+
+    result, chunks = asyncio.run(run())
+    assert [o["id"] for o in result["outfits"]] == [1, 2, 3]
+    assert "".join(chunks) == REPLY
+    assert [r["body"]["model"] for r in server.requests] == ["phi3:mini", "phi3:mini"]
@@ -0,0 +1,85 @@
+"""
+Tests for cursor pagination of /wardrobe and /favorites, driven in-process
+through TestClient against a throwaway database.
+"""
+import argparse
+import base64
+import json
+import os
+import uuid
+from unittest import mock
+
+import pytest
+
+import loadtest
+
+
+@pytest.fixture(scope="module")
+def client():
+    """Signed-in TestClient; the environment is restored afterwards."""
+    with mock.patch.dict(os.environ):
+        loadtest.configure_environment(argparse.Namespace(bcrypt_rounds=4, cache=False))
+        from fastapi.testclient import TestClient
+        import main
+
+        with TestClient(main.app) as client:
+            r = client.post("/signup", json={
+                "name": "Pager", "email": f"pager-{uuid.uuid4().hex[:10]}@example.com",
+                "password": "pager-password", "gender": "male",
+            })
+            client.headers["Authorization"] = f"Bearer {r.json()['access_token']}"
+            for i in range(3):
+                client.post("/wardrobe", json={"category": "clothing", "name": f"shirt {i}", "color": "blue"})
+                client.post("/favorites", json={
+                    "title": f"Look {i}", "source_item": "hoodie", "vibe": "street",
+                    "payload": loadtest.FAKE_OUTFITS["outfits"][0],
+                })
+            yield client
+
+
+def _cursor(*values) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(values)).encode()).decode()
+
+
+def test_wardrobe_pages_follow_cursor(client):
+    r = client.get("/wardrobe", params={"limit": 2})
+    assert r.status_code == 200 and len(r.json()) == 2
+    r = client.get("/wardrobe", params={"limit": 2, "cursor": r.headers["x-next-cursor"]})
+    assert [item["name"] for item in r.json()] == ["shirt 2"]
+    assert "x-next-cursor" not in r.headers
+
+
+@pytest.mark.parametrize("cursor", [
+    _cursor("2024-01-01T00:00:00", 5),   # a /favorites cursor
+    _cursor(),
+    _cursor("5"),
+    _cursor(True),
+    base64.urlsafe_b64encode(b'{"id": 5}').decode(),
+    "not base64 at all!",
+])
+def test_wardrobe_rejects_foreign_cursor(client, cursor):
+    r = client.get("/wardrobe", params={"cursor": cursor})
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Invalid cursor"
+
+
+def test_favorites_pages_follow_cursor(client):
+    r = client.get("/favorites", params={"limit": 2})
+    assert [fav["title"] for fav in r.json()] == ["Look 2", "Look 1"]
+    r = client.get("/favorites", params={"limit": 2, "cursor": r.headers["x-next-cursor"]})
+    assert [fav["title"] for fav in r.json()] == ["Look 0"]
+    assert r.json()[0]["payload"] == loadtest.FAKE_OUTFITS["outfits"][0]
+
+
+@pytest.mark.parametrize("cursor", [
+    _cursor(1),                          # a /wardrobe cursor
+    _cursor("2024-01-01T00:00:00"),
+    _cursor("yesterday", 5),
+    _cursor(20240101, 5),
+    _cursor("2024-01-01T00:00:00", "5"),
+    _cursor("2024-01-01T00:00:00", 5, 6),
+])
+def test_favorites_rejects_foreign_cursor(client, cursor):
+    r = client.get("/favorites", params={"cursor": cursor})
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Invalid cursor"
@@ -0,0 +1,89 @@
+"""
+Tests for the bcrypt pool: spawned worker processes, and recovery when the
+pool breaks (a killed worker, or workers that cannot start at all).
+"""
+import asyncio
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import passwords
+from passwords import PasswordHasher
+
+
+def _hasher(**kwargs) -> PasswordHasher:
+    return PasswordHasher(rounds=4, workers=1, max_pending=8, **kwargs)
+
+
+def test_hashes_in_spawned_processes():
+    hasher = _hasher()
+
+    async def run():
+        hashed = await hasher.hash("s3cret")
+        return hashed, await hasher.verify("s3cret", hashed), await hasher.verify("wrong", hashed)
+
+    try:
+        hashed, good, bad = asyncio.run(run())
+        assert isinstance(hasher._executor, ProcessPoolExecutor)
+        assert hasher._executor._mp_context.get_start_method() == "spawn"
+    finally:
+        hasher.shutdown()
+    assert passwords.hash_rounds(hashed) == 4
+    assert good == (True, None) and bad == (False, None)
+
+
+def test_killed_worker_gets_a_fresh_pool():
+    hasher = _hasher()
+
+    async def run():
+        await hasher.hash("first")
+        broken = hasher._executor
+        for process in list(broken._processes.values()):
+            process.kill()
+            process.join()
+        hashed = await hasher.hash("second")
+        return broken, hashed
+
+    try:
+        broken, hashed = asyncio.run(run())
+        assert isinstance(hasher._executor, ProcessPoolExecutor)
+        assert hasher._executor is not broken
+    finally:
+        hasher.shutdown()
+    assert passwords.verify_and_update("second", hashed, 4) == (True, None)
+    assert hasher.stats()["pending"] == 0
+
+
+class _BrokenPool:
+    """Stands in for a process pool whose workers die on start."""
+
+    created = 0
+
+    def __init__(self, **kwargs):
+        _BrokenPool.created += 1
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_exception(BrokenProcessPool("worker exited on start"))
+        return future
+
+    def shutdown(self, **kwargs):
+        pass
+
+
+def test_pool_that_keeps_breaking_falls_back_to_threads(monkeypatch):
+    monkeypatch.setattr(passwords, "ProcessPoolExecutor", _BrokenPool)
+    _BrokenPool.created = 0
+    hasher = _hasher()
+
+    async def run():
+        return [await hasher.hash("pw"), await hasher.hash("pw")]
+
+    try:
+        hashes = asyncio.run(run())
+        assert isinstance(hasher._executor, ThreadPoolExecutor)
+    finally:
+        hasher.shutdown()
+    # One retry on a fresh pool, then threads from then on
+    assert _BrokenPool.created == 2
+    assert not hasher.use_processes
+    assert all(passwords.verify_and_update("pw", h, 4)[0] for h in hashes)
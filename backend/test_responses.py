@@ -0,0 +1,138 @@
+"""
+Contract tests and benchmarks for the fast /chat and /models responses.
+The fast path must put the same bytes on the wire as FastAPI's
+response_model validation followed by JSONResponse.
+
+Run the tests with pytest; `python test_responses.py` prints timings.
+"""
+import argparse
+import json
+import time
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+import loadtest
+import responses
+
+pytestmark = pytest.mark.usefixtures("environment")
+
+TRICKY_STRINGS = [
+    "plain", "", "quotes \" and \\ backslash", "tab\tnewline\nreturn\r",
+    "control \x00\x01\x1f\x7f", "unicode café – ✓", "emoji 👟🧥", "line sep \u2028 para \u2029",
+    "</script>", "null", "1e5",
+]
+
+
+def _reference_chat(result: dict) -> bytes:
+    """What FastAPI sent for /chat before: response_model validation + JSONResponse."""
+    from schemas import ChatResponse
+
+    return JSONResponse(ChatResponse.model_validate(result).model_dump(mode="json")).body
+
+
+def _reference_models(payload: dict) -> bytes:
+    """What FastAPI sent for /models before: jsonable_encoder + JSONResponse."""
+    return JSONResponse(jsonable_encoder(payload)).body
+
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, monkeypatch):
+    """Run a test with orjson (if installed) and with the stdlib fallback."""
+    if request.param == "json":
+        monkeypatch.setattr(responses, "orjson", None)
+    elif responses.orjson is None:
+        pytest.skip("orjson not installed")
+    return request.param
+
+
+@pytest.mark.parametrize("text", TRICKY_STRINGS)
+def test_dumps_matches_json_response(encoder, text):
+    content = {"text": text, "list": [text, 1, -2, 3.5, True, False, None], "nested": {text: [text]}}
+    assert responses.dumps(content) == JSONResponse(content).body
+
+
+def test_chat_payload_matches_response_model(encoder):
+    from llm import _parse_outfits
+
+    raw = {"outfits": [
+        {"id": "2", "item1": {"name": text, "reason": text}, "item2": {"name": 5},
+         "footwear": None, "extra": "dropped"}
+        for text in TRICKY_STRINGS
+    ]}
+    result = _parse_outfits(json.dumps(raw))
+    fast = responses.FastJSONResponse({"outfits": result["outfits"]})
+    assert fast.body == _reference_chat(result)
+    assert fast.media_type == "application/json"
+
+
+def test_models_payload_matches_default_encoding(encoder):
+    from llm import get_available_models
+
+    payload = {"default_provider": "groq", "providers": get_available_models()}
+    assert responses.FastJSONResponse(payload).body == _reference_models(payload)
+
+
+def test_endpoints_wire_format(monkeypatch):
+    from fastapi.testclient import TestClient
+    from llm import _parse_outfits
+    import main
+
+    loadtest.install_fake_providers(median_ms=0, sigma=0, error_rate=0, patch=monkeypatch.setattr)
+    with TestClient(main.app) as client:
+        r = client.post("/signup", json={
+            "name": "Contract", "email": "contract@example.com", "password": "contract-pw", "gender": "male",
+        })
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        r = client.post("/chat", headers=headers, json={"item": "hoodie", "vibe": "street", "num_ideas": 3})
+        assert r.status_code == 200
+        assert r.headers["content-type"] == "application/json"
+        expected = _parse_outfits(json.dumps(loadtest.FAKE_OUTFITS))
+        assert r.content == _reference_chat(expected)
+
+        r = client.get("/models")
+        assert r.status_code == 200
+        assert r.headers["content-type"] == "application/json"
+        assert r.content == _reference_models(r.json())
+        assert set(r.json()["providers"]) == {"groq", "gemini", "ollama"}
+
+        # The documented schema is unchanged
+        schema = client.get("/openapi.json").json()
+        ok = schema["paths"]["/chat"]["post"]["responses"]["200"]["content"]["application/json"]
+        assert ok["schema"] == {"$ref": "#/components/schemas/ChatResponse"}
+
+
+def _per_call_us(fn, repeat: int = 2000, runs: int = 5) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.process_time()
+        for _ in range(repeat):
+            fn()
+        best = min(best, time.process_time() - start)
+    return best / repeat * 1e6
+
+
+def benchmark() -> None:
+    """Print CPU time per response for the old and the fast path."""
+    from llm import _parse_outfits, get_available_models
+
+    result = _parse_outfits(json.dumps(loadtest.FAKE_OUTFITS))
+    models = {"default_provider": "groq", "providers": get_available_models()}
+    cases = [
+        ("/chat (3 outfits)", lambda: _reference_chat(result),
+         lambda: responses.FastJSONResponse({"outfits": result["outfits"]}).body),
+        ("/models", lambda: _reference_models(models),
+         lambda: responses.FastJSONResponse(models).body),
+    ]
+    encoder = "orjson" if responses.orjson is not None else "json"
+    print(f"{'response':20} {'before us':>10} {'fast us':>10} {'saved us':>10}   (encoder: {encoder})")
+    for name, before, fast in cases:
+        t_before, t_fast = _per_call_us(before), _per_call_us(fast)
+        print(f"{name:20} {t_before:>10.1f} {t_fast:>10.1f} {t_before - t_fast:>10.1f}")
+
+
+if __name__ == "__main__":
+    loadtest.configure_environment(argparse.Namespace(bcrypt_rounds=4, cache=False))
+    benchmark()
@@ -0,0 +1,95 @@
+"""
+Tests for the /upload-image pipeline in vision.py: image preparation before
+it is sent to Gemini, and the analysis cache in front of it.
+"""
+import io
+
+import pytest
+from PIL import Image
+
+import loadtest
+
+pytestmark = pytest.mark.usefixtures("environment")
+
+ORIENTATION = 0x0112
+
+
+def _encode(img: Image.Image, fmt: str, **kwargs) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, fmt, **kwargs)
+    return buf.getvalue()
+
+
+def _prepared(data: bytes) -> Image.Image:
+    from vision import prepare_image
+
+    part = prepare_image(data)
+    assert part["mime_type"] == "image/jpeg"
+    return Image.open(io.BytesIO(part["data"]))
+
+
+def test_exif_orientation_is_applied():
+    # Stored landscape, tagged "rotate 90° clockwise" like a portrait phone photo
+    exif = Image.Exif()
+    exif[ORIENTATION] = 6
+    photo = Image.new("RGB", (3000, 2000), "navy")
+    img = _prepared(_encode(photo, "JPEG", exif=exif.tobytes()))
+    assert img.height > img.width
+    assert max(img.size) <= 1024 and img.getexif().get(ORIENTATION) in (None, 1)
+
+
+@pytest.mark.parametrize("mode", ["RGBA", "LA", "P"])
+def test_transparency_is_flattened_onto_white(mode):
+    img = Image.new("RGBA", (64, 64), (0, 0, 0, 0))
+    img.paste((200, 30, 30, 255), (16, 16, 48, 48))
+    # quantize keeps alpha as the palette's transparency table
+    data = _encode(img.quantize(colors=8) if mode == "P" else img.convert(mode), "PNG")
+    out = _prepared(data).convert("RGB")
+    assert min(out.getpixel((2, 2))) > 240              # was transparent: white, not black
+    assert out.getpixel((32, 32)) != out.getpixel((2, 2))
+
+
+@pytest.fixture
+def vision_calls(monkeypatch):
+    """Fake Gemini and an empty analysis cache; records image preparation and calls."""
+    import vision
+    from cache import ResponseCache
+
+    loadtest.install_fake_providers(median_ms=0, sigma=0, error_rate=0, patch=monkeypatch.setattr)
+    monkeypatch.setattr(vision, "analysis_cache", ResponseCache("test_vision", max_entries=10, ttl_seconds=60))
+    calls = {"prepared": 0, "parts": []}
+    prepare, generate = vision.prepare_image, vision._gemini_model.generate_content
+
+    def counting_prepare(data):
+        calls["prepared"] += 1
+        return prepare(data)
+
+    def recording_generate(parts):
+        calls["parts"].append(parts)
+        return generate(parts)
+
+    monkeypatch.setattr(vision, "prepare_image", counting_prepare)
+    monkeypatch.setattr(vision._gemini_model, "generate_content", recording_generate)
+    return calls
+
+
+@pytest.mark.parametrize("single_call", [True, False])
+def test_cached_detection_skips_image_work(vision_calls, monkeypatch, single_call):
+    import vision
+
+    monkeypatch.setattr(vision, "VISION_SINGLE_CALL", single_call)
+    data = _encode(Image.new("RGB", (800, 600), "navy"), "JPEG")
+
+    first = vision.get_outfit_from_image(data)
+    assert first["outfits"] and first["detected_item"] == loadtest.FAKE_VISION["detected_item"]
+    assert vision.get_vision_cache_stats()["misses"] == 1   # one lookup per request
+    assert len(vision_calls["parts"]) == (1 if single_call else 2)
+
+    second = vision.get_outfit_from_image(data)
+    assert second["detected_item"] == first["detected_item"] and second["outfits"]
+    assert vision_calls["prepared"] == 1
+    stats = vision.get_vision_cache_stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    # Outfits for a known item are asked for in text, without the photo
+    assert [type(part) for part in vision_calls["parts"][-1]] == [str]
+    assert loadtest.FAKE_VISION["detected_item"]["name"] in vision_calls["parts"][-1][0]
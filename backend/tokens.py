@@ -0,0 +1,10 @@
+"""
+Token counting shared by the rate limiter (reserving request budget) and the
+wardrobe index (fitting items into the prompt budget). A character heuristic,
+so it needs no tokenizer download and works the same for every provider.
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)."""
+    return max(1, (len(text) + 3) // 4)
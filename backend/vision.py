@@ -2,49 +2,69 @@
 Image analysis using Gemini Vision API.
 Analyzes clothing items and suggests outfits.
 """
-import json
-from typing import Dict, Optional, List
-from PIL import Image
+import io
+import math
+import asyncio
+import time
+import hashlib
+from typing import Dict, Optional, List, Union
+from PIL import Image, ImageOps
 
-from config import GEMINI_API_KEY
+from config import (
+    CHAT_CACHE_PATH, VISION_SINGLE_CALL,
+    VISION_CACHE_ENABLED, VISION_CACHE_MAX_ENTRIES, VISION_CACHE_TTL_SECONDS,
+    VISION_MAX_DIMENSION, VISION_JPEG_QUALITY, COALESCE_REQUESTS,
+)
+from cache import ResponseCache, make_cache_key
+from metrics import observe_llm, record_tokens, json_repairs
+from jsonrepair import loads as tolerant_loads
+from singleflight import SingleFlight
+from wardrobe_index import WardrobeIndex, needs_pruning
+from providers import gemini_sdk
+from ratelimit import (
+    RateLimited, estimate_request_tokens, reserve, track_usage,
+    report_error, report_usage, retry_after_from_error,
+)
 
 
-# Gemini Vision setup
-try:
-    import google.generativeai as genai
-    
-    if GEMINI_API_KEY:
-        genai.configure(api_key=GEMINI_API_KEY)
-        _gemini_model = genai.GenerativeModel('gemini-2.5-flash')
-    else:
-        _gemini_model = None
-except Exception as e:
-    print(f"⚠ Gemini Vision not available: {e}")
-    _gemini_model = None
+VISION_MODEL = "gemini-2.5-flash"
+# Gemini bills an image as 258 tokens per 768x768 tile
+IMAGE_TOKENS = 258 * math.ceil(VISION_MAX_DIMENSION / 768) ** 2
 
+# Gemini Vision model, created on first use (the SDK loads via providers.py)
+_gemini_model = None
 
-def analyze_clothing_image(image_path: str) -> Dict[str, Optional[str]]:
-    """
-    Analyze a clothing item image using Gemini Vision.
-    
-    Returns:
-        Dict with: category, name, color, pattern, style, season, description
-    """
-    if not _gemini_model:
-        return {
-            "category": None,
-            "name": None,
-            "color": None,
-            "pattern": None,
-            "style": None,
-            "season": None,
-            "description": "Gemini API not configured"
-        }
-    
-    try:
-        img = Image.open(image_path)
-        
-        prompt = """Analyze this clothing item and provide a JSON response:
+
+def _get_vision_model():
+    """Shared Gemini Vision model, or None if Gemini is unavailable."""
+    global _gemini_model
+    if _gemini_model is None:
+        genai = gemini_sdk.get()
+        if genai is not None:
+            _gemini_model = genai.GenerativeModel(VISION_MODEL)
+    return _gemini_model
+
+
+def warm_up() -> None:
+    """Load the Gemini SDK and vision model ahead of the first upload."""
+    _get_vision_model()
+
+
+# Detection results keyed by image content hash, so a re-uploaded photo
+# skips the analysis round-trip
+analysis_cache = ResponseCache(
+    "vision_analysis",
+    max_entries=VISION_CACHE_MAX_ENTRIES,
+    ttl_seconds=VISION_CACHE_TTL_SECONDS,
+    path=CHAT_CACHE_PATH or None,
+) if VISION_CACHE_ENABLED else None
+
+# Identical uploads (same image, prompt and wardrobe) in flight at the same
+# time share one Gemini call
+outfit_flight = SingleFlight("upload") if COALESCE_REQUESTS else None
+
+
+ANALYSIS_PROMPT = """Analyze this clothing item and provide a JSON response:
 {
   "category": "clothing|footwear|accessory",
   "name": "specific item name (e.g., 'black hoodie', 'blue jeans')",
@@ -56,120 +76,379 @@ def analyze_clothing_image(image_path: str) -> Dict[str, Optional[str]]:
 }
 
 Return ONLY valid JSON, no markdown."""
-        
-        response = _gemini_model.generate_content([prompt, img])
-        text = response.text.strip()
-        
-        # Clean markdown code blocks
-        if text.startswith("```json"):
-            text = text[7:]
-        if text.startswith("```"):
-            text = text[3:]
-        if text.endswith("```"):
-            text = text[:-3]
-        text = text.strip()
-        
-        return json.loads(text)
-        
+
+OUTFITS_ARRAY_FORMAT = """[
+    {
+      "name": "outfit name",
+      "item1": {"name": "top/shirt", "id": null},
+      "item2": {"name": "bottom/pants", "id": null},
+      "footwear": {"name": "shoes", "id": null},
+      "accessories": {"name": "accessory or 'none'", "id": null},
+      "reason": "why this works"
+    }
+  ]"""
+
+
+def _empty_analysis(description: str) -> Dict[str, Optional[str]]:
+    """Analysis result with every field unset."""
+    return {
+        "category": None,
+        "name": None,
+        "color": None,
+        "pattern": None,
+        "style": None,
+        "season": None,
+        "description": description
+    }
+
+
+def _parse_json(text: str):
+    """Parse a Gemini reply, repairing fences, prose, comments and truncation."""
+    return tolerant_loads(text.strip(), on_repair=lambda: json_repairs.inc("vision"))
+
+
+def image_hash(data: bytes) -> str:
+    """Content hash used as the analysis cache key."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """MIME type from an image's magic bytes (JPEG, PNG or WebP), else None."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def prepare_image(data: bytes) -> Dict:
+    """
+    Decode, downscale and re-encode an image for Gemini.
+
+    JPEGs are decoded in draft mode, which lets libjpeg scale down by a
+    power of two while decoding instead of materializing the full photo.
+    The EXIF orientation is applied (re-encoding drops the tag) and
+    transparent areas are flattened onto white.
+
+    Returns:
+        Inline image part: {"mime_type": "image/jpeg", "data": bytes}
+    """
+    img = Image.open(io.BytesIO(data))
+    bound = (VISION_MAX_DIMENSION, VISION_MAX_DIMENSION)
+    if img.format == "JPEG":
+        img.draft("RGB", bound)
+    img.thumbnail(bound)
+    # Phone photos are stored sideways with an orientation tag
+    img = ImageOps.exif_transpose(img)
+    if img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info):
+        rgba = img.convert("RGBA")
+        img = Image.new("RGB", rgba.size, (255, 255, 255))
+        img.paste(rgba, mask=rgba.getchannel("A"))
+    elif img.mode != "RGB":
+        img = img.convert("RGB")
+
+    out = io.BytesIO()
+    img.save(out, format="JPEG", quality=VISION_JPEG_QUALITY)
+    return {"mime_type": "image/jpeg", "data": out.getvalue()}
+
+
+def _read_image(image: Union[str, bytes]) -> bytes:
+    """Raw bytes of an image given as a path or as bytes."""
+    if isinstance(image, (bytes, bytearray)):
+        return bytes(image)
+    with open(image, "rb") as f:
+        return f.read()
+
+
+def analyze_clothing_image(image: Union[str, bytes]) -> Dict[str, Optional[str]]:
+    """
+    Analyze a clothing item image using Gemini Vision.
+
+    Args:
+        image: Path to the image or its raw bytes
+
+    Returns:
+        Dict with: category, name, color, pattern, style, season, description
+    """
+    if not _get_vision_model():
+        return _empty_analysis("Gemini API not configured")
+
+    try:
+        data = _read_image(image)
+        digest = image_hash(data)
+        cached = _cached_analysis(digest)
+        if cached is not None:
+            return cached
+        return _analyze(prepare_image(data), digest)
     except Exception as e:
         print(f"⚠ Gemini analysis error: {e}")
-        return {
-            "category": None,
-            "name": None,
-            "color": None,
-            "pattern": None,
-            "style": None,
-            "season": None,
-            "description": f"Analysis failed: {e}"
-        }
+        return _empty_analysis(f"Analysis failed: {e}")
+
+
+def _cached_analysis(digest: str) -> Optional[Dict]:
+    """Detection cached for this image content, checked before any image work."""
+    return analysis_cache.get(digest) if analysis_cache is not None else None
+
+
+def _analyze(img: Dict, digest: str) -> Dict[str, Optional[str]]:
+    """Detection for a prepared image part (the caller already missed the cache)."""
+    response = _generate([ANALYSIS_PROMPT, img])
+    detected = _parse_json(response.text)
+    _remember_analysis(digest, detected)
+    return detected
+
+
+def _generate(parts: List):
+    """One Gemini Vision call, timed and token-counted for /metrics."""
+    start = time.perf_counter()
+    try:
+        response = _get_vision_model().generate_content(parts)
+    except Exception as e:
+        observe_llm("gemini-vision", VISION_MODEL, time.perf_counter() - start, False)
+        report_error(e)
+        raise
+    observe_llm("gemini-vision", VISION_MODEL, time.perf_counter() - start, True)
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        record_tokens("gemini-vision", VISION_MODEL, usage.prompt_token_count, usage.candidates_token_count)
+        report_usage(usage.prompt_token_count, usage.candidates_token_count)
+    return response
+
+
+def _remember_analysis(digest: str, detected) -> None:
+    """Cache a detection result if it actually identified something."""
+    if analysis_cache is not None and isinstance(detected, dict) and detected.get("name"):
+        analysis_cache.set(digest, detected)
+
+
+def get_vision_cache_stats() -> dict:
+    """Hit/miss counters for the image analysis cache."""
+    if analysis_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **analysis_cache.stats()}
 
 
 def get_outfit_from_image(
-    image_path: str,
+    image: Union[str, bytes],
     user_prompt: Optional[str] = None,
     wardrobe_items: Optional[List[Dict]] = None
 ) -> Dict:
     """
     Analyze clothing image and suggest complete outfits.
-    
+
+    With VISION_SINGLE_CALL, detection and outfits come back from one
+    multimodal request; a cached detection for the same image content
+    skips the analysis part entirely.
+
     Args:
-        image_path: Path to clothing image
+        image: Path to clothing image, or its raw bytes
         user_prompt: Optional user instructions
-        wardrobe_items: Optional list of user's wardrobe items
-    
+        wardrobe_items: Optional list of user's wardrobe items, or a WardrobeSnapshot
+
     Returns:
         Dict with: detected_item, outfits (list), error (optional)
     """
-    if not _gemini_model:
+    if not _get_vision_model():
         return {
             "error": "Gemini not configured. Set GEMINI_API_KEY.",
             "detected_item": None,
             "outfits": []
         }
-    
+
     try:
-        img = Image.open(image_path)
-        
-        # Analyze the item first
-        detected = analyze_clothing_image(image_path)
-        
-        # Build wardrobe context
-        wardrobe_context = ""
-        if wardrobe_items:
-            items_list = "\n".join([
-                f"- {item.get('category', 'item')}: {item.get('name', 'unknown')} ({item.get('color', 'unknown color')})"
-                for item in wardrobe_items
-            ])
-            wardrobe_context = f"\n\nUser's wardrobe:\n{items_list}\n\nSuggest outfits using these items when possible."
-        
-        # Build prompt
-        user_context = f" {user_prompt}" if user_prompt else ""
-        prompt = f"""Based on this clothing item, suggest 3 complete outfit combinations.{user_context}
-
-Detected: {detected.get('name', 'unknown')} - {detected.get('description', '')}{wardrobe_context}
+        data = _read_image(image)
+        digest = image_hash(data)
+
+        # A cached detection stands in for the photo, so the image is only
+        # decoded and re-encoded on a miss
+        img = None
+        detected = _cached_analysis(digest)
+        if detected is None:
+            img = prepare_image(data)
+            if VISION_SINGLE_CALL:
+                return _combined_outfits(img, digest, user_prompt, wardrobe_items)
+            try:
+                detected = _analyze(img, digest)
+            except Exception as e:
+                print(f"⚠ Gemini analysis error: {e}")
+                detected = _empty_analysis(f"Analysis failed: {e}")
+
+        prompt = f"""Based on this clothing item, suggest 3 complete outfit combinations.{_user_context(user_prompt)}
+
+Detected: {_describe_detected(detected)}{_wardrobe_context(wardrobe_items, f"{detected.get('color') or ''} {detected.get('name') or ''}", user_prompt)}
 
 Provide JSON format:
 {{
-  "outfits": [
-    {{
-      "name": "outfit name",
-      "item1": {{"name": "top/shirt", "id": null}},
-      "item2": {{"name": "bottom/pants", "id": null}},
-      "footwear": {{"name": "shoes", "id": null}},
-      "accessories": {{"name": "accessory or 'none'", "id": null}},
-      "reason": "why this works"
-    }}
-  ]
+  "outfits": {OUTFITS_ARRAY_FORMAT}
 }}
 
 Rules:
 1. Include detected item in EVERY outfit
 2. Make suggestions practical and stylish
 3. Return ONLY valid JSON, no markdown"""
-        
-        response = _gemini_model.generate_content([prompt, img])
-        text = response.text.strip()
-        
-        # Clean markdown
-        if text.startswith("```json"):
-            text = text[7:]
-        if text.startswith("```"):
-            text = text[3:]
-        if text.endswith("```"):
-            text = text[:-3]
-        text = text.strip()
-        
-        result = json.loads(text)
-        
+
+        response = _generate([prompt, img] if img is not None else [prompt])
+        result = _parse_json(response.text)
+
         return {
             "detected_item": detected,
             "outfits": result.get("outfits", [])
         }
-        
+
     except Exception as e:
         print(f"⚠ Outfit suggestion error: {e}")
+        retry_after = retry_after_from_error(e)
+        if retry_after is not None:
+            return {
+                "error": f"Gemini rate limit reached, retry in {math.ceil(retry_after)}s",
+                "detected_item": None,
+                "outfits": [],
+                "retry_after": retry_after,
+            }
         return {
             "error": f"Failed to generate outfits: {e}",
             "detected_item": None,
             "outfits": []
         }
+
+
+async def get_outfit_from_image_async(
+    data: bytes,
+    user_prompt: Optional[str] = None,
+    wardrobe_items: Optional[List[Dict]] = None
+) -> Dict:
+    """
+    `get_outfit_from_image` on a worker thread, coalescing identical uploads.
+    
+    Requests are identical when the image bytes, prompt and wardrobe match.
+    Waits for Gemini rate-limit budget first (shared with chat on the same
+    model); a call that would wait too long returns `retry_after` instead.
+    """
+    async def run():
+        try:
+            reservation = await reserve("gemini", VISION_MODEL, _estimate_upload_tokens(user_prompt))
+        except RateLimited as e:
+            return {"error": str(e), "detected_item": None, "outfits": [], "retry_after": e.retry_after}
+        # to_thread copies the context, so the worker reports usage to the reservation
+        with track_usage(reservation):
+            return await asyncio.to_thread(get_outfit_from_image, data, user_prompt, wardrobe_items)
+    
+    if outfit_flight is None:
+        return await run()
+    key = make_cache_key(
+        image_hash(data),
+        " ".join((user_prompt or "").split()).lower(),
+        _wardrobe_key(wardrobe_items),
+    )
+    return await outfit_flight.do(key, run)
+
+
+def _estimate_upload_tokens(user_prompt: Optional[str]) -> int:
+    """Rough cost of an upload: prompt template, user text and the image."""
+    return estimate_request_tokens(f"{ANALYSIS_PROMPT}{OUTFITS_ARRAY_FORMAT}{user_prompt or ''}", IMAGE_TOKENS)
+
+
+def _wardrobe_key(wardrobe_items) -> Optional[str]:
+    """Fingerprint of the wardrobe passed with an upload."""
+    if not wardrobe_items:
+        return None
+    fingerprint = getattr(wardrobe_items, "fingerprint", None)
+    if fingerprint:
+        return fingerprint
+    return make_cache_key(wardrobe_items)
+
+
+def get_upload_coalescing_stats() -> dict:
+    """Gemini calls made vs. uploads that joined an identical one in flight."""
+    if outfit_flight is None:
+        return {"enabled": False}
+    return {"enabled": True, **outfit_flight.stats()}
+
+
+def _combined_outfits(
+    img: Dict,
+    digest: str,
+    user_prompt: Optional[str],
+    wardrobe_items: Optional[List[Dict]]
+) -> Dict:
+    """Detect the item and suggest outfits in a single Gemini call."""
+    prompt = f"""Identify the clothing item in this image, then suggest 3 complete outfit combinations built around it.{_user_context(user_prompt)}{_wardrobe_context(wardrobe_items, user_prompt or "")}
+
+Provide JSON format:
+{{
+  "detected_item": {{
+    "category": "clothing|footwear|accessory",
+    "name": "specific item name (e.g., 'black hoodie', 'blue jeans')",
+    "color": "dominant color",
+    "pattern": "pattern type or null",
+    "style": "style or null",
+    "season": "best season or null",
+    "description": "brief 1-2 sentence description"
+  }},
+  "outfits": {OUTFITS_ARRAY_FORMAT}
+}}
+
+Rules:
+1. Include detected item in EVERY outfit
+2. Make suggestions practical and stylish
+3. Return ONLY valid JSON, no markdown"""
+
+    response = _generate([prompt, img])
+    result = _parse_json(response.text)
+    detected = result.get("detected_item") or _empty_analysis("Item not identified")
+    _remember_analysis(digest, detected)
+
+    return {
+        "detected_item": detected,
+        "outfits": result.get("outfits", [])
+    }
+
+
+def _describe_detected(detected: Dict) -> str:
+    """Detected item for outfit prompts, detailed enough to stand in for the photo."""
+    name = detected.get("name") or "unknown"
+    details = [str(detected[k]) for k in ("color", "pattern", "style", "season") if detected.get(k)]
+    if details:
+        name = f"{name} ({', '.join(details)})"
+    return f"{name} - {detected.get('description') or ''}"
+
+
+def _user_context(user_prompt: Optional[str]) -> str:
+    """User instructions appended to outfit prompts."""
+    return f" {user_prompt}" if user_prompt else ""
+
+
+def _wardrobe_context(
+    wardrobe_items: Optional[List[Dict]],
+    base_item: str = "",
+    query: Optional[str] = None
+) -> str:
+    """
+    Wardrobe block appended to outfit prompts.
+    
+    Pre-rendered on a WardrobeSnapshot; wardrobes over the prompt budget
+    are pruned to the items most relevant to the base item and query.
+    """
+    index = getattr(wardrobe_items, "index", None)
+    if not isinstance(index, WardrobeIndex):
+        index = None   # a plain list's .index is the list method
+    if index is None and hasattr(wardrobe_items, "vision_text"):
+        return wardrobe_items.vision_text
+    if index is None and not wardrobe_items:
+        return ""
+    if index is None and needs_pruning([item.get("name") for item in wardrobe_items]):
+        index = WardrobeIndex(wardrobe_items)
+    if index is not None:
+        return render_wardrobe_context(index.select(base_item, query or ""))
+    return render_wardrobe_context(wardrobe_items)
+
+
+def render_wardrobe_context(wardrobe_items: List[Dict]) -> str:
+    """One line per wardrobe item for the vision prompt."""
+    items_list = "\n".join([
+        f"- {item.get('category', 'item')}: {item.get('name', 'unknown')} ({item.get('color', 'unknown color')})"
+        for item in wardrobe_items
+    ])
+    return f"\n\nUser's wardrobe:\n{items_list}\n\nSuggest outfits using these items when possible."
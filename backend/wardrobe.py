@@ -0,0 +1,100 @@
+"""
+Per-user wardrobe snapshots shared by /chat and /upload-image.
+A snapshot is built once per wardrobe version: items bucketed by category
+and the prompt text for both the chat and vision prompts pre-rendered.
+"""
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from config import WARDROBE_SNAPSHOT_TTL_SECONDS, WARDROBE_SNAPSHOT_MAX_USERS
+from cache import ResponseCache
+from db import WardrobeItem
+from llm import render_wardrobe_block, wardrobe_fingerprint
+from vision import render_wardrobe_context
+from wardrobe_index import WardrobeIndex, needs_pruning
+
+
+@dataclass(frozen=True)
+class WardrobeSnapshot:
+    """Immutable view of a user's wardrobe at one version."""
+    user_id: int
+    version: int
+    buckets: Dict[str, List[str]]   # category -> item names (chat prompt)
+    items: List[dict]               # id/category/name/color (vision prompt)
+    fingerprint: str                # content hash, stable across restarts
+    prompt_text: str                # chat WARDROBE CONSTRAINT block
+    vision_text: str                # vision "User's wardrobe" block
+    index: Optional[WardrobeIndex] = None   # set when the wardrobe is over the prompt budget
+
+
+# In-memory only: the version counters below are per process. The TTL
+# bounds staleness if another worker process edits the same wardrobe.
+_snapshots = ResponseCache(
+    "wardrobe",
+    max_entries=WARDROBE_SNAPSHOT_MAX_USERS,
+    ttl_seconds=WARDROBE_SNAPSHOT_TTL_SECONDS,
+)
+_versions: Dict[int, int] = {}
+_versions_lock = threading.Lock()
+
+
+def wardrobe_version(user_id: int) -> int:
+    """Current wardrobe version for a user."""
+    with _versions_lock:
+        return _versions.get(user_id, 0)
+
+
+def bump_wardrobe_version(user_id: int) -> int:
+    """Mark a user's wardrobe as changed; call after adding or deleting items."""
+    with _versions_lock:
+        version = _versions[user_id] = _versions.get(user_id, 0) + 1
+    _snapshots.delete(str(user_id))
+    return version
+
+
+def get_wardrobe_snapshot(db: Session, user_id: int) -> WardrobeSnapshot:
+    """Cached snapshot of a user's wardrobe, rebuilt when its version changes."""
+    version = wardrobe_version(user_id)
+    snapshot = _snapshots.get(str(user_id))
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+
+    snapshot = build_wardrobe_snapshot(db, user_id, version)
+    # A write that landed while we were querying makes this one stale
+    if wardrobe_version(user_id) == version:
+        _snapshots.set(str(user_id), snapshot)
+    return snapshot
+
+
+def build_wardrobe_snapshot(db: Session, user_id: int, version: int = 0) -> WardrobeSnapshot:
+    """Query a user's items and build a snapshot in a single pass."""
+    rows = db.query(
+        WardrobeItem.id, WardrobeItem.category, WardrobeItem.name, WardrobeItem.color
+    ).filter(WardrobeItem.user_id == user_id).order_by(WardrobeItem.id).all()
+
+    buckets: Dict[str, List[str]] = {"clothing": [], "accessory": [], "footwear": []}
+    items, names = [], []
+    for row in rows:
+        category = row.category.value
+        buckets.setdefault(category, []).append(row.name)
+        items.append({"id": row.id, "category": category, "name": row.name, "color": row.color})
+        names.append(row.name)
+
+    return WardrobeSnapshot(
+        user_id=user_id,
+        version=version,
+        buckets=buckets,
+        items=items,
+        fingerprint=wardrobe_fingerprint(buckets),
+        prompt_text=render_wardrobe_block(buckets),
+        vision_text=render_wardrobe_context(items) if items else "",
+        index=WardrobeIndex(items) if needs_pruning(names) else None,
+    )
+
+
+def get_wardrobe_stats() -> dict:
+    """Hit/miss counters for wardrobe snapshots."""
+    return _snapshots.stats()
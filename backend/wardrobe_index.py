@@ -0,0 +1,214 @@
+"""
+Relevance ranking for large wardrobes.
+Scores each item against the request's base item and vibe, using how well
+its garment role complements the base item, whether the colours work
+together, and lexical similarity. Prompts then list only the top items per
+category that fit the token budget instead of the whole wardrobe.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import WARDROBE_PROMPT_TOKEN_BUDGET, WARDROBE_TOP_K
+from similarity import normalize_text, vectorize, vectorize_one
+from tokens import estimate_tokens
+
+
+# --- Garment roles ---
+ROLES = ("top", "bottom", "outer", "dress", "footwear", "accessory")
+_UNKNOWN_ROLE = len(ROLES)
+
+ROLE_KEYWORDS = {
+    "top": ("shirt", "tshirt", "tee", "top", "blouse", "polo", "sweater", "hoodie", "sweatshirt",
+            "cardigan", "tank", "turtleneck", "jumper", "henley", "jersey", "camisole"),
+    "bottom": ("jeans", "pants", "trousers", "chinos", "shorts", "skirt", "joggers", "leggings",
+               "cargos", "slacks", "sweatpants"),
+    "outer": ("jacket", "coat", "blazer", "parka", "bomber", "vest", "windbreaker", "overcoat",
+              "trench", "puffer", "overshirt"),
+    "dress": ("dress", "jumpsuit", "romper", "suit", "gown", "saree", "kurta"),
+    "footwear": ("sneakers", "shoes", "boots", "loafers", "heels", "sandals", "trainers", "flats",
+                 "oxfords", "slides", "derbies", "mules", "brogues"),
+    "accessory": ("hat", "cap", "beanie", "watch", "belt", "bag", "scarf", "sunglasses", "necklace",
+                  "bracelet", "ring", "earrings", "backpack", "tie", "chain", "tote"),
+}
+_ROLE_BY_WORD = {
+    word: ROLES.index(role) for role, words in ROLE_KEYWORDS.items() for word in words
+}
+
+# COMPLEMENT[base role][item role]: how useful an item is next to the base
+# item. The last row/column is for garments we could not classify.
+COMPLEMENT = np.array([
+    # top  bottom outer dress foot  acc   unknown
+    [0.3,  1.0,  0.8,  0.1,  0.9,  0.6,  0.6],   # top
+    [1.0,  0.2,  0.8,  0.1,  0.9,  0.6,  0.6],   # bottom
+    [0.9,  0.9,  0.2,  0.6,  0.8,  0.6,  0.6],   # outer
+    [0.2,  0.2,  0.8,  0.2,  1.0,  0.9,  0.6],   # dress
+    [0.9,  1.0,  0.7,  0.8,  0.2,  0.6,  0.6],   # footwear
+    [0.9,  0.9,  0.7,  0.8,  0.8,  0.3,  0.6],   # accessory
+    [0.6,  0.6,  0.6,  0.6,  0.6,  0.6,  0.6],   # unknown
+], dtype=np.float32)
+
+
+# --- Colours ---
+NEUTRALS = frozenset((
+    "black", "white", "grey", "gray", "navy", "beige", "cream", "tan", "khaki", "denim",
+    "brown", "charcoal", "ivory", "camel", "taupe", "silver", "nude",
+))
+# Colour wheel, so opposite = complementary and neighbours = analogous
+HUES = ("red", "orange", "yellow", "green", "teal", "blue", "purple", "pink")
+HUE_ALIASES = {
+    "maroon": "red", "burgundy": "red", "crimson": "red", "wine": "red",
+    "rust": "orange", "coral": "orange", "peach": "orange",
+    "mustard": "yellow", "gold": "yellow", "lemon": "yellow",
+    "olive": "green", "sage": "green", "mint": "green", "emerald": "green", "lime": "green",
+    "turquoise": "teal", "aqua": "teal", "cyan": "teal",
+    "sky": "blue", "cobalt": "blue", "royal": "blue", "indigo": "blue",
+    "violet": "purple", "lavender": "purple", "lilac": "purple", "plum": "purple",
+    "rose": "pink", "magenta": "pink", "fuchsia": "pink", "blush": "pink",
+}
+_NEUTRAL = -1
+_NO_COLOUR = -2
+
+
+def _colour_code(text: Optional[str]) -> int:
+    """Hue index of the first colour word in `text`, _NEUTRAL, or _NO_COLOUR."""
+    for word in normalize_text(text).split():
+        if word in NEUTRALS:
+            return _NEUTRAL
+        hue = HUE_ALIASES.get(word, word)
+        if hue in HUES:
+            return HUES.index(hue)
+    return _NO_COLOUR
+
+
+def _colour_scores(base: int, codes: np.ndarray) -> np.ndarray:
+    """Compatibility of each item colour with the base colour, 0..1."""
+    if base == _NO_COLOUR:
+        return np.full(codes.shape, 0.5, dtype=np.float32)
+    if base == _NEUTRAL:
+        return np.where(codes == _NO_COLOUR, 0.5, 1.0).astype(np.float32)
+
+    distance = np.abs(codes - base)
+    distance = np.minimum(distance, len(HUES) - distance)
+    scores = np.select(
+        [distance == 0, distance == 1, distance == len(HUES) // 2],
+        [0.8, 0.8, 0.9],   # monochrome, analogous, complementary
+        default=0.3,
+    ).astype(np.float32)
+    scores[codes == _NEUTRAL] = 1.0
+    scores[codes == _NO_COLOUR] = 0.5
+    return scores
+
+
+def _role(text: str, category: Optional[str] = None) -> int:
+    """Garment role index for an item; the category decides shoes and accessories."""
+    if category == "footwear":
+        return ROLES.index("footwear")
+    if category == "accessory":
+        return ROLES.index("accessory")
+    for word in normalize_text(text).split():
+        role = _ROLE_BY_WORD.get(word)
+        if role is None and word.endswith("s"):
+            role = _ROLE_BY_WORD.get(word[:-1])
+        if role is None:
+            role = _ROLE_BY_WORD.get(word + "s")
+        if role is not None:
+            return role
+    return _UNKNOWN_ROLE
+
+
+# Score weights
+W_COMPLEMENT = 0.45
+W_COLOUR = 0.25
+W_LEXICAL = 0.30
+
+
+class WardrobeIndex:
+    """
+    Precomputed vectors, roles and colours for a wardrobe's items.
+
+    Built once per wardrobe snapshot; `select` then costs one small
+    matrix-vector product per request.
+    """
+
+    def __init__(self, items: List[Dict]):
+        self.items = items
+        self.categories = [item.get("category") or "clothing" for item in items]
+        texts = [f"{item.get('name') or ''} {item.get('color') or ''}" for item in items]
+        self.vectors = vectorize(texts)
+        self.roles = np.array(
+            [_role(item.get("name") or "", category) for item, category in zip(items, self.categories)],
+            dtype=np.int64,
+        )
+        self.colours = np.array(
+            [_colour_code(item.get("color") or item.get("name")) for item in items], dtype=np.int64
+        )
+        self.tokens = np.array([estimate_tokens(item.get("name") or "") + 1 for item in items])
+
+    @classmethod
+    def from_buckets(cls, buckets: Dict[str, List[str]]) -> "WardrobeIndex":
+        """Index a plain {category: [names]} wardrobe."""
+        return cls([
+            {"category": category, "name": name}
+            for category, names in buckets.items() for name in (names or [])
+        ])
+
+    def scores(self, base_item: str, query: str = "") -> np.ndarray:
+        """Relevance of every item to the base item and the free-text query."""
+        base_role = _role(base_item)
+        complement = COMPLEMENT[base_role, self.roles]
+        colour = _colour_scores(_colour_code(base_item), self.colours)
+        lexical = np.clip(self.vectors @ vectorize_one(f"{base_item} {query}"), 0.0, 1.0)
+        return W_COMPLEMENT * complement + W_COLOUR * colour + W_LEXICAL * lexical
+
+    def select(
+        self,
+        base_item: str,
+        query: str = "",
+        top_k: int = WARDROBE_TOP_K,
+        budget: int = WARDROBE_PROMPT_TOKEN_BUDGET,
+    ) -> List[Dict]:
+        """
+        Most relevant items: at most `top_k` per category and `budget` tokens.
+
+        The best item of each category is always kept so no category
+        disappears from the prompt.
+
+        Returns:
+            Items in descending relevance
+        """
+        if not self.items:
+            return []
+        scores = self.scores(base_item, query)
+        # Stable sort keeps wardrobe order among equal scores
+        order = np.argsort(-scores, kind="stable")
+
+        per_category: Dict[str, int] = {}
+        leaders, rest = [], []
+        for i in order:
+            category = self.categories[i]
+            seen = per_category.get(category, 0)
+            if seen >= top_k:
+                continue
+            per_category[category] = seen + 1
+            (leaders if seen == 0 else rest).append(i)
+
+        chosen, used = set(leaders), int(self.tokens[leaders].sum())
+        for i in rest:
+            if used + self.tokens[i] > budget:
+                continue
+            chosen.add(i)
+            used += int(self.tokens[i])
+        return [self.items[i] for i in order if i in chosen]
+
+    def select_buckets(self, base_item: str, query: str = "") -> Dict[str, List[str]]:
+        """`select` grouped into {category: [names]} for the chat prompt."""
+        buckets: Dict[str, List[str]] = {"clothing": [], "accessory": [], "footwear": []}
+        for item in self.select(base_item, query):
+            buckets.setdefault(item.get("category") or "clothing", []).append(item.get("name"))
+        return buckets
+
+
+def needs_pruning(names: List[str], budget: int = WARDROBE_PROMPT_TOKEN_BUDGET) -> bool:
+    """Whether listing every item would exceed the prompt budget."""
+    return sum(estimate_tokens(name or "") + 1 for name in names) > budget
@@ -19,6 +19,16 @@ apiClient.interceptors.request.use(
   (error) => Promise.reject(error)
 );
 
+// One page of a paginated list endpoint. Pass `nextCursor` back as `cursor`
+// for the following page; it is null on the last page.
+const getPage = async (url, params = {}) => {
+  const query = Object.fromEntries(
+    Object.entries(params).filter(([, value]) => value !== undefined && value !== null && value !== "")
+  );
+  const res = await apiClient.get(url, { params: query });
+  return { items: res.data, nextCursor: res.headers["x-next-cursor"] || null };
+};
+
 // === AUTH APIs ===
 export const signup = async (userData) => {
   try {
@@ -91,10 +101,11 @@ export const getOutfitFromImage = async (file, prompt = "", useWardrobe = false)
 };
 
 // === WARDROBE APIs ===
-export const getWardrobe = async () => {
+// One page of wardrobe items. Filters (category, season, color, name_prefix)
+// are applied by the server; returns { items, nextCursor }.
+export const getWardrobe = async ({ cursor, limit, ...filters } = {}) => {
   try {
-    const res = await apiClient.get("/wardrobe");
-    return res.data;
+    return await getPage("/wardrobe", { ...filters, cursor, limit });
   } catch (error) {
     return { error: error.response?.data?.detail || "Failed to get wardrobe" };
   }
@@ -119,10 +130,10 @@ export const deleteWardrobeItem = async (id) => {
 };
 
 // === FAVORITES APIs ===
-export const getFavorites = async () => {
+// One page of favorites, newest first; returns { items, nextCursor }
+export const getFavorites = async ({ cursor, limit } = {}) => {
   try {
-    const res = await apiClient.get("/favorites");
-    return res.data;
+    return await getPage("/favorites", { cursor, limit });
   } catch (error) {
     return { error: error.response?.data?.detail || "Failed to get favorites" };
   }
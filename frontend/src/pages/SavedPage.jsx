@@ -5,18 +5,20 @@ import { listFavorites, deleteFavorite } from "../api/dripMateAPI";
 export default function SavedPage() {
   const navigate = useNavigate();
   const [favs, setFavs] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loading, setLoading] = useState(false);
 
-  const fetchFavs = async () => {
-    try {
-      const data = await listFavorites();
-      setFavs(data);
-    } catch (err) {
-      if (err.response?.status === 401) {
-        localStorage.removeItem('token');
-        localStorage.removeItem('user');
-        navigate('/login');
-      }
+  // Loads the newest page (no cursor) or appends the page after `cursor`
+  const fetchFavs = async (cursor = null) => {
+    setLoading(true);
+    const data = await listFavorites({ cursor });
+    setLoading(false);
+    if (data.error) {
+      if (!localStorage.getItem('token')) navigate('/login');
+      return;
     }
+    setFavs(prev => (cursor ? [...prev, ...data.items] : data.items));
+    setNextCursor(data.nextCursor);
   };
 
   useEffect(() => {
@@ -30,8 +32,9 @@ export default function SavedPage() {
 
   const handleDelete = async (id) => {
     if (!confirm("Remove this saved outfit?")) return;
-    await deleteFavorite(id);
-    await fetchFavs();
+    const res = await deleteFavorite(id);
+    // Drop it locally so the pages already loaded stay in place
+    if (!res.error) setFavs(prev => prev.filter(f => f.id !== id));
   };
 
   return (
@@ -120,7 +123,18 @@ export default function SavedPage() {
             </div>
           ))}
           
-          {favs.length === 0 && (
+          {nextCursor && (
+            <button
+              onClick={() => fetchFavs(nextCursor)}
+              disabled={loading}
+              className="w-full py-3 px-6 rounded-2xl font-semibold transition-all hover:scale-[1.01]"
+              style={{ background: 'var(--bg-elevated)', border: '1px solid var(--border-primary)' }}
+            >
+              {loading ? 'Loading…' : 'Load more'}
+            </button>
+          )}
+
+          {favs.length === 0 && !loading && (
             <div className="card text-center py-16" style={{ background: 'var(--bg-tertiary)' }}>
               <div className="text-6xl mb-4">💾</div>
               <p className="text-2xl mb-2" style={{ color: 'var(--text-secondary)' }}>
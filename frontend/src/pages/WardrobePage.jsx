@@ -1,4 +1,4 @@
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import { useNavigate } from "react-router-dom";
 import { listWardrobe, addWardrobeItem, deleteWardrobeItem, analyzeImage } from "../api/dripMateAPI";
 
@@ -14,18 +14,25 @@ export default function WardrobePage() {
     notes: "",
   });
   const [isFormMinimized, setIsFormMinimized] = useState(true);
+  const [filters, setFilters] = useState({ category: "", season: "", color: "", name_prefix: "" });
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loading, setLoading] = useState(false);
+  const requestId = useRef(0);
 
-  const fetchItems = async () => {
-    try {
-      const data = await listWardrobe();
-      setItems(data);
-    } catch (err) {
-      if (err.response?.status === 401) {
-        localStorage.removeItem('token');
-        localStorage.removeItem('user');
-        navigate('/login');
-      }
+  // Loads the first page (no cursor) or appends the page after `cursor`.
+  // Filtering happens on the server; responses for stale filters are dropped.
+  const fetchItems = async (cursor = null) => {
+    const id = ++requestId.current;
+    setLoading(true);
+    const data = await listWardrobe({ ...filters, cursor });
+    if (id !== requestId.current) return;
+    setLoading(false);
+    if (data.error) {
+      if (!localStorage.getItem('token')) navigate('/login');
+      return;
     }
+    setItems(prev => (cursor ? [...prev, ...data.items] : data.items));
+    setNextCursor(data.nextCursor);
   };
 
   useEffect(() => {
@@ -34,8 +41,17 @@ export default function WardrobePage() {
       navigate('/login');
       return;
     }
-    fetchItems();
-  }, [navigate]);
+    // Debounced so typing in the text filters sends one request
+    const timer = setTimeout(() => fetchItems(), 300);
+    return () => clearTimeout(timer);
+  }, [navigate, filters]);
+
+  const handleFilterChange = (e) => {
+    const { name, value } = e.target;
+    setFilters(prev => ({ ...prev, [name]: value }));
+  };
+
+  const hasFilters = Object.values(filters).some(Boolean);
 
   const handleChange = (e) => {
     const { name, value } = e.target;
@@ -73,8 +89,9 @@ export default function WardrobePage() {
 
   const handleDelete = async (id) => {
     if (!confirm("Delete this item?")) return;
-    await deleteWardrobeItem(id);
-    await fetchItems();
+    const res = await deleteWardrobeItem(id);
+    // Drop it locally so the pages already loaded stay in place
+    if (!res.error) setItems(prev => prev.filter(it => it.id !== id));
   };
 
   return (
@@ -181,10 +198,23 @@ export default function WardrobePage() {
           </div>
         )}
 
+        {/* Filters (applied by the server) */}
+        <div className="grid grid-cols-2 md:grid-cols-4 gap-3 mb-6 fade-in">
+          <select name="category" value={filters.category} onChange={handleFilterChange}>
+            <option value="">All categories</option>
+            <option value="clothing">Clothing</option>
+            <option value="footwear">Footwear</option>
+            <option value="accessory">Accessory</option>
+          </select>
+          <input name="name_prefix" value={filters.name_prefix} onChange={handleFilterChange} placeholder="Name starts with" />
+          <input name="color" value={filters.color} onChange={handleFilterChange} placeholder="Color" />
+          <input name="season" value={filters.season} onChange={handleFilterChange} placeholder="Season" />
+        </div>
+
         {/* Wardrobe Items List */}
         <div className="space-y-3 md:space-y-4">
           <h3 className="text-xl md:text-2xl font-semibold mb-4" style={{ color: 'var(--text-secondary)' }}>
-            {items.length} {items.length === 1 ? 'Item' : 'Items'}
+            {items.length}{nextCursor ? '+' : ''} {items.length === 1 && !nextCursor ? 'Item' : 'Items'}
           </h3>
           
           {items.map((it, idx) => (
@@ -217,13 +247,24 @@ export default function WardrobePage() {
             </div>
           ))}
           
-          {items.length === 0 && (
+          {nextCursor && (
+            <button
+              onClick={() => fetchItems(nextCursor)}
+              disabled={loading}
+              className="w-full py-3 px-6 rounded-2xl font-semibold transition-all hover:scale-[1.01]"
+              style={{ background: 'var(--bg-elevated)', border: '1px solid var(--border-primary)' }}
+            >
+              {loading ? 'Loading…' : 'Load more'}
+            </button>
+          )}
+
+          {items.length === 0 && !loading && (
             <div className="card text-center py-12" style={{ background: 'var(--bg-tertiary)' }}>
               <p className="text-xl mb-2" style={{ color: 'var(--text-secondary)' }}>
-                Your wardrobe is empty
+                {hasFilters ? 'No items match these filters' : 'Your wardrobe is empty'}
               </p>
               <p style={{ color: 'var(--text-tertiary)' }}>
-                Add some items above to get started
+                {hasFilters ? 'Try clearing a filter' : 'Add some items above to get started'}
               </p>
             </div>
           )}